@@ -1,4 +1,7 @@
 -- DB schema --
+-- Schema changes are Alembic migrations now (migrations/, `alembic upgrade head`). A database created from
+-- this script matches revision 0001a, mark it with `alembic stamp 0001a` before upgrading. One created from the
+-- original script, without SlotWaitlist, TokenRevocations, EventIds and the indexes, matches 0001.
 CREATE SCHEMA utulek AUTHORIZATION "utulekAdmin";
 
 -- Create tables --
@@ -87,6 +90,29 @@ CREATE TABLE utulek.ReservationRequests (
     PRIMARY KEY ("Id")
 );
 
+CREATE TABLE utulek.SlotWaitlist (
+    "Id"                BIGSERIAL           NOT NULL,
+    "SlotId"            BIGINT              NOT NULL,
+    "VolunteerId"       BIGINT              NOT NULL,
+    "CreatedAt"         TIMESTAMP           NOT NULL,
+    PRIMARY KEY ("Id"),
+    UNIQUE ("SlotId", "VolunteerId")
+);
+
+CREATE TABLE utulek.TokenRevocations (
+    "Id"                BIGSERIAL           NOT NULL,
+    "Jti"               VARCHAR(36),
+    "UserId"            BIGINT,
+    "RevokedBefore"     BIGINT,
+    "AccessOnly"        BOOLEAN             NOT NULL,
+    "ExpiresAt"         TIMESTAMP           NOT NULL,
+    PRIMARY KEY ("Id"),
+    UNIQUE ("Jti")
+);
+
+-- Ids of the change events sent through NOTIFY (see services/events.py)
+CREATE SEQUENCE utulek.EventIds;
+
 -- Constraints -- 
 ALTER TABLE utulek.Volunteers    
     ADD CONSTRAINT FK_VolunteersUsers FOREIGN KEY ("UserId") REFERENCES utulek.Users("Id");
@@ -120,3 +146,22 @@ ALTER TABLE utulek.ReservationRequests
 
 ALTER TABLE utulek.ReservationRequests
     ADD CONSTRAINT FK_ReservationRequestsVolunteers FOREIGN KEY ("VolunteerId") REFERENCES utulek.Users("Id");
+
+ALTER TABLE utulek.SlotWaitlist
+    ADD CONSTRAINT FK_SlotWaitlistSlots FOREIGN KEY ("SlotId") REFERENCES utulek.AvailableSlots("Id") ON DELETE CASCADE;
+
+ALTER TABLE utulek.SlotWaitlist
+    ADD CONSTRAINT FK_SlotWaitlistVolunteers FOREIGN KEY ("VolunteerId") REFERENCES utulek.Users("Id") ON DELETE CASCADE;
+
+-- Indexes --
+-- Used by the reservation scheduler to find the next reservation due for a state change
+CREATE INDEX IX_ReservationRequestsStatusSlot ON utulek.ReservationRequests ("Status", "SlotId");
+CREATE INDEX IX_AvailableSlotsStartTime ON utulek.AvailableSlots ("StartTime");
+CREATE INDEX IX_AvailableSlotsEndTime ON utulek.AvailableSlots ("EndTime");
+-- Covering indexes for the reservation overview join (ReservationRequests -> AvailableSlots) and its StartTime keyset
+CREATE INDEX IX_ReservationRequestsSlotCover ON utulek.ReservationRequests ("SlotId") INCLUDE ("Id", "VolunteerId", "Status");
+CREATE INDEX IX_AvailableSlotsStartTimeCover ON utulek.AvailableSlots ("StartTime", "Id") INCLUDE ("CatId", "EndTime");
+-- FIFO order of the waitlist of a slot, the first entry is handed the slot when it frees up
+CREATE INDEX IX_SlotWaitlistSlotQueue ON utulek.SlotWaitlist ("SlotId", "Id");
+-- Expired token revocations are purged by this
+CREATE INDEX IX_TokenRevocationsExpiresAt ON utulek.TokenRevocations ("ExpiresAt");
@@ -0,0 +1,179 @@
+# Latency, SQL statements and memory of the list / overview endpoints, through the Flask test client.
+#
+#   python benchmarks/generate_data.py --scale 0.1 --truncate
+#   python benchmarks/endpoints.py --iterations 50 --output results/$(git rev-parse --short HEAD).json
+#   python benchmarks/endpoints.py --compare results/abc1234.json        # deltas against an earlier run
+#
+# Runs against the database of the current profile (DATABASE_URL), run from the backend directory. Each result
+# records the commit and the row counts of the data set, so only runs on the same data should be compared.
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+from App import create_app
+from models.Cat import Cats
+from models.Enums import Roles
+from models.User import User
+from models.database import db
+
+# (name, path, role of the caller); {cat_id} is replaced by a cat that has photos and health records
+ENDPOINTS = [
+    ('cats', '/cats', None),
+    ('cat', '/cats/{cat_id}', None),
+    ('species', '/species', None),
+    ('cat_photos', '/cat/photo/retrieve/{cat_id}', None),
+    ('slots', '/availableslots', Roles.CAREGIVER),
+    ('reservations', '/reservationrequests', Roles.CAREGIVER),
+    ('reservations_volunteer', '/reservationrequests', Roles.VERIFIED_VOLUNTEER),
+    ('overview', '/reservationrequests/overview', Roles.CAREGIVER),
+    ('overview_ongoing', '/reservationrequests/overview/ongoing', Roles.CAREGIVER),
+    ('overview_sorted', '/reservationrequests/overview/sorted', Roles.CAREGIVER),
+    ('users', '/admin/users', Roles.ADMIN),
+    ('unverified_volunteers', '/caregiver/unverified_volunteers', Roles.CAREGIVER),
+    ('examination_requests', '/examinationrequests', Roles.VETS),
+    ('health_records', '/healthrecords/{cat_id}', Roles.VETS),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset():
+    return {table.name: db.session.query(db.func.count()).select_from(table).scalar() for table in db.metadata.sorted_tables}
+
+
+def tokens():
+    # An existing user of every role, the handlers filter by the caller's id
+    result = {}
+    for role in Roles:
+        user = User.query.filter_by(role=role.value).order_by(User.Id).first()
+        if user is not None:
+            result[role] = create_access_token(identity={'username': user.Username, 'role': role.value, 'user_id': user.Id})
+    return result
+
+
+def bench(client, path, token, iterations, warmup):
+    if token is not None:
+        client.set_cookie('access_token_cookie', token)
+    else:
+        client.delete_cookie('access_token_cookie')
+
+    latencies = []
+    queries = []
+    status = None
+    size = 0
+    for i in range(warmup + iterations):
+        started = time.perf_counter()
+        response = client.get(path)
+        body = response.get_data()
+        elapsed = time.perf_counter() - started
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(int(response.headers.get('X-DB-Queries', 0)))
+        status = response.status_code
+        size = len(body)
+    return {
+        'status': status,
+        'bytes': size,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'queries': round(statistics.fmean(queries), 1),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(results, baseline):
+    previous = {row['name']: row for row in baseline['endpoints']}
+    print(f"\n{'endpoint':<24}{'p50 ms':>20}{'p95 ms':>20}{'queries':>20}")
+    for row in results['endpoints']:
+        before = previous.get(row['name'])
+        if before is None:
+            continue
+        cells = []
+        for key, width in (('p50_ms', 20), ('p95_ms', 20), ('queries', 20)):
+            change = (row[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            cells.append(f"{before[key]:.1f}->{row[key]:.1f} ({change:+.0f}%)".rjust(width))
+        print(f"{row['name']:<24}" + ''.join(cells))
+    if baseline.get('dataset') != results.get('dataset'):
+        print('\nWarning: the data sets differ, the numbers are not comparable')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the list and overview endpoints')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='Names of the endpoints to run')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Results file of an earlier run to compare with')
+    parser.add_argument('--no-response-cache', action='store_true', help='Measure the handlers instead of cache hits')
+    args = parser.parse_args()
+
+    app = create_app(start_services=False)
+    stats = app.extensions['query_stats']
+    stats.headers = True  # Statements per request are read from X-DB-Queries
+    # Slow request warnings for every large list would drown the output
+    stats.slow_request_queries = stats.slow_request_db = float('inf')
+    if args.no_response_cache:
+        app.extensions['response_cache'].enabled = False
+
+    with app.app_context():
+        cat = db.session.query(Cats.Id).order_by(Cats.Id).first()
+        cat_id = cat.Id if cat is not None else 1
+        role_tokens = tokens()
+        data = dataset()
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'iterations': args.iterations,
+        'response_cache': not args.no_response_cache,
+        'dataset': data,
+        'endpoints': [],
+    }
+    client = app.test_client()
+    for name, path, role in ENDPOINTS:
+        if args.only and name not in args.only:
+            continue
+        if role is not None and role not in role_tokens:
+            print(json.dumps({'name': name, 'skipped': f'no user with role {role.name}'}))
+            continue
+        row = {'name': name, 'path': path.format(cat_id=cat_id)}
+        row.update(bench(client, row['path'], role_tokens.get(role), args.iterations, args.warmup))
+        results['endpoints'].append(row)
+        print(json.dumps(row), flush=True)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,230 @@
+# Seeded synthetic shelter data for benchmarks.
+#
+#   UTULEK_ENV=dev python benchmarks/generate_data.py --scale 1.0 --truncate    # 10k cats, 200k photos, 1M slots ...
+#   python benchmarks/generate_data.py --scale 0.01 --seed 7                    # quick small data set
+#
+# The same seed, scale and anchor date always produce the same rows, so benchmark runs on different commits see
+# identical data. Fills the database of the current profile (DATABASE_URL), run from the backend directory.
+# Every generated user has the password "benchmark".
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from werkzeug.security import generate_password_hash
+from App import create_app
+from models.AvailableSlot import AvailableSlot
+from models.Cat import CatPhotos, Cats, Species
+from models.Enums import AvailableSlotStatus, Roles, Status, WalkRequestStatus
+from models.ExaminationRequest import ExaminationRequest
+from models.HealthRecord import HealthRecord
+from models.ReservationRequest import ReservationRequest
+from models.User import User, Veterinarian, Volunteer
+from models.database import db
+
+# Row counts at --scale 1.0
+FULL_SCALE = {
+    'users': 50_000,
+    'cats': 10_000,
+    'photos': 200_000,
+    'slots': 1_000_000,
+    'reservations': 1_000_000,
+    'health_records': 100_000,
+    'examination_requests': 20_000,
+}
+SPECIES = ['Domestic Shorthair', 'Domestic Longhair', 'Maine Coon', 'Siamese', 'Persian', 'British Shorthair', 'Bengal', 'Ragdoll']
+FIRST_NAMES = ['Jan', 'Petr', 'Lucie', 'Eva', 'Tomas', 'Jana', 'Martin', 'Tereza', 'Jakub', 'Anna', 'Pavel', 'Klara']
+LAST_NAMES = ['Novak', 'Svoboda', 'Dvorak', 'Cerny', 'Prochazka', 'Kucera', 'Vesely', 'Horak', 'Nemec', 'Marek']
+CAT_NAMES = ['Micka', 'Mourek', 'Lucifer', 'Packa', 'Tygr', 'Bella', 'Felix', 'Luna', 'Oskar', 'Kitty', 'Simba', 'Nela']
+WORDS = ['friendly', 'shy', 'playful', 'calm', 'curious', 'old', 'young', 'loves', 'walks', 'food', 'sleeping', 'people']
+# Share of users per role; caregivers, vets and admins are few, most users are volunteers
+ROLE_WEIGHTS = [
+    (Roles.VERIFIED_VOLUNTEER.value, 70),
+    (Roles.VOLUNTEER.value, 20),
+    (Roles.CAREGIVER.value, 6),
+    (Roles.VETS.value, 3),
+    (Roles.ADMIN.value, 1),
+]
+BATCH_SIZE = 10_000
+
+
+def sentence(rng, words, limit):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))[:limit]
+
+
+def generate(counts, seed, anchor):
+    # Every table has its own generator, seeded from the main seed, so changing one count leaves the other tables alone
+    def rng(table):
+        return random.Random(f'{seed}:{table}')
+
+    r = rng('users')
+    roles = [role for role, weight in ROLE_WEIGHTS for _ in range(weight)]
+    user_roles = [r.choice(roles) for _ in range(counts['users'])]
+    user_roles[0] = Roles.ADMIN.value  # User 1 is always an admin, the benchmark logs in as it
+    hashed = generate_password_hash('benchmark', method='pbkdf2:sha256:1000')
+    users = [
+        (i, f'user{i}', hashed, r.choice(FIRST_NAMES), r.choice(LAST_NAMES), f'user{i}@example.com', role)
+        for i, role in enumerate(user_roles, start=1)
+    ]
+    volunteers = [(user[0], user[6] == Roles.VERIFIED_VOLUNTEER.value) for user in users
+                  if user[6] in (Roles.VOLUNTEER.value, Roles.VERIFIED_VOLUNTEER.value)]
+    vets = [(user[0], r.choice(['Surgery', 'Dermatology', 'Dentistry', 'General']), f'+420{r.randint(600000000, 799999999)}')
+            for user in users if user[6] == Roles.VETS.value]
+    volunteer_ids = [user[0] for user in users if user[6] == Roles.VERIFIED_VOLUNTEER.value] or [1]
+    caregiver_ids = [user[0] for user in users if user[6] == Roles.CAREGIVER.value] or [1]
+    vet_ids = [vet[0] for vet in vets] or [1]
+
+    yield Species, [(i, name) for i, name in enumerate(SPECIES, start=1)]
+    yield User, users
+    yield Volunteer, volunteers
+    yield Veterinarian, vets
+
+    r = rng('cats')
+    yield Cats, [
+        (i, f'{r.choice(CAT_NAMES)} {i}', r.randint(1, len(SPECIES)), r.randint(0, 18), sentence(r, 8, 100),
+         anchor - timedelta(days=r.randint(0, 3650)))
+        for i in range(1, counts['cats'] + 1)
+    ]
+
+    r = rng('photos')
+    yield CatPhotos, (
+        (i, r.randint(1, counts['cats']), f'./catphotos/{i}.jpg') for i in range(1, counts['photos'] + 1)
+    )
+
+    # Slots spread over a year around the anchor, one hour each, starting on full hours
+    anchor_time = datetime.combine(anchor, datetime.min.time())
+    r = rng('slots')
+    slots = []
+    for i in range(1, counts['slots'] + 1):
+        start = anchor_time + timedelta(hours=r.randint(-180 * 24, 180 * 24))
+        slots.append((i, r.randint(1, counts['cats']), start, start + timedelta(hours=1), AvailableSlotStatus.AVAILABLE.value))
+
+    # At most one reservation per slot; past slots end up completed / rejected / cancelled, future ones pending / approved
+    r = rng('reservations')
+    reserved = r.sample(range(1, counts['slots'] + 1), min(counts['reservations'], counts['slots']))
+    reservations = []
+    for i, slot_id in enumerate(reserved, start=1):
+        start = slots[slot_id - 1][2]
+        if start < anchor_time:
+            status = r.choices([WalkRequestStatus.COMPLETED, WalkRequestStatus.REJECTED, WalkRequestStatus.CANCELLED], [80, 10, 10])[0]
+        else:
+            status = r.choices([WalkRequestStatus.PENDING, WalkRequestStatus.APPROVED, WalkRequestStatus.REJECTED], [50, 40, 10])[0]
+        if status in (WalkRequestStatus.PENDING, WalkRequestStatus.APPROVED, WalkRequestStatus.COMPLETED):
+            slot = slots[slot_id - 1]
+            slots[slot_id - 1] = slot[:4] + (AvailableSlotStatus.RESERVED.value,)
+        reservations.append((i, slot_id, r.choice(volunteer_ids), (start - timedelta(days=r.randint(1, 14))).date(), status.value))
+    yield AvailableSlot, slots
+    yield ReservationRequest, reservations
+
+    r = rng('health_records')
+    yield HealthRecord, (
+        (i, r.randint(1, counts['cats']), anchor - timedelta(days=r.randint(0, 3650)), sentence(r, 15, 200), r.choice(vet_ids))
+        for i in range(1, counts['health_records'] + 1)
+    )
+
+    r = rng('examination_requests')
+    yield ExaminationRequest, (
+        (i, r.randint(1, counts['cats']), r.choice(caregiver_ids), anchor - timedelta(days=r.randint(0, 365)),
+         sentence(r, 15, 200), r.choice([s.value for s in Status]))
+        for i in range(1, counts['examination_requests'] + 1)
+    )
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_rows(connection, table, columns, rows):
+    # COPY is several times faster than INSERT for millions of rows
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        names = ', '.join(f'"{column}"' for column in columns)
+        cursor.copy_expert(f'COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def load(model, rows):
+    table = model.__table__
+    columns = [column.name for column in table.columns]
+    postgres = db.engine.dialect.name == 'postgresql'
+    total = 0
+    for batch in batches(rows, BATCH_SIZE):
+        if postgres:
+            raw = db.session.connection().connection.dbapi_connection
+            copy_rows(raw, table.fullname, columns, batch)
+        else:
+            db.session.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+        total += len(batch)
+    return total
+
+
+def truncate():
+    tables = [table.fullname for table in reversed(db.metadata.sorted_tables)]
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+    else:
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+
+
+def reset_sequences(models):
+    # Rows were inserted with explicit ids, move the BIGSERIAL sequences past them
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__table__
+        if 'Id' not in table.columns or not table.columns['Id'].autoincrement:
+            continue
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.fullname}', 'Id'), COALESCE((SELECT MAX(\"Id\") FROM {table.fullname}), 0) + 1, false)"
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fill the utulek schema with seeded synthetic data')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier of the full-scale row counts')
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date(2025, 1, 6),
+                        help='Date the generated history is centred on (YYYY-MM-DD), fixed so runs are comparable')
+    parser.add_argument('--truncate', action='store_true', help='Empty all tables first')
+    for name in FULL_SCALE:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f'Override the number of {name}')
+    args = parser.parse_args()
+
+    counts = {name: getattr(args, name) or max(1, int(count * args.scale)) for name, count in FULL_SCALE.items()}
+    app = create_app(start_services=False)
+    with app.app_context():
+        if args.truncate:
+            truncate()
+        loaded = {}
+        started = time.perf_counter()
+        for model, rows in generate(counts, args.seed, args.anchor):
+            table_started = time.perf_counter()
+            loaded[model.__tablename__] = load(model, rows)
+            print(json.dumps({'table': model.__tablename__, 'rows': loaded[model.__tablename__],
+                              'seconds': round(time.perf_counter() - table_started, 2)}), flush=True)
+        reset_sequences([Species, User, Cats, CatPhotos, AvailableSlot, ReservationRequest, HealthRecord, ExaminationRequest])
+        db.session.commit()
+        if db.engine.dialect.name == 'postgresql':
+            # Fresh statistics, otherwise the planner guesses on tables it saw empty
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(db.text('ANALYZE'))
+        print(json.dumps({'seed': args.seed, 'anchor': args.anchor.isoformat(), 'rows': loaded,
+                          'seconds': round(time.perf_counter() - started, 2)}))
@@ -0,0 +1,110 @@
+# Login throughput under concurrency.
+#
+#   python benchmarks/login_throughput.py                    # password hasher only, inline vs. worker pool
+#   python benchmarks/login_throughput.py --url http://localhost:5000 --username admin --password admin
+#
+# Run from the backend directory.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+from services.passwords import DEFAULT_METHOD, PasswordHasher, PasswordHasherBusy
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def run(concurrency, requests, attempt):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal failures
+        started = time.perf_counter()
+        ok = attempt()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    total = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'failures': failures,
+        'throughput_per_s': round(requests / total, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def bench_hasher(args):
+    hashed = generate_password_hash('benchmark', method=args.method)
+    app = Flask(__name__)
+    app.config['PASSWORD_HASH_METHOD'] = args.method
+    app.config['PASSWORD_HASH_WORKERS'] = args.workers
+    app.config['PASSWORD_HASH_QUEUE'] = args.queue
+    hasher = PasswordHasher(app)
+
+    def pooled():
+        try:
+            return hasher.verify(hashed, 'benchmark')
+        except PasswordHasherBusy:
+            return False
+
+    for concurrency in args.concurrency:
+        inline = run(concurrency, args.requests, lambda: check_password_hash(hashed, 'benchmark'))
+        print(json.dumps({'mode': 'inline', **inline}))
+        print(json.dumps({'mode': 'pool', 'workers': args.workers, **run(concurrency, args.requests, pooled)}))
+    print(json.dumps({'hasher_stats': hasher.stats()}))
+
+
+def bench_http(args):
+    body = json.dumps({'username': args.username, 'password': args.password}).encode()
+
+    def login():
+        request = urllib.request.Request(args.url.rstrip('/') + '/auth/login', data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status == 200
+        except urllib.error.URLError:
+            return False
+
+    for concurrency in args.concurrency:
+        print(json.dumps({'mode': 'http', **run(concurrency, args.requests, login)}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure login throughput under concurrency')
+    parser.add_argument('--url', help='Benchmark a running server instead of the hasher alone')
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--method', default=DEFAULT_METHOD, help='Password hash method')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hasher pool size')
+    parser.add_argument('--queue', type=int, default=64, help='Hasher queue size')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    if args.url:
+        bench_http(args)
+    else:
+        bench_hasher(args)
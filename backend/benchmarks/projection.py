@@ -0,0 +1,139 @@
+# Entity loading vs. column projection for the list endpoints: CPU time and peak Python memory of building
+# the response data, without HTTP and JSON encoding.
+#
+#   python benchmarks/generate_data.py --scale 0.1 --truncate
+#   python benchmarks/projection.py --repeat 5
+#
+# Runs against the database of the current profile (DATABASE_URL), run from the backend directory.
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from App import create_app
+from controllers.availableslot_controller import slot_fields
+from controllers.cat_controller import cat_fields, cat_photos, encode_cats
+from controllers.reservationrequest_controller import reservation_fields
+from models.AvailableSlot import AvailableSlot
+from models.Cat import CatPhotos, Cats
+from models.ReservationRequest import ReservationRequest
+from models.User import User, Veterinarian, Volunteer
+from models.database import db
+from services.projection import select_rows
+from services.serialization import RowEncoder, date_text, minute_text
+
+# The encoders of the entity handlers, by attribute name
+cat_encoder = RowEncoder(id='Id', name='Name', species_id='SpeciesId', age='Age', description='Description',
+                         found=('Found', date_text))
+slot_encoder = RowEncoder(id='Id', cat_id='CatId', start_time=('StartTime', minute_text), end_time=('EndTime', minute_text))
+reservation_encoder = RowEncoder(id='Id', slot_id='SlotId', volunteer_id='VolunteerId',
+                                 request_date=('RequestDate', date_text), status='Status')
+
+
+# Entity loading, as the handlers did before the projections
+def entity_cats():
+    cats = cat_encoder.many(Cats.query.all())
+    photos = {}
+    for photo in CatPhotos.query.all():
+        photos.setdefault(photo.CatId, []).append(photo.PhotoUrl)
+    for item in cats:
+        item['photos'] = photos.get(item['id'], [])
+    return cats
+
+
+def entity_slots():
+    return slot_encoder.many(AvailableSlot.query.all())
+
+
+def entity_reservations():
+    return reservation_encoder.many(ReservationRequest.query.all())
+
+
+def entity_users():
+    vets = {vet.UserId: vet for vet in Veterinarian.query.all()}
+    volunteers = {volunteer.UserId: volunteer for volunteer in Volunteer.query.all()}
+    return [(user.Id, user.Username, vets.get(user.Id), volunteers.get(user.Id)) for user in User.query.all()]
+
+
+# Column projections of the default fieldsets, as the handlers do now
+def projected(fieldset):
+    fields, includes = fieldset.parse({})
+    query, encoder = fieldset.select(fields, includes)
+    return fields, encoder, select_rows(query)
+
+
+def projected_cats():
+    fields, encoder, rows = projected(cat_fields)
+    return encode_cats(rows, fields, encoder, cat_photos())
+
+
+def projected_slots():
+    _, encoder, rows = projected(slot_fields)
+    return encoder.many(rows)
+
+
+def projected_reservations():
+    _, encoder, rows = projected(reservation_fields)
+    return encoder.many(rows)
+
+
+def projected_users():
+    return select_rows(
+        db.select(User.Id, User.Username, Veterinarian.Specialization, Volunteer.verified)
+        .outerjoin(Veterinarian, Veterinarian.UserId == User.Id)
+        .outerjoin(Volunteer, Volunteer.UserId == User.Id)
+    )
+
+
+CASES = {
+    'cats': (entity_cats, projected_cats),
+    'slots': (entity_slots, projected_slots),
+    'reservations': (entity_reservations, projected_reservations),
+    'users': (entity_users, projected_users),
+}
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()  # Fresh session, an identity map filled by the previous run would hide the loading cost
+        started = time.process_time()
+        rows = len(fn())
+        timings.append(time.process_time() - started)
+    db.session.remove()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.remove()
+    return rows, statistics.median(timings), peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare entity loading with column projections')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='+', choices=list(CASES))
+    args = parser.parse_args()
+
+    app = create_app(start_services=False)
+    with app.app_context():
+        for name, (entity, projected) in CASES.items():
+            if args.only and name not in args.only:
+                continue
+            rows, entity_cpu, entity_peak = measure(entity, args.repeat)
+            _, projected_cpu, projected_peak = measure(projected, args.repeat)
+            print(json.dumps({
+                'list': name,
+                'rows': rows,
+                'entity_cpu_ms': round(entity_cpu * 1000, 1),
+                'projected_cpu_ms': round(projected_cpu * 1000, 1),
+                'cpu_saved': f'{1 - projected_cpu / entity_cpu:.0%}' if entity_cpu else None,
+                'entity_peak_mb': round(entity_peak / 2 ** 20, 1),
+                'projected_peak_mb': round(projected_peak / 2 ** 20, 1),
+                'memory_saved': f'{1 - projected_peak / entity_peak:.0%}' if entity_peak else None,
+            }), flush=True)
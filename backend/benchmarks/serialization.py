@@ -0,0 +1,113 @@
+# Row serialization: dict per row + strftime + jsonify (the old list handlers) vs. RowEncoder + orjson.
+#
+#   python benchmarks/serialization.py                 # 100k rows of every shape
+#   python benchmarks/serialization.py --rows 10000 --repeat 10
+#
+# No database needed, the rows are built in memory with the attributes of ORM objects / Core rows.
+# Run from the backend directory.
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from flask_restful import Api
+from services import serialization
+from services.serialization import RowEncoder, date_text, minute_text
+
+OverviewRow = namedtuple('OverviewRow', ['reservation_id', 'volunteer_username', 'volunteer_full_name', 'volunteer_email',
+                                         'cat_id', 'cat_name', 'slot_id', 'start_time', 'end_time', 'reservation_status'])
+
+
+def make_rows(count, seed=1):
+    r = random.Random(seed)
+    base = datetime(2025, 1, 6)
+    cats, slots, overview = [], [], []
+    for i in range(count):
+        start = base + timedelta(hours=r.randint(-4000, 4000))
+        cats.append(SimpleNamespace(Id=i, Name=f'Cat {i}', SpeciesId=r.randint(1, 8), Age=r.randint(0, 18),
+                                    Description='friendly and playful', Found=date(2020, 1, 1) + timedelta(days=r.randint(0, 1800))))
+        slots.append(SimpleNamespace(Id=i, CatId=r.randint(1, 10000), StartTime=start, EndTime=start + timedelta(hours=1)))
+        overview.append(OverviewRow(i, f'user{i}', 'Jan Novak', f'user{i}@example.com', r.randint(1, 10000), 'Micka',
+                                    i, start, start + timedelta(hours=1), r.randint(0, 5)))
+    return {'cats': cats, 'slots': slots, 'overview': overview}
+
+
+# The per-row code of the list handlers before the encoders
+def old_cats(rows):
+    return [{'id': cat.Id, 'name': cat.Name, 'species_id': cat.SpeciesId, 'age': cat.Age,
+             'description': cat.Description, 'found': cat.Found.strftime('%Y-%m-%d')} for cat in rows]
+
+
+def old_slots(rows):
+    return [{'id': slot.Id, 'cat_id': slot.CatId, 'start_time': slot.StartTime.strftime('%Y-%m-%d %H:%M'),
+             'end_time': slot.EndTime.strftime('%Y-%m-%d %H:%M')} for slot in rows]
+
+
+def old_overview(rows):
+    result = []
+    for r in rows:
+        item = {f: getattr(r, f) for f in OverviewRow._fields}
+        for f in ('start_time', 'end_time'):
+            item[f] = item[f].strftime('%Y-%m-%d %H:%M')
+        result.append(item)
+    return result
+
+
+ENCODERS = {
+    'cats': RowEncoder(id='Id', name='Name', species_id='SpeciesId', age='Age', description='Description',
+                       found=('Found', date_text)),
+    'slots': RowEncoder(id='Id', cat_id='CatId', start_time=('StartTime', minute_text), end_time=('EndTime', minute_text)),
+    'overview': RowEncoder(**{f: (f, minute_text) if f.endswith('_time') else f for f in OverviewRow._fields}),
+}
+OLD = {'cats': old_cats, 'slots': old_slots, 'overview': old_overview}
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), body
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark row serialization')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    old_app = Flask('old')
+    old_app.json = DefaultJSONProvider(old_app)
+    new_app = Flask('new')
+    serialization.init_app(new_app, Api(new_app))
+
+    rows = make_rows(args.rows)
+    for shape in ENCODERS:
+        with old_app.app_context():
+            build_old, _ = measure(lambda: OLD[shape](rows[shape]), args.repeat)
+            old_seconds, old_body = measure(lambda: old_app.json.response(OLD[shape](rows[shape])).get_data(), args.repeat)
+        with new_app.app_context():
+            build_new, _ = measure(lambda: ENCODERS[shape].many(rows[shape]), args.repeat)
+            new_seconds, new_body = measure(lambda: new_app.json.response(ENCODERS[shape].many(rows[shape])).get_data(), args.repeat)
+        print(json.dumps({
+            'shape': shape,
+            'rows': args.rows,
+            'same_output': json.loads(old_body) == json.loads(new_body),
+            'old_build_ms': round(build_old * 1000, 1),
+            'old_total_ms': round(old_seconds * 1000, 1),
+            'new_build_ms': round(build_new * 1000, 1),
+            'new_total_ms': round(new_seconds * 1000, 1),
+            'speedup': round(old_seconds / new_seconds, 1),
+            'bytes': len(new_body),
+        }), flush=True)
@@ -1,13 +1,28 @@
-from flask import jsonify, make_response
+from flask import current_app, jsonify, make_response, request
 from flask_restful import Resource, reqparse
 from psycopg2 import IntegrityError
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import exc
+from jwt import PyJWTError
 from models.User import User, Volunteer
-from flask_jwt_extended import create_access_token, set_access_cookies, unset_jwt_cookies, jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import create_access_token, create_refresh_token, set_access_cookies, set_refresh_cookies, unset_jwt_cookies, jwt_required, get_jwt_identity, get_jwt, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
 from flasgger import swag_from
 from models.database import db
 from models.Enums import Roles
-from datetime import timedelta
+from services.authorization import public
+from services.passwords import PasswordHasherBusy, password_hasher
+from services.rate_limit import login_rate_limiter
+from services.token_denylist import token_denylist
+
+
+def issue_tokens(response, user):
+    # Short lived access token carrying the role, checked by signature only; the refresh token just names the user,
+    # the role is read again from the database on every refresh
+    access_token = create_access_token(identity={"username": user.Username, "role": user.role, "user_id": user.Id})
+    refresh_token = create_refresh_token(identity={"username": user.Username, "user_id": user.Id})
+    set_access_cookies(response, access_token)
+    set_refresh_cookies(response, refresh_token)
+    return response
 
 class Register(Resource):
     @swag_from({
@@ -57,6 +72,7 @@ class Register(Resource):
             }
         ]
     })
+    @public
     def post(self):
         parser = reqparse.RequestParser()
         parser.add_argument('username', required=True, help="Username cannot be blank.")
@@ -69,7 +85,10 @@ class Register(Resource):
         if User.query.filter_by(Username=args['username']).first():
             return {"msg": "Username already exists"}, 409
 
-        hashed_password = generate_password_hash(args['password'])
+        try:
+            hashed_password = password_hasher.hash(args['password'])
+        except PasswordHasherBusy:
+            return {"msg": "Server is busy, try again later"}, 503
         new_user = User(
             Username = args['username'], 
             Email = args['email'],
@@ -103,7 +122,7 @@ class Login(Resource):
             200: {
                 'description': 'Login successful',
                 'examples': {
-                    'application/json': {'login': True, 'expires_in': 900}  # Example expiration in seconds
+                    'application/json': {'login': True, 'expires_in': 900}  # Access token lifetime in seconds, renew it with /auth/refresh
                 }
             },
             401: {
@@ -111,6 +130,12 @@ class Login(Resource):
                 'examples': {
                     'application/json': {'msg': 'Invalid username or password', 'login': False}
                 }
+            },
+            429: {
+                'description': 'Too many failed login attempts, see the Retry-After header',
+                'examples': {
+                    'application/json': {'msg': 'Too many failed login attempts, try again later', 'login': False}
+                }
             }
         },
         'parameters': [
@@ -130,27 +155,37 @@ class Login(Resource):
             }
         ]
     })
-
+    @public
     def post(self):
         parser = reqparse.RequestParser()
         parser.add_argument('username', required=True, help="Username cannot be blank.")
         parser.add_argument('password', required=True, help="Password cannot be blank.")
         args = parser.parse_args()
 
+        # Checked before the user lookup and the password hash, so blocked attempts cost next to nothing
+        retry_after = login_rate_limiter.check(args['username'], request.remote_addr)
+        if retry_after is not None:
+            return {"msg": "Too many failed login attempts, try again later", 'login': False}, 429, {'Retry-After': str(retry_after)}
+
         user = User.query.filter_by(Username=args['username']).first()
-        if user and check_password_hash(user.Hashed_pass, args['password']):
-            # Set expiration time for the access token
-            expires = timedelta(minutes=45)  # Set token to expire in 15 minutes (example)
-            access_token = create_access_token(
-                identity={"username": args['username'], "role": user.role, "user_id": user.Id},
-                expires_delta=expires
-            )
+        try:
+            valid = user is not None and password_hasher.verify(user.Hashed_pass, args['password'])
+            # Upgrade hashes made with older hashing parameters while we know the plain password
+            if valid and password_hasher.needs_rehash(user.Hashed_pass):
+                user.Hashed_pass = password_hasher.hash(args['password'])
+                db.session.commit()
+        except PasswordHasherBusy:
+            return {"msg": "Server is busy, try again later", 'login': False}, 503
+
+        if valid:
+            login_rate_limiter.succeeded(args['username'])
+            expires = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
             response = jsonify({'login': True, 'expires_in': expires.total_seconds()})  # Include expiration in seconds
             response = make_response(response)
-            set_access_cookies(response, access_token)
-            return response
+            return issue_tokens(response, user)
 
-        return jsonify({"msg": "Invalid username or password", 'login': False}), 401
+        login_rate_limiter.failed(args['username'], request.remote_addr)
+        return {"msg": "Invalid username or password", 'login': False}, 401
     
 class Logout(Resource):
     @swag_from({
@@ -165,13 +200,83 @@ class Logout(Resource):
             }
         }
     })
+    @public
     def post(self):
+        # Revoke the tokens the client holds, so copies of the cookies stop working too
+        for cookie_name in (current_app.config['JWT_ACCESS_COOKIE_NAME'], current_app.config['JWT_REFRESH_COOKIE_NAME']):
+            encoded_token = request.cookies.get(cookie_name)
+            if not encoded_token:
+                continue
+            try:
+                token = decode_token(encoded_token)
+            except (JWTExtendedException, PyJWTError):
+                continue  # Expired or invalid, nothing to revoke
+            # One commit per token, a refresh token revoked already (used, or a second logout) must not undo
+            # the revocation of the access token
+            revocation = token_denylist.revoke_token(token['jti'], token['exp'])
+            try:
+                db.session.commit()
+            except exc.IntegrityError:
+                db.session.rollback()  # Already revoked
+                continue
+            token_denylist.applied(revocation)
+
         # Create a response indicating the user is logged out
         response = jsonify({'logout': True})
         response = make_response(response)
         # Unset the JWT cookies to log the user out
         unset_jwt_cookies(response)
         return response
+
+class Refresh(Resource):
+    @swag_from({
+        'tags': ['Authentication'],
+        'summary': 'Exchange the refresh token cookie for a new access and refresh token',
+        'responses': {
+            200: {
+                'description': 'Tokens renewed',
+                'examples': {
+                    'application/json': {'refresh': True, 'expires_in': 900}
+                }
+            },
+            401: {
+                'description': 'Refresh token missing, expired, revoked or already used',
+                'examples': {
+                    'application/json': {'msg': 'Refresh token already used', 'refresh': False}
+                }
+            },
+            409: {
+                'description': 'The refresh token was renewed moments ago by another request (another tab), '
+                               'the cookies already hold the new tokens',
+                'examples': {
+                    'application/json': {'msg': 'Refresh token just renewed', 'refresh': False}
+                }
+            }
+        }
+    })
+    @public  # Needs the refresh token, not a role
+    @jwt_required(refresh=True)
+    def post(self):
+        token = get_jwt()
+        # Rotation, every refresh token works once. The unique Jti makes a second use fail even in another process.
+        revocation = token_denylist.revoke_token(token['jti'], token['exp'])
+        try:
+            db.session.commit()
+        except exc.IntegrityError:
+            db.session.rollback()
+            # Tabs share the cookies and renew on the same schedule, only the first one rotates
+            if token_denylist.rotated_recently(token['jti']):
+                return {"msg": "Refresh token just renewed", 'refresh': False}, 409
+            return {"msg": "Refresh token already used", 'refresh': False}, 401
+        token_denylist.applied(revocation)
+
+        user = User.query.get(get_jwt_identity()['user_id'])
+        if user is None:
+            return {"msg": "User no longer exists", 'refresh': False}, 401
+
+        expires = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        response = make_response(jsonify({'refresh': True, 'expires_in': expires.total_seconds()}))
+        return issue_tokens(response, user)
     
 class GetUserRole(Resource):
     @swag_from({
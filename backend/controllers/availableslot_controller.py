@@ -1,10 +1,16 @@
 from flasgger import swag_from
 from flask import jsonify, make_response, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_restful import Resource, reqparse
 from models.AvailableSlot import AvailableSlot
+from models.Cat import Cats
 from models.Enums import AvailableSlotStatus, Roles
 from models.database import db
+from services.events import event_bus
+from services.reservation_scheduler import reservation_scheduler
+from services.authorization import roles_required
+from services.fieldsets import Fieldset, InvalidFieldset
+from services.projection import select_rows
+from services.serialization import minute_text
 
 available_slot_parser = reqparse.RequestParser()
 available_slot_parser.add_argument('cat_id', required=True, help="Cat ID cannot be blank.")
@@ -12,6 +18,19 @@ available_slot_parser.add_argument('start_time', required=True, help="Start time
 available_slot_parser.add_argument('end_time', required=True, help="End time cannot be blank.")
 
 allowed_roles = [Roles.ADMIN.value, Roles.VERIFIED_VOLUNTEER.value, Roles.CAREGIVER.value]
+slot_fields = Fieldset(
+    AvailableSlot,
+    fields={
+        'id': AvailableSlot.Id,
+        'cat_id': AvailableSlot.CatId,
+        'start_time': (AvailableSlot.StartTime, minute_text),
+        'end_time': (AvailableSlot.EndTime, minute_text),
+        'status': AvailableSlot.Status,
+    },
+    joins={'cat': (Cats, Cats.Id == AvailableSlot.CatId)},
+    relations={'cat': ('cat', {'id': Cats.Id, 'name': Cats.Name})},
+    default_fields=['id', 'cat_id', 'start_time', 'end_time']
+)
 
 class AvailableSlotList(Resource):
     @swag_from({
@@ -31,35 +50,35 @@ class AvailableSlotList(Resource):
                     ]
                 }
             },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown include: volunteer'}
+                }
+            },
             401: {
                 'description': 'Unauthorized user',
                 'examples': {
                     'application/json': {'msg': 'Unauthorized user'}
                 }
             }
-        }
+        },
+        'parameters': [
+            {'name': 'all', 'in': 'query', 'type': 'boolean', 'required': False, 'description': 'Also slots that are not available'}
+        ] + slot_fields.parameters()
     })
-    @jwt_required()
+    @roles_required(*allowed_roles, msg="Unauthorized user")
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return make_response(jsonify({'msg': 'Unauthorized user'}), 401)
-        
-        if request.args.get('all') == 'true':
-            available_slots = AvailableSlot.query.all()
-        else:
-            available_slots = AvailableSlot.query.filter_by(Status=AvailableSlotStatus.AVAILABLE.value).all()
+        try:
+            fields, includes = slot_fields.parse(request.args)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        query, encoder = slot_fields.select(fields, includes)
+        if request.args.get('all') != 'true':
+            query = query.where(AvailableSlot.Status == AvailableSlotStatus.AVAILABLE.value)
+        available_slots = select_rows(query)
 
-        available_slots_list = [
-            {
-                'id': slot.Id,
-                'cat_id': slot.CatId,
-                'start_time': slot.StartTime.strftime('%Y-%m-%d %H:%M'),
-                'end_time': slot.EndTime.strftime('%Y-%m-%d %H:%M'),
-            }
-            for slot in available_slots
-        ]
-        return jsonify(available_slots_list)
+        return jsonify(encoder.many(available_slots))
 
     @swag_from({
         'tags': ['Available Slots'],
@@ -111,12 +130,8 @@ class AvailableSlotList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Unauthorized user")
     def post(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {'msg': 'Unauthorized user'}, 401
-        
         args = available_slot_parser.parse_args()
         new_slot = AvailableSlot(
             StartTime = args['start_time'],
@@ -125,6 +140,8 @@ class AvailableSlotList(Resource):
             Status = AvailableSlotStatus.AVAILABLE.value
         )
         db.session.add(new_slot)
+        db.session.flush()
+        event_bus.publish('slot.created', id=new_slot.Id, cat_id=new_slot.CatId, status=new_slot.Status)
         db.session.commit()
         return {'msg': 'Available slot created successfully'}, 201
     
@@ -179,12 +196,8 @@ class AvailableSlotById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(*allowed_roles, msg="Unauthorized user")
     def put(self, slot_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {'msg': 'Unauthorized user'}, 401
-        
         args = available_slot_parser.parse_args()
         slot = AvailableSlot.query.filter_by(Id=slot_id).first()
         if slot is None:
@@ -193,7 +206,9 @@ class AvailableSlotById(Resource):
         slot.StartTime = args['start_time']
         slot.EndTime = args['end_time']
 
+        event_bus.publish('slot.updated', id=slot.Id, status=slot.Status)
         db.session.commit()
+        reservation_scheduler.notify()  # Slot times changed, reservations on it may be due at a different time
         return {'msg': 'Available slot updated successfully'}, 200
 
     @swag_from({
@@ -220,16 +235,13 @@ class AvailableSlotById(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Unauthorized user")
     def delete(self, slot_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {'msg': 'Unauthorized user'}, 401
-        
         slot = AvailableSlot.query.filter_by(Id=slot_id).first()
         if slot is None:
             return {'msg': 'Slot not found'}, 404
         db.session.delete(slot)
+        event_bus.publish('slot.deleted', id=slot.Id)
         db.session.commit()
         return {'msg': 'Available slot deleted successfully'}, 200
     
\ No newline at end of file
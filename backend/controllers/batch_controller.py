@@ -0,0 +1,61 @@
+from flasgger import swag_from
+from flask import current_app, request
+from flask_restful import Resource
+from services.authorization import public
+from services.batch import MAX_BATCH_REQUESTS, InvalidBatch, parse_batch, run_batch
+
+
+class Batch(Resource):
+    @swag_from({
+        'tags': ['Batch'],
+        'summary': 'Run several GET requests in one round trip',
+        'description': 'Every sub-request is handled as if it was sent on its own with the cookies of this request, '
+                       'including its role checks and error responses. The results come back in request order.',
+        'parameters': [
+            {
+                'name': 'body',
+                'in': 'body',
+                'required': True,
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'requests': {
+                            'type': 'array',
+                            'maxItems': MAX_BATCH_REQUESTS,
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'path': {'type': 'string', 'example': '/cats/1'},
+                                    'method': {'type': 'string', 'enum': ['GET'], 'default': 'GET'}
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        ],
+        'responses': {
+            200: {
+                'description': 'Status, headers and JSON body of every sub-request',
+                'examples': {
+                    'application/json': [
+                        {'status': 200, 'headers': {'ETag': '"32e0c261159dc71e859bcdd1"'}, 'body': {'id': 1, 'name': 'Whiskers'}},
+                        {'status': 404, 'headers': {}, 'body': {'msg': 'No photos found for this cat'}}
+                    ]
+                }
+            },
+            400: {
+                'description': 'Invalid batch',
+                'examples': {
+                    'application/json': {'msg': 'Only GET requests can be batched'}
+                }
+            }
+        }
+    })
+    @public  # Sub-requests check their own roles
+    def post(self):
+        try:
+            paths = parse_batch(request.get_json(silent=True))
+        except InvalidBatch as e:
+            return {"msg": str(e)}, 400
+        return current_app.response_class(run_batch(paths), mimetype='application/json')
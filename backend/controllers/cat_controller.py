@@ -1,12 +1,17 @@
-from flask import jsonify
+from flask import jsonify, request
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from flasgger import swag_from
 from models.Cat import Cats
 from models.database import db
-from models.Cat import CatPhotos
+from models.Cat import CatPhotos, Species
 from models.Enums import Roles
 from datetime import datetime
+from services.authorization import current_identity, roles_required
+from services.fieldsets import Fieldset, InvalidFieldset
+from services.projection import select_rows
+from services.response_cache import response_cache
+from services.serialization import date_text
+from services.structured_log import StructuredLogger
 
 # Parser for Cat endpoints
 cat_parser = reqparse.RequestParser()
@@ -15,6 +20,42 @@ cat_parser.add_argument('species_id', type=int, required=True, help="Species ID
 cat_parser.add_argument('age', type=int, help="Age must be an integer.")
 cat_parser.add_argument('description', help="Description cannot be blank.")
 cat_parser.add_argument('found', help="Found date in format YYYY-MM-DD")
+log = StructuredLogger(__name__)
+cat_fields = Fieldset(
+    Cats,
+    fields={
+        'id': Cats.Id,
+        'name': Cats.Name,
+        'species_id': Cats.SpeciesId,
+        'age': Cats.Age,
+        'description': Cats.Description,
+        'found': (Cats.Found, date_text),
+        'photos': None,  # From catphotos, only queried when asked for
+    },
+    joins={'species': (Species, Species.Id == Cats.SpeciesId)},
+    relations={'species': ('species', {'id': Species.Id, 'name': Species.Name})},
+    key=Cats.Id
+)
+
+
+def cat_photos(cat_ids=None):
+    # cat id -> photo urls, in one query for all the cats
+    query = db.select(CatPhotos.CatId, CatPhotos.PhotoUrl).order_by(CatPhotos.Id)
+    if cat_ids is not None:
+        query = query.where(CatPhotos.CatId.in_(cat_ids))
+    photos = {}
+    for cat_id, url in select_rows(query):
+        photos.setdefault(cat_id, []).append(url)
+    return photos
+
+
+def encode_cats(rows, fields, encoder, photos):
+    cats = encoder.many(rows)
+    if 'photos' in fields:
+        for row, item in zip(rows, cats):
+            item['photos'] = photos.get(row._key, [])
+    return cats
+
 
 class CatList(Resource):
     @swag_from({
@@ -36,24 +77,27 @@ class CatList(Resource):
                         }
                     ]
                 }
+            },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown fields: color'}
+                }
             }
-        }
+        },
+        'parameters': cat_fields.parameters()
     })
+    @response_cache.cached('cats', 'catphotos', 'species')
     def get(self): # Get all cats
-        cats = Cats.query.all()
-        cats_list = [
-            {
-                'id': cat.Id,
-                'name': cat.Name,
-                'species_id': cat.SpeciesId,
-                'age': cat.Age,
-                'description': cat.Description,
-                'found': cat.Found.strftime('%Y-%m-%d'),
-                'photos': [photo.PhotoUrl for photo in CatPhotos.query.filter_by(CatId=cat.Id).all()]
-            } 
-            for cat in cats
-        ]
-        return jsonify(cats_list)
+        try:
+            fields, includes = cat_fields.parse(request.args)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        query, encoder = cat_fields.select(fields, includes)
+        cats = select_rows(query)
+        # All photos in one query instead of one per cat
+        photos = cat_photos() if 'photos' in fields else None
+        return jsonify(encode_cats(cats, fields, encoder, photos))
 
     @swag_from({
         'tags': ['Cats'],
@@ -98,13 +142,8 @@ class CatList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin or Caretaker access required")
     def post(self): # Create a new cat
-        current_user = get_jwt_identity()
-        print(current_user)
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {"msg": "Admin or Caretaker access required"}, 401
-        
         args = cat_parser.parse_args()
 
         try:
@@ -120,7 +159,9 @@ class CatList(Resource):
             Found=args.get('found')
         )
         db.session.add(new_cat)
+        response_cache.invalidate('cats')
         db.session.commit()
+        log.info('cat.created', cat_id=new_cat.Id, user_id=current_identity()['user_id'])
         response_data = {
             'msg': 'Cat created successfully',
             'id': new_cat.Id
@@ -141,10 +182,17 @@ class CatById(Resource):
                         'species_id': 1, 
                         'age': 5, 
                         'description': 'A small cat', 
-                        'found': '2024-01-01'
+                        'found': '2024-01-01',
+                        'species': {'id': 1, 'name': 'Siamese'}
                     }
                 }
             },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown include: owner'}
+                }
+            },
             404: {
                 'description': 'Cat not found',
                 'examples': {
@@ -160,26 +208,21 @@ class CatById(Resource):
                 'type': 'integer',
                 'description': 'ID of the cat to retrieve'
             }
-        ]
+        ] + cat_fields.parameters()
     })
+    @response_cache.cached('cats', 'catphotos', 'species')
     def get(self, cat_id):  # Get a cat by ID
-        cat = Cats.query.get(cat_id)
-        if not cat:
+        try:
+            fields, includes = cat_fields.parse(request.args)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        query, encoder = cat_fields.select(fields, includes)
+        cats = select_rows(query.where(Cats.Id == cat_id))
+        if not cats:
             return {"msg": "Cat not found"}, 404
 
-        # Fetch photos associated with the cat
-        photos = CatPhotos.query.filter_by(CatId=cat_id).all()
-        photo_urls = [photo.PhotoUrl for photo in photos]
-
-        return jsonify({
-            'id': cat.Id,
-            'name': cat.Name,
-            'species_id': cat.SpeciesId,
-            'age': cat.Age,
-            'description': cat.Description,
-            'found': cat.Found,
-            'photos': photo_urls
-        })
+        photos = cat_photos([cat_id]) if 'photos' in fields else None
+        return jsonify(encode_cats(cats, fields, encoder, photos)[0])
 
     @swag_from({
         'tags': ['Cats'],
@@ -230,13 +273,8 @@ class CatById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin or Caretaker access required")
     def put(self, cat_id): # Update a cat by ID
-        current_user = get_jwt_identity()
-        print(current_user)
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {"msg": "Admin or Caretaker access required"}, 401
-        
         cat = Cats.query.get(cat_id)
         if not cat:
             return {"msg": "Cat not found"}, 404
@@ -253,6 +291,7 @@ class CatById(Resource):
         cat.Description = args.get('description')
         cat.Found = args.get('found')
 
+        response_cache.invalidate('cats')
         db.session.commit()
         return {"msg": "Cat updated successfully"}, 200
 
@@ -289,12 +328,8 @@ class CatById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin or Caretaker access required")
     def delete(self, cat_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {"msg": "Admin or Caretaker access required"}, 401
-        
         cat = Cats.query.get(cat_id)
         if not cat:
             return {"msg": "Cat not found"}, 404
@@ -304,6 +339,7 @@ class CatById(Resource):
 
         # Delete the cat itself
         db.session.delete(cat)
+        response_cache.invalidate('cats', 'catphotos')
         db.session.commit()
 
         return {"msg": "Cat and associated photos deleted successfully"}, 200
@@ -3,13 +3,18 @@ from flask import jsonify, send_from_directory, request
 from flask_restful import Resource, reqparse
 from flasgger import swag_from
 from models.Cat import CatPhotos, Cats
+from models.Enums import Roles
 from models.database import db
+from services.authorization import roles_required
+from services.response_cache import response_cache
+from services.structured_log import StructuredLogger
 import time
 
 # Upload folder setup
 UPLOAD_FOLDER = './catphotos/'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True) # Create the folder if it doesn't exist
 photo_parser = reqparse.RequestParser() # Parser for photo endpoints
+log = StructuredLogger(__name__)
 
 class CatPhotoUpload(Resource):
     @swag_from({
@@ -53,6 +58,7 @@ class CatPhotoUpload(Resource):
             }
         }
     })
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin or Caretaker access required")
     def post(self):
         # Access form data from the request
         cat_id = request.form.get('cat_id')
@@ -60,7 +66,7 @@ class CatPhotoUpload(Resource):
 
         # Check if both file and cat_id are present
         if not file or not cat_id:
-            print("File or cat_id is missing in the request")
+            log.info('photo.upload_rejected', reason='missing_file_or_cat_id')
             return {"msg": "File and cat_id are required"}, 400
 
         # Cast cat_id to int if necessary
@@ -68,13 +74,13 @@ class CatPhotoUpload(Resource):
             cat_id = int(cat_id)
             
         except ValueError:
-            print(f"Invalid cat_id: {cat_id}")
+            log.info('photo.upload_rejected', reason='invalid_cat_id', cat_id=cat_id)
             return {"msg": "Invalid cat_id"}, 400
 
         # Check if the cat exists
         cat = Cats.query.get(cat_id)
         if not cat:
-            print(f"Cat with id {cat_id} not found")
+            log.info('photo.upload_rejected', reason='cat_not_found', cat_id=cat_id)
             return {"msg": "Cat not found"}, 404
 
         # Save the file with a unique filename
@@ -83,18 +89,20 @@ class CatPhotoUpload(Resource):
         
         try:
             file.save(filepath)
-            print(f"File saved to {filepath}")
+            log.info('photo.saved', cat_id=cat_id, path=filepath)
         except Exception as e:
-            print(f"Error saving file: {e}")
+            log.exception('photo.save_failed', cat_id=cat_id, path=filepath)
             return {"msg": "File could not be saved"}, 500
 
         # Add a new photo entry in the CatPhotos table
         try:
             new_photo = CatPhotos(CatId=cat_id, PhotoUrl=filepath)
             db.session.add(new_photo)
+            response_cache.invalidate('catphotos')
             db.session.commit()
 
         except Exception as e:
+            log.exception('photo.db_save_failed', cat_id=cat_id, path=filepath)
             return {"msg": "Failed to save photo to database"}, 500
 
         return {"msg": "Photo uploaded successfully", "path": filepath}, 200
@@ -127,6 +135,7 @@ class CatPhotoDelete(Resource):
             }
         }
     })
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin or Caretaker access required")
     def delete(self, id):
         photo = CatPhotos.query.filter_by(Id=id).first()
         
@@ -141,6 +150,7 @@ class CatPhotoDelete(Resource):
         
         # Delete the record from the database
         db.session.delete(photo)
+        response_cache.invalidate('catphotos')
         db.session.commit()
         
         return {"msg": "Photo deleted successfully"}, 200
@@ -183,6 +193,7 @@ class CatPhotoRetrieve(Resource):
             }
         }
     })
+    @response_cache.cached('catphotos')
     def get(self, id):
         if not id:
             return {"msg": "cat_id is required to retrieve photos"}, 400
@@ -202,5 +213,5 @@ class CatPhotoRetrieve(Resource):
     
 class CatPhotoServe(Resource):
     def get(self, filename):
-        print(f"Serving photo: {filename}")
+        log.debug('photo.served', filename=filename)
         return send_from_directory('./catphotos', filename)
\ No newline at end of file
@@ -0,0 +1,212 @@
+import hmac
+from flasgger import swag_from
+from flask import Response, current_app, request, send_file
+from flask_restful import Resource, reqparse
+from models.Enums import Roles
+from services.authorization import public, roles_required
+from services.db_pool import pool_monitor
+from services.metrics import metrics
+from services.profiler import ProfilerBusy, profiler
+
+
+class DbPoolStats(Resource):
+    @swag_from({
+        'tags': ['Admin'],
+        'summary': 'Database connection pool statistics of this process (Admin only)',
+        'responses': {
+            200: {
+                'description': 'Pool counters since the process started and the current pool state',
+                'examples': {
+                    'application/json': {
+                        'checkouts': 1520,
+                        'checkins': 1518,
+                        'connects': 7,
+                        'invalidations': 0,
+                        'timeouts': 0,
+                        'wait_seconds_total': 0.84,
+                        'wait_seconds_max': 0.12,
+                        'pool_size': 5,
+                        'checked_out': 2,
+                        'checked_in': 3,
+                        'overflow': 0
+                    }
+                }
+            },
+            401: {
+                'description': 'Admin access required',
+                'examples': {
+                    'application/json': {'msg': 'Admin access required'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def get(self):
+        return pool_monitor.stats(), 200
+
+
+class MetricsExport(Resource):
+    @swag_from({
+        'tags': ['Admin'],
+        'summary': 'Request, database pool and cache metrics of all workers in the Prometheus text format',
+        'description': 'Needs "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is configured.',
+        'produces': ['text/plain'],
+        'responses': {
+            200: {
+                'description': 'Metrics in the Prometheus exposition format',
+                'examples': {
+                    'text/plain': 'http_requests_total{method="GET",route="/cats",status="200"} 1027'
+                }
+            },
+            401: {
+                'description': 'Missing or wrong metrics token',
+                'examples': {
+                    'application/json': {'msg': 'Invalid metrics token'}
+                }
+            }
+        }
+    })
+    @public  # Scraped by Prometheus, which has no user session; protected by METRICS_TOKEN instead
+    def get(self):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return {'msg': 'Invalid metrics token'}, 401
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+class ProfilerSessionControl(Resource):
+    @swag_from({
+        'tags': ['Admin'],
+        'summary': 'State of the sampling profiler in this worker and the last finished session (Admin only)',
+        'responses': {
+            200: {
+                'description': 'Running and last session',
+                'examples': {
+                    'application/json': {
+                        'running': None,
+                        'last': {'id': '3f2a9c1b7d4e', 'pid': 4121, 'route': '/reservationrequests/overview',
+                                 'profiled_requests': 50, 'samples': 812}
+                    }
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def get(self):
+        return profiler.status(), 200
+
+    @swag_from({
+        'tags': ['Admin'],
+        'summary': 'Start profiling for N seconds or N requests, optionally of one route only (Admin only)',
+        'parameters': [
+            {
+                'name': 'body',
+                'in': 'body',
+                'required': False,
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'seconds': {'type': 'number', 'example': 30},
+                        'requests': {'type': 'integer', 'example': 50},
+                        'route': {'type': 'string', 'example': '/reservationrequests/overview'},
+                        'interval': {'type': 'number', 'example': 0.005}
+                    }
+                }
+            }
+        ],
+        'responses': {
+            201: {
+                'description': 'Profiling started',
+                'examples': {
+                    'application/json': {'id': '3f2a9c1b7d4e', 'pid': 4121, 'seconds': 30, 'requests': 50}
+                }
+            },
+            409: {
+                'description': 'A session is already running',
+                'examples': {
+                    'application/json': {'msg': 'A profiling session is already running'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def post(self):
+        parser = reqparse.RequestParser()
+        parser.add_argument('seconds', type=float)
+        parser.add_argument('requests', type=int)
+        parser.add_argument('route')
+        parser.add_argument('interval', type=float, default=0.005)
+        args = parser.parse_args()
+        if args['interval'] < 0.001:
+            return {"msg": "The interval must be at least 0.001 s"}, 400
+        try:
+            return profiler.start(args['seconds'], args['requests'], args['route'], args['interval']), 201
+        except ProfilerBusy:
+            return {"msg": "A profiling session is already running"}, 409
+
+    @swag_from({
+        'tags': ['Admin'],
+        'summary': 'Stop the running profiling session early (Admin only)',
+        'responses': {
+            200: {
+                'description': 'Session stopped, the result is written shortly after',
+                'examples': {
+                    'application/json': {'id': '3f2a9c1b7d4e', 'samples': 312}
+                }
+            },
+            404: {
+                'description': 'No session running',
+                'examples': {
+                    'application/json': {'msg': 'No profiling session running'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def delete(self):
+        summary = profiler.stop()
+        if summary is None:
+            return {"msg": "No profiling session running"}, 404
+        return summary, 200
+
+
+class ProfilerResult(Resource):
+    @swag_from({
+        'tags': ['Admin'],
+        'summary': 'Download a finished profile as collapsed stacks or speedscope JSON (Admin only)',
+        'parameters': [
+            {
+                'name': 'session_id',
+                'in': 'path',
+                'type': 'string',
+                'required': True
+            },
+            {
+                'name': 'format',
+                'in': 'query',
+                'type': 'string',
+                'enum': ['collapsed', 'speedscope'],
+                'default': 'collapsed'
+            }
+        ],
+        'responses': {
+            200: {
+                'description': 'The profile, open it in speedscope.app or pipe the collapsed stacks to flamegraph.pl'
+            },
+            404: {
+                'description': 'Profile not found',
+                'examples': {
+                    'application/json': {'msg': 'Profile not found'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def get(self, session_id):
+        format = request.args.get('format', 'collapsed')
+        path = profiler.result_path(session_id, format)
+        if path is None:
+            return {"msg": "Profile not found"}, 404
+        if format == 'speedscope':
+            return send_file(path, mimetype='application/json', as_attachment=True, download_name=f'{session_id}.speedscope.json')
+        return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f'{session_id}.collapsed.txt')
@@ -0,0 +1,107 @@
+import json
+import queue
+from flasgger import swag_from
+from flask import Response, request, stream_with_context
+from flask_restful import Resource
+from models.Enums import Roles
+from models.database import db
+from services.events import TooManySubscribers, event_bus
+from services.authorization import roles_required
+
+allowed_roles = [Roles.ADMIN.value, Roles.VERIFIED_VOLUNTEER.value, Roles.CAREGIVER.value]
+
+# Comment line sent when nothing happened, keeps proxies from closing the idle connection
+KEEPALIVE_SECONDS = 15
+# Reconnect delay suggested to EventSource clients
+RETRY_MILLISECONDS = 3000
+# Retry-After of a refused stream, open streams usually stay for minutes
+FULL_RETRY_SECONDS = 30
+
+
+def format_event(message):
+    return f"id: {message['id']}\nevent: {message['type']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+class EventStream(Resource):
+    @swag_from({
+        'tags': ['Events'],
+        'summary': 'Server-Sent Events stream of reservation and slot changes',
+        'parameters': [
+            {
+                'name': 'Last-Event-ID',
+                'in': 'header',
+                'type': 'integer',
+                'required': False,
+                'description': 'Resume after this event, sent automatically by EventSource on reconnect'
+            },
+            {
+                'name': 'last_event_id',
+                'in': 'query',
+                'type': 'integer',
+                'required': False,
+                'description': 'Same as the Last-Event-ID header, for the first connection'
+            }
+        ],
+        'responses': {
+            200: {
+                'description': 'text/event-stream with reservation.* and slot.* events. '
+                               'A reset event means events were missed and the client should reload its data.'
+            },
+            401: {
+                'description': 'Unauthorized access',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized access'}
+                }
+            },
+            503: {
+                'description': 'Too many open streams on this server, see the Retry-After header',
+                'examples': {
+                    'application/json': {'msg': 'Too many open event streams, try again later'}
+                }
+            }
+        }
+    })
+    @roles_required(*allowed_roles)
+    def get(self):
+        last_event_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('last_event_id', type=int)
+
+        # Subscribe before reading the backlog, so nothing is lost in between
+        try:
+            subscriber = event_bus.subscribe()
+        except TooManySubscribers:
+            return {"msg": "Too many open event streams, try again later"}, 503, {'Retry-After': str(FULL_RETRY_SECONDS)}
+        missed = event_bus.since(last_event_id) if last_event_id is not None else []
+        # The stream keeps the request context open for as long as the client listens, give back the
+        # connection the auth check may have used instead of holding it idle in a transaction
+        db.session.remove()
+
+        def stream():
+            try:
+                # Sent right away, so the response headers go out before the first event
+                yield f"retry: {RETRY_MILLISECONDS}\n\n"
+                if missed is None:
+                    yield "event: reset\ndata: {}\n\n"
+                    replayed = set()
+                else:
+                    replayed = {message['id'] for message in missed}
+                    for message in missed:
+                        yield format_event(message)
+                while not subscriber.overflowed:
+                    try:
+                        message = subscriber.queue.get(timeout=KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    # Already sent from the backlog
+                    if message['id'] in replayed:
+                        replayed.discard(message['id'])
+                        continue
+                    yield format_event(message)
+                # Too slow to keep up, the client reconnects and resumes from its last event
+            finally:
+                event_bus.unsubscribe(subscriber)
+
+        return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
@@ -1,13 +1,16 @@
 import datetime
 from flasgger import swag_from
 from flask import jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_restful import Resource, reqparse
 from models.ExaminationRequest import ExaminationRequest
 from models.database import db
 from models.Enums import Roles, Status
 from models.Cat import Cats
 from models.User import User
+from services.authorization import roles_required, current_identity
+from services.fieldsets import Fieldset, InvalidFieldset
+from services.projection import select_rows
+from services.serialization import date_text
 
 examination_request_parser = reqparse.RequestParser()
 examination_request_parser.add_argument('cat_id', required=True, help="Cat ID cannot be blank.")
@@ -15,6 +18,35 @@ examination_request_parser.add_argument('cat_id', required=True, help="Cat ID ca
 examination_request_parser.add_argument('description', required=True, help="Description cannot be blank.")
 # status will be assigned on the server side
 
+examination_fields = Fieldset(
+    ExaminationRequest,
+    fields={
+        'id': ExaminationRequest.Id,
+        'cat_id': ExaminationRequest.CatId,
+        'cat_name': (Cats.Name, None, 'cat'),
+        'caregiver_id': ExaminationRequest.CaregiverId,
+        'caregiver_name': (db.func.concat(User.FirstName, ' ', User.LastName), None, 'caregiver'),
+        'request_date': (ExaminationRequest.RequestDate, date_text),
+        'description': ExaminationRequest.Description,
+        'status': ExaminationRequest.Status,
+    },
+    joins={
+        'cat': (Cats, Cats.Id == ExaminationRequest.CatId),
+        'caregiver': (User, User.Id == ExaminationRequest.CaregiverId),
+    },
+    relations={
+        'cat': ('cat', {'id': Cats.Id, 'name': Cats.Name, 'species_id': Cats.SpeciesId, 'age': Cats.Age}),
+        'caregiver': ('caregiver', {
+            'id': User.Id,
+            'full_name': db.func.concat(User.FirstName, ' ', User.LastName),
+            'email': User.Email,
+        }),
+    },
+    # The table view; a single request defaults to BY_ID_FIELDS
+    default_fields=['id', 'cat_id', 'cat_name', 'caregiver_name', 'request_date', 'description', 'status']
+)
+BY_ID_FIELDS = ('id', 'cat_id', 'caregiver_id', 'request_date', 'description', 'status')
+
 class ExaminationRequestList(Resource):
     @swag_from({
         'tags': ['Examination Requests'],
@@ -32,45 +64,40 @@ class ExaminationRequestList(Resource):
                     ]
                 }
             },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown fields: vet_name'}
+                }
+            },
             401: {
                 'description': 'Unauthorized',
                 'examples': {
                     'application/json': {'msg': 'Unauthorized'}
                 }
             }
-        }
+        },
+        'parameters': examination_fields.parameters()
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, Roles.VETS, msg="Unauthorized")
     def get(self):
-        current_user = get_jwt_identity()
+        current_user = current_identity()
         role = current_user.get('role')
         user_id = current_user.get('user_id')
 
-        if role not in [Roles.ADMIN.value, Roles.CAREGIVER.value, Roles.VETS.value]:
-            return {'msg': 'Unauthorized'}, 401
+        try:
+            fields, includes = examination_fields.parse(request.args)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        # Cat and caregiver names come from joins in the same query, not from two queries per request
+        query, encoder = examination_fields.select(fields, includes)
+
         # Filter requests based on role
         if role == Roles.CAREGIVER.value:
             # Fetch only requests made by the caregiver
-            examination_requests = ExaminationRequest.query.filter_by(CaregiverId=user_id).all()
-        else:
-            # Fetch all requests for admins and vets
-            examination_requests = ExaminationRequest.query.all()
-
-        final_requests = []
-        for req in examination_requests:
-            cat = Cats.query.filter_by(Id=req.CatId).first()
-            caregiver = User.query.filter_by(Id=req.CaregiverId).first()
-            final_requests.append({
-                'id': req.Id,
-                'cat_id': req.CatId,
-                'cat_name': cat.Name if cat else "Unknown Cat",
-                'caregiver_name': f"{caregiver.FirstName} {caregiver.LastName}" if caregiver else "Unknown Caregiver",
-                'request_date': req.RequestDate.strftime('%Y-%m-%d'),
-                'description': req.Description,
-                'status': req.Status,
-            })
+            query = query.where(ExaminationRequest.CaregiverId == user_id)
 
-        return jsonify(final_requests)
+        return jsonify(encoder.many(select_rows(query)))
 
     @swag_from({
         'tags': ['Examination Requests'],
@@ -112,11 +139,9 @@ class ExaminationRequestList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.CAREGIVER, Roles.ADMIN, msg="Unauthorized")
     def post(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.CAREGIVER.value, Roles.ADMIN.value]:
-            return {'msg': 'Unauthorized'}, 401
+        current_user = current_identity()
         
         args = examination_request_parser.parse_args()
         cat_id = args['cat_id']
@@ -144,7 +169,7 @@ class ExaminationRequestById(Resource):
                 'required': True,
                 'description': 'ID of the examination request'
             }
-        ],
+        ] + examination_fields.parameters(BY_ID_FIELDS),
         'responses': {
             200: {
                 'description': 'Successfully retrieved examination request',
@@ -156,6 +181,18 @@ class ExaminationRequestById(Resource):
                     }
                 }
             },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown include: vet'}
+                }
+            },
+            401: {
+                'description': 'Unauthorized',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized'}
+                }
+            },
             404: {
                 'description': 'Examination request not found',
                 'examples': {
@@ -164,17 +201,21 @@ class ExaminationRequestById(Resource):
             }
         }
     })
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, Roles.VETS, msg="Unauthorized")
     def get(self, examination_request_id):
-        examination_request = ExaminationRequest.query.filter_by(Id=examination_request_id).first()
-        if examination_request:
-            return jsonify({
-                'id': examination_request.Id,
-                'cat_id': examination_request.CatId,
-                'caregiver_id': examination_request.CaregiverId,
-                'request_date': examination_request.RequestDate,
-                'description': examination_request.Description,
-                'status': examination_request.Status
-            })
+        try:
+            fields, includes = examination_fields.parse(request.args, default_fields=BY_ID_FIELDS)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        query, encoder = examination_fields.select(fields, includes)
+        query = query.where(ExaminationRequest.Id == examination_request_id)
+        current_user = current_identity()
+        if current_user.get('role') == Roles.CAREGIVER.value:
+            # Same as the list, a caregiver only sees their own requests
+            query = query.where(ExaminationRequest.CaregiverId == current_user.get('user_id'))
+        examination_requests = select_rows(query)
+        if examination_requests:
+            return jsonify(encoder(examination_requests[0]))
         else:
             return {'msg': 'Examination request not found'}, 404
 
@@ -227,9 +268,9 @@ class ExaminationRequestById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, Roles.VETS, msg="Unauthorized")
     def put(self, examination_request_id):
-        current_user = get_jwt_identity()
+        current_user = current_identity()
         role = current_user.get("role")
         user_id = current_user.get("user_id")
 
@@ -243,7 +284,7 @@ class ExaminationRequestById(Resource):
         if role == Roles.VETS.value:
             # Vets can only update the status field
             examination_request.Status = data.get('status', examination_request.Status)
-        elif role in [Roles.CAREGIVER.value, Roles.ADMIN.value]:
+        else:
             # Caregivers and Admins can edit all field
             examination_request.CatId = data.get('cat_id', examination_request.CatId)
             examination_request.Description = data.get('description', examination_request.Description)
@@ -251,8 +292,6 @@ class ExaminationRequestById(Resource):
                 examination_request.CaregiverId = user_id
             if role == Roles.ADMIN.value:
                 examination_request.Status = data.get('status', examination_request.Status)
-        else:
-            return {'msg': 'Unauthorized'}, 401
 
         db.session.commit()
         return {'msg': 'Examination request updated successfully'}, 200
@@ -285,12 +324,8 @@ class ExaminationRequestById(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Unauthorized")
     def delete(self, examination_request_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {'msg': 'Unauthorized'}, 401
-        
         examination_request = ExaminationRequest.query.filter_by(Id=examination_request_id).first()
         if examination_request:
             db.session.delete(examination_request)
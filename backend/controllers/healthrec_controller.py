@@ -1,18 +1,27 @@
 from flasgger import swag_from
 from flask import jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_restful import Resource, reqparse
 from models.Enums import Roles
 from models.HealthRecord import HealthRecord
 from models.database import db
 from models.User import User
 from datetime import datetime
+from services.authorization import roles_required, current_identity
+from services.serialization import RowEncoder, date_text
 
 health_record_parser = reqparse.RequestParser()
 health_record_parser.add_argument('date', type=str, required=True, help="Date cannot be blank.")
 health_record_parser.add_argument('description', type=str, required=True, help="Description cannot be blank.")
 
 allowed_roles = [Roles.ADMIN.value, Roles.VETS.value, Roles.CAREGIVER.value]
+# Rows of (HealthRecord, User) with the vet's name
+health_record_encoder = RowEncoder(
+    id='HealthRecord.Id',
+    cat_id='HealthRecord.CatId',
+    date=('HealthRecord.Date', date_text),
+    description='HealthRecord.Description',
+    vet_name=lambda row: f"{row.User.FirstName} {row.User.LastName}"
+)
 
 class HealthRecordList(Resource):
     @swag_from({
@@ -49,12 +58,8 @@ class HealthRecordList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(*allowed_roles, msg="Unauthorized user")
     def get(self, cat_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized user"}, 401
-        
         # Fetch health records with joined vet info
         health_records = (
             db.session.query(HealthRecord, User)
@@ -63,17 +68,7 @@ class HealthRecordList(Resource):
             .all()
         )
         
-        health_record_list = [
-            {
-                'id': hr.HealthRecord.Id,
-                'cat_id': hr.HealthRecord.CatId,
-                'date': hr.HealthRecord.Date.strftime('%Y-%m-%d'),
-                'description': hr.HealthRecord.Description,
-                'vet_name': f"{hr.User.FirstName} {hr.User.LastName}"  # Combine first and last names
-            }
-            for hr in health_records
-        ]
-        return jsonify(health_record_list)
+        return jsonify(health_record_encoder.many(health_records))
 
     @swag_from({
         'tags': ['Health Records'],
@@ -128,12 +123,9 @@ class HealthRecordList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.VETS, msg="Unauthorized user")
     def post(self, cat_id): # Create a new health record
-        current_user = get_jwt_identity()
-
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.VETS.value]:
-            return {"msg": "Unauthorized user"}, 401
+        current_user = current_identity()
         
         args = health_record_parser.parse_args()
 
@@ -192,12 +184,8 @@ class HealthRecordById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(*allowed_roles, msg="Unauthorized user")
     def get(self, health_record_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized user"}, 401
-        
         health_record = HealthRecord.query.filter_by(Id=health_record_id).first()
 
         if health_record:
@@ -269,11 +257,9 @@ class HealthRecordById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.VETS, msg="Unauthorized user")
     def put(self, health_record_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.VETS.value]:
-            return {"msg": "Unauthorized user"}, 401
+        current_user = current_identity()
         
         args = health_record_parser.parse_args()
         data = request.get_json()
@@ -1,6 +1,5 @@
 from flasgger import swag_from
 from flask import jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource, reqparse
 from models.User import User
 from models.Cat import Cats
@@ -8,7 +7,15 @@ from models.Enums import AvailableSlotStatus, Roles, Status, WalkRequestStatus
 from models.ReservationRequest import ReservationRequest
 from models.AvailableSlot import AvailableSlot
 from models.database import db
+from services.events import event_bus
+from services.reservation_query import ACTIVE_STATUSES, CONCLUDED_STATUSES, OVERVIEW_PARAMETERS, overview_response
+from services.reservation_scheduler import reservation_scheduler
+from services.waitlist import join_waitlist, release_slots
 from sqlalchemy import desc
+from services.authorization import roles_required
+from services.fieldsets import Fieldset, InvalidFieldset
+from services.projection import select_rows
+from services.serialization import date_text, minute_text
 
 parser = reqparse.RequestParser()
 parser.add_argument('SlotId', type=int, required=True)
@@ -16,6 +23,42 @@ parser.add_argument('VolunteerId', type=int, required=True)
 parser.add_argument('RequestDate', type=str, required=True)
 
 allowed_roles = [Roles.ADMIN.value, Roles.VERIFIED_VOLUNTEER.value, Roles.CAREGIVER.value]
+reservation_fields = Fieldset(
+    ReservationRequest,
+    fields={
+        'id': ReservationRequest.Id,
+        'slot_id': ReservationRequest.SlotId,
+        'volunteer_id': ReservationRequest.VolunteerId,
+        'request_date': (ReservationRequest.RequestDate, date_text),
+        'status': ReservationRequest.Status,
+    },
+    joins={
+        'slot': (AvailableSlot, AvailableSlot.Id == ReservationRequest.SlotId),
+        'cat': (Cats, Cats.Id == AvailableSlot.CatId, 'slot'),
+        'volunteer': (User, User.Id == ReservationRequest.VolunteerId),
+    },
+    relations={
+        'slot': ('slot', {
+            'id': AvailableSlot.Id,
+            'cat_id': AvailableSlot.CatId,
+            'start_time': (AvailableSlot.StartTime, minute_text),
+            'end_time': (AvailableSlot.EndTime, minute_text),
+            'status': AvailableSlot.Status,
+        }),
+        'cat': ('cat', {'id': Cats.Id, 'name': Cats.Name}),
+        'volunteer': ('volunteer', {
+            'id': User.Id,
+            'username': User.Username,
+            'full_name': db.func.concat(User.FirstName, ' ', User.LastName),
+        }),
+    }
+)
+
+# Fields returned by the overview routes unless the client asks for others
+OVERVIEW_FIELDS = ['reservation_id', 'volunteer_username', 'volunteer_full_name', 'volunteer_email', 'cat_id', 'cat_name',
+                   'slot_id', 'start_time', 'end_time', 'reservation_status']
+SORTED_OVERVIEW_FIELDS = ['reservation_id', 'volunteer_username', 'volunteer_full_name', 'cat_name', 'start_time', 'end_time',
+                          'reservation_status', 'slot_id']
 
 class ReservationList(Resource):
     @swag_from({
@@ -36,32 +79,29 @@ class ReservationList(Resource):
                     ]
                 }
             },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown fields: cat_name'}
+                }
+            },
             401: {
                 'description': 'Unauthorized access',
                 'examples': {
                     'application/json': {'msg': 'Unauthorized access'}
                 }
             }
-        }
+        },
+        'parameters': reservation_fields.parameters()
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-        
-        reservation_requests = ReservationRequest.query.all()
-        reservation_request_list = [
-            {
-                'id': rr.Id,
-                'slot_id': rr.SlotId,
-                'volunteer_id': rr.VolunteerId,
-                'request_date': rr.RequestDate.strftime('%Y-%m-%d'),
-                'status': rr.Status
-            }
-            for rr in reservation_requests
-        ]
-        return jsonify(reservation_request_list)
+        try:
+            fields, includes = reservation_fields.parse(request.args)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        query, encoder = reservation_fields.select(fields, includes)
+        return jsonify(encoder.many(select_rows(query)))
 
     @swag_from({
         'tags': ['Reservation Requests'],
@@ -101,18 +141,25 @@ class ReservationList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def post(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-        
         args = parser.parse_args()
         # Check whether a reservation for the same slot and volunteer already exists
         existing_reservation = ReservationRequest.query.filter_by(SlotId=args['SlotId'], VolunteerId=args['VolunteerId']).first()
         if existing_reservation is not None:
             return {"msg": "Reservation request already exists"}, 400
-        
+
+        # Lock the slot, concurrent bookings and waitlist handoffs of it wait for this transaction
+        slot = AvailableSlot.query.filter_by(Id=args['SlotId']).with_for_update().first()
+        if slot is None:
+            return {"msg": "Invalid data provided"}, 400
+
+        # Slot already taken, queue the volunteer instead of making them retry
+        if slot.Status == AvailableSlotStatus.RESERVED.value:
+            position = join_waitlist(slot.Id, args['VolunteerId'])
+            db.session.commit()
+            return {"msg": "Slot is already reserved, added to the waitlist", "waitlist_position": position}, 202
+
         new_reservation_request = ReservationRequest(
             SlotId=args['SlotId'],
             VolunteerId=args['VolunteerId'],
@@ -122,11 +169,11 @@ class ReservationList(Resource):
         db.session.add(new_reservation_request)
 
         # Update the slot status to reserved
-        slot = AvailableSlot.query.filter_by(Id=args['SlotId']).first()
-        if slot is None:
-            return {"msg": "Invalid data provided"}, 400
         slot.Status = AvailableSlotStatus.RESERVED.value
-        
+
+        db.session.flush()
+        event_bus.publish('reservation.created', id=new_reservation_request.Id, slot_id=slot.Id, volunteer_id=new_reservation_request.VolunteerId, status=new_reservation_request.Status)
+        event_bus.publish('slot.updated', id=slot.Id, status=slot.Status)
         db.session.commit()
         return {"msg": "Reservation request created successfully"}, 201
     
@@ -143,10 +190,17 @@ class ReservationById(Resource):
                         'slot_id': 1,
                         'volunteer_id': 1,
                         'request_date': '2021-01-01',
-                        'status': 1
+                        'status': 1,
+                        'cat': {'id': 1, 'name': 'Whiskers'}
                     }
                 }
             },
+            400: {
+                'description': 'Invalid fields or include',
+                'examples': {
+                    'application/json': {'msg': 'Unknown include: photos'}
+                }
+            },
             404: {
                 'description': 'Reservation request not found',
                 'examples': {
@@ -167,26 +221,21 @@ class ReservationById(Resource):
                 'type': 'integer',
                 'required': True
             }
-        ]
+        ] + reservation_fields.parameters()
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def get(self, reservation_request_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-        
-        reservation_request = ReservationRequest.query.filter_by(Id=reservation_request_id).first()
-        
-        if reservation_request is None:
+        try:
+            fields, includes = reservation_fields.parse(request.args)
+        except InvalidFieldset as e:
+            return {"msg": str(e)}, 400
+        query, encoder = reservation_fields.select(fields, includes)
+        reservation_requests = select_rows(query.where(ReservationRequest.Id == reservation_request_id))
+
+        if not reservation_requests:
             return {"msg": "Reservation request not found"}, 404
-        
-        return {
-            'id': reservation_request.Id,
-            'slot_id': reservation_request.SlotId,
-            'volunteer_id': reservation_request.VolunteerId,
-            'request_date': reservation_request.RequestDate.strftime('%Y-%m-%d'),
-            'status': reservation_request.Status
-        }
+
+        return encoder(reservation_requests[0])
 
     @swag_from({
         'tags': ['Reservation Requests'],
@@ -218,24 +267,19 @@ class ReservationById(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def delete(self, reservation_request_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-        
         reservation_request = ReservationRequest.query.filter_by(Id=reservation_request_id).first()
 
         if reservation_request is None:
             return {"msg": "Reservation request not found"}, 404
 
-        # Update the slot status to available
-        slot = AvailableSlot.query.filter_by(Id=reservation_request.SlotId).first()
-        if slot is None:
-            return {"msg": "Invalid data provided"}, 400
-        slot.Status = AvailableSlotStatus.AVAILABLE.value
-        
         db.session.delete(reservation_request)
+        event_bus.publish('reservation.deleted', id=reservation_request.Id, slot_id=reservation_request.SlotId)
+
+        # Give the slot to the next volunteer on its waitlist, or make it available again
+        if reservation_request.Status in ACTIVE_STATUSES:
+            release_slots([reservation_request.SlotId])
         db.session.commit()
         return {"msg": "Reservation request deleted successfully"}, 200
 
@@ -295,42 +339,135 @@ class ReservationById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, Roles.VERIFIED_VOLUNTEER)
     def put(self, reservation_request_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value, Roles.VERIFIED_VOLUNTEER.value]:
-            return {"msg": "Unauthorized access"}, 401
         # parse only the Status field
         put_parser = reqparse.RequestParser()
         put_parser.add_argument('Status', type=int, required=True)
         put_args = put_parser.parse_args()
 
         reservation_request = ReservationRequest.query.filter_by(Id=reservation_request_id).first()
+        held_slot = reservation_request.Status in ACTIVE_STATUSES
         reservation_request.Status = put_args['Status']
 
-        # Update the slot status to available if the reservation is rejected
-        if put_args['Status'] == WalkRequestStatus.REJECTED.value or put_args['Status'] == WalkRequestStatus.CANCELLED.value:
-            slot = AvailableSlot.query.filter_by(Id=reservation_request.SlotId).first()
-            if slot is None:
-                return {"msg": "Invalid data provided"}, 400
-            slot.Status = AvailableSlotStatus.AVAILABLE.value
+        # Free the slot if the reservation is rejected, the next volunteer on its waitlist gets it
+        if held_slot and put_args['Status'] in [WalkRequestStatus.REJECTED.value, WalkRequestStatus.CANCELLED.value]:
+            db.session.flush()
+            release_slots([reservation_request.SlotId])
 
+        event_bus.publish('reservation.updated', id=reservation_request.Id, slot_id=reservation_request.SlotId, status=reservation_request.Status)
         db.session.commit()
+
+        # Approved reservations are moved along by the scheduler, make it recompute its next wake up
+        if put_args['Status'] == WalkRequestStatus.APPROVED.value:
+            reservation_scheduler.notify()
         return {"msg": "Reservation request updated successfully"}, 200
 
+# Batch decision -> (statuses it can be applied to, resulting status)
+DECISIONS = {
+    'approve': ([WalkRequestStatus.PENDING.value], WalkRequestStatus.APPROVED.value),
+    'reject': ([WalkRequestStatus.PENDING.value], WalkRequestStatus.REJECTED.value),
+    'cancel': ([WalkRequestStatus.PENDING.value, WalkRequestStatus.APPROVED.value], WalkRequestStatus.CANCELLED.value),
+}
+MAX_BATCH_SIZE = 1000
+
+class ReservationBatchDecision(Resource):
+    @swag_from({
+        'tags': ['Reservation Requests'],
+        'summary': 'Approve, reject or cancel several reservation requests at once',
+        'responses': {
+            200: {
+                'description': 'Decision applied, outcome for every requested ID',
+                'examples': {
+                    'application/json': {
+                        'status': 1,
+                        'results': {'1': 'updated', '2': 'invalid_status', '3': 'not_found'}
+                    }
+                }
+            },
+            400: {
+                'description': 'Bad request',
+                'examples': {
+                    'application/json': {'msg': 'Invalid data provided'}
+                }
+            },
+            401: {
+                'description': 'Unauthorized access',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized access'}
+                }
+            }
+        },
+        'parameters': [
+            {
+                'name': 'body',
+                'in': 'body',
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'ids': {'type': 'array', 'items': {'type': 'integer'}},
+                        'action': {'type': 'string', 'enum': list(DECISIONS)}
+                    },
+                    'required': ['ids', 'action']
+                }
+            }
+        ]
+    })
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER)
+    def post(self):
+        batch_parser = reqparse.RequestParser()
+        batch_parser.add_argument('ids', type=int, action='append', required=True, help="ids must be a list of integers.")
+        batch_parser.add_argument('action', choices=list(DECISIONS), required=True, help="action must be one of: approve, reject, cancel.")
+        args = batch_parser.parse_args()
+
+        ids = list(dict.fromkeys(args['ids']))
+        if not ids or len(ids) > MAX_BATCH_SIZE:
+            return {"msg": f"Between 1 and {MAX_BATCH_SIZE} ids are required"}, 400
+        allowed_from, new_status = DECISIONS[args['action']]
+
+        # One locking read for the whole batch, so concurrent decisions cannot interleave
+        current = {
+            r.Id: r for r in db.session.query(
+                ReservationRequest.Id, ReservationRequest.Status, ReservationRequest.SlotId
+            ).filter(ReservationRequest.Id.in_(ids)).with_for_update().all()
+        }
+
+        results = {}
+        updated_ids = []
+        freed_slot_ids = []
+        for reservation_id in ids:
+            reservation = current.get(reservation_id)
+            if reservation is None:
+                results[reservation_id] = 'not_found'
+            elif reservation.Status not in allowed_from:
+                results[reservation_id] = 'invalid_status'
+            else:
+                results[reservation_id] = 'updated'
+                updated_ids.append(reservation_id)
+                freed_slot_ids.append(reservation.SlotId)
+
+        if updated_ids:
+            db.session.execute(
+                db.update(ReservationRequest)
+                .where(ReservationRequest.Id.in_(updated_ids))
+                .values(Status=new_status)
+                .execution_options(synchronize_session=False)
+            )
+            event_bus.publish('reservation.batch_updated', ids=updated_ids, status=new_status)
+            # Rejected and cancelled reservations give their slots back, or to the next volunteer waiting for them
+            if new_status != WalkRequestStatus.APPROVED.value:
+                release_slots(freed_slot_ids)
+        db.session.commit()
+
+        if updated_ids and new_status == WalkRequestStatus.APPROVED.value:
+            reservation_scheduler.notify()
+        return {"status": new_status, "results": {str(k): v for k, v in results.items()}}, 200
+
 class ReservationOverview(Resource):
     @swag_from({
         'tags': ['Reservations'],
         'summary': 'Get a detailed list of reservations for caregiver approval or for a specific user',
-        'parameters': [
-            {
-                'name': 'user_id',
-                'in': 'query',
-                'type': 'integer',
-                'required': False,
-                'description': 'Optional user ID to filter reservations for a specific user',
-            },
-        ],
+        'parameters': OVERVIEW_PARAMETERS,
         'responses': {
             200: {
                 'description': 'Successfully retrieved reservations overview',
@@ -356,70 +493,18 @@ class ReservationOverview(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-
-        # Get the optional user_id from query parameters
-        user_id = request.args.get('user_id', type=int)
-
-        # Base query
-        query = db.session.query(
-            ReservationRequest.Id.label('reservation_id'),
-            User.Username.label('volunteer_username'),
-            db.func.concat(User.FirstName, ' ', User.LastName).label('volunteer_full_name'),
-            User.Email.label('volunteer_email'),
-            Cats.Name.label('cat_name'),
-            Cats.Id.label('cat_id'),
-            AvailableSlot.Id.label('slot_id'),
-            AvailableSlot.StartTime.label('start_time'),
-            AvailableSlot.EndTime.label('end_time'),
-            ReservationRequest.Status.label('reservation_status')
-        ).join(
-            User, User.Id == ReservationRequest.VolunteerId
-        ).join(
-            AvailableSlot, AvailableSlot.Id == ReservationRequest.SlotId
-        ).join(
-            Cats, Cats.Id == AvailableSlot.CatId
-        )
-
-        # Apply filters based on user_id and status
-        if user_id:
-            query = query.filter(ReservationRequest.VolunteerId == user_id)
-        else:
-            query = query.filter(ReservationRequest.Status == WalkRequestStatus.PENDING.value)
-
-        # Execute the query
-        reservations = query.order_by(
-            AvailableSlot.StartTime.desc()  # Sort by start time
-        ).all()
-
-        # Format the response
-        reservations_list = [
-            {
-                "reservation_id": r.reservation_id,
-                "volunteer_username": r.volunteer_username,
-                "volunteer_full_name": r.volunteer_full_name,
-                "volunteer_email": r.volunteer_email,
-                "cat_id": r.cat_id,
-                "cat_name": r.cat_name,
-                "slot_id": r.slot_id,
-                "start_time": r.start_time.strftime('%Y-%m-%d %H:%M'),
-                "end_time": r.end_time.strftime('%Y-%m-%d %H:%M'),
-                "reservation_status": r.reservation_status
-            }
-            for r in reservations
-        ]
-
-        return jsonify(reservations_list)
+        # Without a volunteer only pending reservations waiting for approval are listed
+        statuses = None if request.args.get('user_id', type=int) else [WalkRequestStatus.PENDING.value]
+        return overview_response(OVERVIEW_FIELDS, statuses=statuses, descending=True)
 
 
 class ReservationOverviewOngoing(Resource):
     @swag_from({
         'tags': ['Reservations'],
         'summary': 'Get a sorted list of ongoing reservations by start time',
+        'parameters': OVERVIEW_PARAMETERS,
         'responses': {
             200: {
                 'description': 'Successfully retrieved and sorted reservations',
@@ -445,55 +530,15 @@ class ReservationOverviewOngoing(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-
-        # Query the database and sort by AvailableSlot.StartTime
-        reservations = db.session.query(
-            ReservationRequest.Id.label('reservation_id'),
-            User.Username.label('volunteer_username'),
-            db.func.concat(User.FirstName, ' ', User.LastName).label('volunteer_full_name'),
-            Cats.Name.label('cat_name'),
-            AvailableSlot.StartTime.label('start_time'),
-            AvailableSlot.EndTime.label('end_time'),
-            AvailableSlot.Id.label('slot_id'),
-            ReservationRequest.Status.label('reservation_status')
-        ).join(
-            User, User.Id == ReservationRequest.VolunteerId
-        ).join(
-            AvailableSlot, AvailableSlot.Id == ReservationRequest.SlotId
-        ).join(
-            Cats, Cats.Id == AvailableSlot.CatId
-         ).filter(
-            ReservationRequest.Status.in_([WalkRequestStatus.APPROVED.value, WalkRequestStatus.IN_PROGRESS.value, WalkRequestStatus.PENDING.value])  # Filter by status 2 or 3
-        ).order_by(
-            AvailableSlot.StartTime  # Sort by start time
-        ).all()
-
-        # Format the response
-        reservations_list = [
-            {
-                "reservation_id": r.reservation_id,
-                "volunteer_username": r.volunteer_username,
-                "volunteer_full_name": r.volunteer_full_name,
-                "cat_name": r.cat_name,
-                "start_time": r.start_time.strftime('%Y-%m-%d %H:%M'),
-                "end_time": r.end_time.strftime('%Y-%m-%d %H:%M'),
-                "reservation_status": r.reservation_status,
-                "slot_id": r.slot_id
-            }
-            for r in reservations
-        ]
-
-        return jsonify(reservations_list)
+        return overview_response(SORTED_OVERVIEW_FIELDS, statuses=ACTIVE_STATUSES)
     
 class ReservationOverviewSorted(Resource):
     @swag_from({
         'tags': ['Reservations'],
         'summary': 'Get a sorted list of concluded reservations by start time',
+        'parameters': OVERVIEW_PARAMETERS,
         'responses': {
             200: {
                 'description': 'Successfully retrieved and sorted reservations',
@@ -519,47 +564,6 @@ class ReservationOverviewSorted(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-
-        # Query the database and sort by AvailableSlot.StartTime
-        reservations = db.session.query(
-            ReservationRequest.Id.label('reservation_id'),
-            User.Username.label('volunteer_username'),
-            db.func.concat(User.FirstName, ' ', User.LastName).label('volunteer_full_name'),
-            Cats.Name.label('cat_name'),
-            AvailableSlot.StartTime.label('start_time'),
-            AvailableSlot.EndTime.label('end_time'),
-            AvailableSlot.Id.label('slot_id'),
-            ReservationRequest.Status.label('reservation_status')
-        ).join(
-            User, User.Id == ReservationRequest.VolunteerId
-        ).join(
-            AvailableSlot, AvailableSlot.Id == ReservationRequest.SlotId
-        ).join(
-            Cats, Cats.Id == AvailableSlot.CatId
-         ).filter(
-            ~ReservationRequest.Status.in_([WalkRequestStatus.APPROVED.value, WalkRequestStatus.IN_PROGRESS.value, WalkRequestStatus.PENDING.value])  # Filter by status 2 or 3
-        ).order_by(
-            AvailableSlot.StartTime.desc()  # Sort by start time
-        ).all()
-
-        # Format the response
-        reservations_list = [
-            {
-                "reservation_id": r.reservation_id,
-                "volunteer_username": r.volunteer_username,
-                "volunteer_full_name": r.volunteer_full_name,
-                "cat_name": r.cat_name,
-                "start_time": r.start_time.strftime('%Y-%m-%d %H:%M'),
-                "end_time": r.end_time.strftime('%Y-%m-%d %H:%M'),
-                "reservation_status": r.reservation_status,
-                "slot_id": r.slot_id
-            }
-            for r in reservations
-        ]
-
-        return jsonify(reservations_list)
+        return overview_response(SORTED_OVERVIEW_FIELDS, statuses=CONCLUDED_STATUSES, descending=True)
@@ -1,10 +1,11 @@
 from flasgger import swag_from
 from flask import jsonify, make_response
-from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource, reqparse
 from models.Enums import Roles
 from models.Cat import Species
 from models.database import db
+from services.authorization import roles_required
+from services.response_cache import response_cache
 
 species_parser = reqparse.RequestParser()
 species_parser.add_argument('name', required=True, help="Name cannot be blank.")
@@ -29,6 +30,7 @@ class SpeciesList(Resource):
             }
         }
     })
+    @response_cache.cached('species')
     def get(self): # Get all species
         species = Species.query.all()
         species_list = [
@@ -74,12 +76,14 @@ class SpeciesList(Resource):
             }
         ]
     })
+    @roles_required(*allowed_roles)
     def post(self): # Create a new species
         args = species_parser.parse_args()
         new_species = Species(
             Name = args['name']
         )
         db.session.add(new_species)
+        response_cache.invalidate('species')
         db.session.commit()
         return {"msg": "Species created successfully"}, 201
 
@@ -152,17 +156,14 @@ class SpeciesById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def delete(self, species_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-        
         species = Species.query.get(species_id)
         if not species:
             return {"msg": "Species not found"}, 404
 
         db.session.delete(species)
+        response_cache.invalidate('species')
         db.session.commit()
         return {"msg": "Species deleted successfully"}, 200
     
@@ -212,17 +213,14 @@ class SpeciesById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(*allowed_roles)
     def put(self, species_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in allowed_roles:
-            return {"msg": "Unauthorized access"}, 401
-        
         species = Species.query.get(species_id)
         if not species:
             return {"msg": "Species not found"}, 404
 
         args = species_parser.parse_args()
         species.Name = args['name']
+        response_cache.invalidate('species')
         db.session.commit()
         return {"msg": "Species updated successfully"}, 200
@@ -0,0 +1,222 @@
+from flasgger import swag_from
+from flask import request
+from flask_restful import Resource
+from models.Cat import Cats
+from models.Enums import Roles
+from models.ReservationStats import CatWalkStats, VolunteerWalkStats, WeeklySlotStats
+from models.User import User
+from models.database import db
+from services.authorization import roles_required
+from services.projection import select_rows
+from services.reservation_query import MAX_PAGE_SIZE, InvalidQuery, parse_date
+from services.serialization import RowEncoder, date_text, minute_text
+
+# Served from materialized views refreshed every RESERVATION_STATS_REFRESH_SECONDS (services/reservation_stats.py),
+# a request reads one row per cat / volunteer / week whatever the size of the reservation history
+
+
+def cancellation_rate(row):
+    return round(row.Cancelled / row.Reservations, 4) if row.Reservations else 0.0
+
+
+def utilisation(row):
+    return round(row.BookedSlots / row.Slots, 4) if row.Slots else 0.0
+
+
+cat_stats_encoder = RowEncoder(
+    cat_id='CatId',
+    cat_name='Name',
+    walks='Walks',
+    reservations='Reservations',
+    cancelled='Cancelled',
+    cancellation_rate=cancellation_rate,
+    last_walk=('LastWalk', minute_text)
+)
+volunteer_stats_encoder = RowEncoder(
+    volunteer_id='VolunteerId',
+    volunteer_username='Username',
+    volunteer_full_name=lambda row: f'{row.FirstName} {row.LastName}',
+    walks='Walks',
+    reservations='Reservations',
+    cancelled='Cancelled',
+    cancellation_rate=cancellation_rate,
+    last_walk=('LastWalk', minute_text)
+)
+weekly_stats_encoder = RowEncoder(
+    week=('Week', date_text),
+    slots='Slots',
+    booked_slots='BookedSlots',
+    utilisation=utilisation,
+    walks='Walks',
+    reservations='Reservations',
+    cancelled='Cancelled',
+    cancellation_rate=cancellation_rate
+)
+
+LIMIT_PARAMETER = {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+                   'description': f'Only the first rows by walks (max {MAX_PAGE_SIZE})'}
+
+
+def parse_limit():
+    limit = request.args.get('limit', type=int)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise InvalidQuery(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+class CatWalkStatsList(Resource):
+    @swag_from({
+        'tags': ['Statistics'],
+        'summary': 'Walks, reservations and cancellations per cat, most walked first (Admin only)',
+        'parameters': [LIMIT_PARAMETER],
+        'responses': {
+            200: {
+                'description': 'Statistics of every cat with at least one reservation',
+                'examples': {
+                    'application/json': [
+                        {
+                            'cat_id': 1,
+                            'cat_name': 'Whiskers',
+                            'walks': 42,
+                            'reservations': 50,
+                            'cancelled': 5,
+                            'cancellation_rate': 0.1,
+                            'last_walk': '2024-11-25 10:00'
+                        }
+                    ]
+                }
+            },
+            400: {
+                'description': 'Invalid parameters',
+                'examples': {
+                    'application/json': {'msg': 'limit must be between 1 and 500'}
+                }
+            },
+            401: {
+                'description': 'Admin access required',
+                'examples': {
+                    'application/json': {'msg': 'Admin access required'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def get(self):
+        try:
+            limit = parse_limit()
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        rows = select_rows(
+            db.select(CatWalkStats, Cats.Name)
+            .join(Cats, Cats.Id == CatWalkStats.c.CatId)
+            .order_by(CatWalkStats.c.Walks.desc(), CatWalkStats.c.CatId)
+            .limit(limit)
+        )
+        return cat_stats_encoder.many(rows), 200
+
+
+class VolunteerWalkStatsList(Resource):
+    @swag_from({
+        'tags': ['Statistics'],
+        'summary': 'Walks, reservations and cancellations per volunteer, most walks first (Admin only)',
+        'parameters': [LIMIT_PARAMETER],
+        'responses': {
+            200: {
+                'description': 'Statistics of every volunteer with at least one reservation',
+                'examples': {
+                    'application/json': [
+                        {
+                            'volunteer_id': 7,
+                            'volunteer_username': 'john_doe',
+                            'volunteer_full_name': 'John Doe',
+                            'walks': 18,
+                            'reservations': 20,
+                            'cancelled': 1,
+                            'cancellation_rate': 0.05,
+                            'last_walk': '2024-11-25 10:00'
+                        }
+                    ]
+                }
+            },
+            400: {
+                'description': 'Invalid parameters',
+                'examples': {
+                    'application/json': {'msg': 'limit must be between 1 and 500'}
+                }
+            },
+            401: {
+                'description': 'Admin access required',
+                'examples': {
+                    'application/json': {'msg': 'Admin access required'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def get(self):
+        try:
+            limit = parse_limit()
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        rows = select_rows(
+            db.select(VolunteerWalkStats, User.Username, User.FirstName, User.LastName)
+            .join(User, User.Id == VolunteerWalkStats.c.VolunteerId)
+            .order_by(VolunteerWalkStats.c.Walks.desc(), VolunteerWalkStats.c.VolunteerId)
+            .limit(limit)
+        )
+        return volunteer_stats_encoder.many(rows), 200
+
+
+class WeeklySlotStatsList(Resource):
+    @swag_from({
+        'tags': ['Statistics'],
+        'summary': 'Slot utilisation, walks and cancellations per week (Admin only)',
+        'parameters': [
+            {'name': 'date_from', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Weeks starting on or after this date (YYYY-MM-DD)'},
+            {'name': 'date_to', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Weeks starting before this date (YYYY-MM-DD)'},
+        ],
+        'responses': {
+            200: {
+                'description': 'One entry per week (starting Monday) with at least one slot, in date order',
+                'examples': {
+                    'application/json': [
+                        {
+                            'week': '2024-11-25',
+                            'slots': 40,
+                            'booked_slots': 31,
+                            'utilisation': 0.775,
+                            'walks': 28,
+                            'reservations': 36,
+                            'cancelled': 3,
+                            'cancellation_rate': 0.0833
+                        }
+                    ]
+                }
+            },
+            400: {
+                'description': 'Invalid parameters',
+                'examples': {
+                    'application/json': {'msg': 'Invalid date format. Use YYYY-MM-DD.'}
+                }
+            },
+            401: {
+                'description': 'Admin access required',
+                'examples': {
+                    'application/json': {'msg': 'Admin access required'}
+                }
+            }
+        }
+    })
+    @roles_required(Roles.ADMIN, msg="Admin access required")
+    def get(self):
+        try:
+            date_from = parse_date(request.args.get('date_from'))
+            date_to = parse_date(request.args.get('date_to'))
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        query = db.select(WeeklySlotStats).order_by(WeeklySlotStats.c.Week)
+        if date_from:
+            query = query.where(WeeklySlotStats.c.Week >= date_from.date())
+        if date_to:
+            query = query.where(WeeklySlotStats.c.Week < date_to.date())
+        return weekly_stats_encoder.many(select_rows(query)), 200
@@ -1,10 +1,12 @@
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash
 from flasgger import swag_from
 from models.User import User, Veterinarian, Volunteer
 from models.Enums import Roles
 from models.database import db
+from services.passwords import PasswordHasherBusy, password_hasher
+from services.token_denylist import token_denylist
+from services.authorization import roles_required
+from services.projection import select_rows
 
 class UserById(Resource):
     @swag_from({
@@ -40,18 +42,16 @@ class UserById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, msg="Admin access required")
     def delete(self, user_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] != Roles.ADMIN.value:
-            return {"msg": "Admin access required"}, 401
-
         user = User.query.get(user_id)
         if not user:
             return {"msg": "User not found"}, 404
 
         db.session.delete(user)
+        revocation = token_denylist.revoke_user(user_id, access_only=False)
         db.session.commit()
+        token_denylist.applied(revocation)
         return {"msg": "User deleted successfully"}, 200
     
     @swag_from({
@@ -87,12 +87,8 @@ class UserById(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin access required", status=403)
     def put(self, user_id):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {"msg": "Admin access required"}, 403
-
         user = User.query.get(user_id)
         if not user:
             return {"msg": "User not found"}, 404
@@ -140,11 +136,17 @@ class UserById(Resource):
             user.LastName = args['LastName']
         if args['Email']:
             user.Email = args['Email']
+        revocation = None
         if args['role'] is not None:
+            # Access tokens carry the role, the old ones must stop working; a refresh picks up the new role
+            if args['role'] != user.role:
+                revocation = token_denylist.revoke_user(user.Id)
             user.role = args['role']
 
         # Commit changes to the database
         db.session.commit()
+        if revocation is not None:
+            token_denylist.applied(revocation)
         return {"msg": "User updated successfully"}, 200
 
 class UserList(Resource):
@@ -185,14 +187,18 @@ class UserList(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, msg="Admin access required")
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] != Roles.ADMIN.value:
-            return {"msg": "Admin access required"}, 401
-
-        # Retrieve all users
-        users = User.query.all()
+        # Retrieve all users with their vet / volunteer details in one query
+        users = select_rows(
+            db.select(
+                User.Id, User.Username, User.FirstName, User.LastName, User.Email, User.role,
+                Veterinarian.UserId.label('vet_id'), Veterinarian.Specialization, Veterinarian.Telephone,
+                Volunteer.UserId.label('volunteer_id'), Volunteer.verified
+            )
+            .outerjoin(Veterinarian, Veterinarian.UserId == User.Id)
+            .outerjoin(Volunteer, Volunteer.UserId == User.Id)
+        )
         users_data = []
 
         for user in users:
@@ -206,14 +212,12 @@ class UserList(Resource):
             }
 
             # Check if the user is a veterinarian
-            veterinarian = Veterinarian.query.filter_by(UserId=user.Id).first()
-            if veterinarian:
-                user_data["Specialization"] = veterinarian.Specialization
-                user_data["Telephone"] = veterinarian.Telephone
+            if user.vet_id is not None:
+                user_data["Specialization"] = user.Specialization
+                user_data["Telephone"] = user.Telephone
             # Check if the user is a volunteer
-            volunteer = Volunteer.query.filter_by(UserId=user.Id).first()
-            if volunteer:
-                user_data["verified"] = volunteer.verified
+            if user.volunteer_id is not None:
+                user_data["verified"] = user.verified
 
             users_data.append(user_data)
 
@@ -264,12 +268,8 @@ class UserList(Resource):
             }
         ]
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, msg="Admin access required")
     def post(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] != Roles.ADMIN.value:
-            return {"msg": "Admin access required"}, 401
-
         parser = reqparse.RequestParser()
         parser.add_argument('username', required=True, help="Username cannot be blank.")
         parser.add_argument('email', required=True, help="Email cannot be blank.")
@@ -285,7 +285,10 @@ class UserList(Resource):
         if User.query.filter_by(Username=args['username']).first():
             return {"msg": "Username already exists"}, 409
 
-        hashed_password = generate_password_hash(args['password'])
+        try:
+            hashed_password = password_hasher.hash(args['password'])
+        except PasswordHasherBusy:
+            return {"msg": "Server is busy, try again later"}, 503
         new_user = User(
             Username=args['username'],
             Email=args['email'],
@@ -353,12 +356,8 @@ class UnverifiedVolunteers(Resource):
             }
         }
     })
-    @jwt_required()
+    @roles_required(Roles.ADMIN, Roles.CAREGIVER, msg="Admin or caregiver access required", status=403)
     def get(self):
-        current_user = get_jwt_identity()
-        if current_user['role'] not in [Roles.ADMIN.value, Roles.CAREGIVER.value]:
-            return {"msg": "Admin or caregiver access required"}, 403
-
         volunteers = User.query.join(Volunteer, User.Id == Volunteer.UserId).filter(Volunteer.verified == False).all()
         volunteers_data = []
 
@@ -0,0 +1,243 @@
+from flasgger import swag_from
+from flask import jsonify, request
+from flask_restful import Resource
+from models.AvailableSlot import AvailableSlot
+from models.Cat import Cats
+from models.Enums import Roles
+from models.ReservationRequest import ReservationRequest
+from models.User import User
+from models.VolunteerActivity import VolunteerCatWalks, VolunteerSummary
+from models.database import db
+from services.authorization import roles_required
+from services.projection import select_rows
+from services.reservation_query import MAX_PAGE_SIZE
+from services.serialization import RowEncoder, date_text, minute_text
+
+# Summaries come from the volunteersummaries / volunteercatwalks aggregates that the reservation trigger keeps
+# current, and the history is read a page at a time, so none of this grows with the length of a volunteer's history
+
+allowed_roles = [Roles.ADMIN.value, Roles.CAREGIVER.value, Roles.VERIFIED_VOLUNTEER.value]
+FAVOURITE_CATS = 3
+DEFAULT_PAGE_SIZE = 50
+
+summary_encoder = RowEncoder(
+    volunteer_id='Id',
+    volunteer_username='Username',
+    volunteer_full_name=lambda row: f'{row.FirstName} {row.LastName}',
+    completed=lambda row: row.Completed or 0,
+    cancelled=lambda row: row.Cancelled or 0,
+    reservations=lambda row: row.Reservations or 0,
+    last_walk=('LastWalk', minute_text)
+)
+favourite_encoder = RowEncoder(
+    cat_id='CatId',
+    cat_name='Name',
+    walks='Walks',
+    last_walk=('LastWalk', minute_text)
+)
+history_encoder = RowEncoder(
+    reservation_id='Id',
+    cat_id='CatId',
+    cat_name='Name',
+    slot_id='SlotId',
+    start_time=('StartTime', minute_text),
+    end_time=('EndTime', minute_text),
+    request_date=('RequestDate', date_text),
+    reservation_status='Status'
+)
+
+SUMMARY_EXAMPLE = {
+    'volunteer_id': 7,
+    'volunteer_username': 'john_doe',
+    'volunteer_full_name': 'John Doe',
+    'completed': 18,
+    'cancelled': 1,
+    'reservations': 20,
+    'last_walk': '2024-11-25 10:00'
+}
+
+
+def parse_limit(default=None):
+    limit = request.args.get('limit', default, type=int)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+class VolunteerSummaryById(Resource):
+    @swag_from({
+        'tags': ['Volunteers'],
+        'summary': "A volunteer's walk counts, last walk and most walked cats",
+        'parameters': [
+            {'name': 'user_id', 'in': 'path', 'type': 'integer', 'required': True}
+        ],
+        'responses': {
+            200: {
+                'description': 'Summary of the volunteer',
+                'examples': {
+                    'application/json': dict(SUMMARY_EXAMPLE, favourite_cats=[
+                        {'cat_id': 1, 'cat_name': 'Whiskers', 'walks': 9, 'last_walk': '2024-11-25 10:00'}
+                    ])
+                }
+            },
+            404: {
+                'description': 'User not found',
+                'examples': {
+                    'application/json': {'msg': 'User not found'}
+                }
+            },
+            401: {
+                'description': 'Unauthorized access',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized access'}
+                }
+            }
+        }
+    })
+    @roles_required(*allowed_roles)
+    def get(self, user_id):
+        # Volunteers without any reservation have no summary row yet, they show up with zeros
+        rows = select_rows(
+            db.select(
+                User.Id, User.Username, User.FirstName, User.LastName,
+                VolunteerSummary.Completed, VolunteerSummary.Cancelled, VolunteerSummary.Reservations, VolunteerSummary.LastWalk
+            ).outerjoin(VolunteerSummary, VolunteerSummary.VolunteerId == User.Id)
+            .where(User.Id == user_id)
+        )
+        if not rows:
+            return {"msg": "User not found"}, 404
+
+        summary = summary_encoder(rows[0])
+        summary['favourite_cats'] = favourite_encoder.many(select_rows(
+            db.select(VolunteerCatWalks.CatId, Cats.Name, VolunteerCatWalks.Walks, VolunteerCatWalks.LastWalk)
+            .join(Cats, Cats.Id == VolunteerCatWalks.CatId)
+            .where(VolunteerCatWalks.VolunteerId == user_id)
+            .order_by(VolunteerCatWalks.Walks.desc(), VolunteerCatWalks.CatId)
+            .limit(FAVOURITE_CATS)
+        ))
+        return summary, 200
+
+
+class VolunteerLeaderboard(Resource):
+    @swag_from({
+        'tags': ['Volunteers'],
+        'summary': 'Volunteers with the most completed walks',
+        'parameters': [
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+             'description': f'Number of volunteers (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})'}
+        ],
+        'responses': {
+            200: {
+                'description': 'Volunteers ordered by completed walks',
+                'examples': {
+                    'application/json': [SUMMARY_EXAMPLE]
+                }
+            },
+            400: {
+                'description': 'Invalid parameters',
+                'examples': {
+                    'application/json': {'msg': 'limit must be between 1 and 500'}
+                }
+            },
+            401: {
+                'description': 'Unauthorized access',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized access'}
+                }
+            }
+        }
+    })
+    @roles_required(*allowed_roles)
+    def get(self):
+        try:
+            limit = parse_limit(DEFAULT_PAGE_SIZE)
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        # Driven by ix_volunteersummariescompleted, reads only the top rows
+        rows = select_rows(
+            db.select(
+                User.Id, User.Username, User.FirstName, User.LastName,
+                VolunteerSummary.Completed, VolunteerSummary.Cancelled, VolunteerSummary.Reservations, VolunteerSummary.LastWalk
+            ).join(User, User.Id == VolunteerSummary.VolunteerId)
+            .order_by(VolunteerSummary.Completed.desc(), VolunteerSummary.VolunteerId.desc())
+            .limit(limit)
+        )
+        return summary_encoder.many(rows), 200
+
+
+class VolunteerHistory(Resource):
+    @swag_from({
+        'tags': ['Volunteers'],
+        'summary': "A volunteer's reservations, newest first, one page at a time",
+        'parameters': [
+            {'name': 'user_id', 'in': 'path', 'type': 'integer', 'required': True},
+            {'name': 'status', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Comma separated reservation statuses'},
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+             'description': f'Page size (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE}), the next page cursor is returned in the X-Next-Cursor header'},
+            {'name': 'cursor', 'in': 'query', 'type': 'integer', 'required': False, 'description': 'Cursor from the X-Next-Cursor header of the previous page'},
+        ],
+        'responses': {
+            200: {
+                'description': 'One page of reservations',
+                'examples': {
+                    'application/json': [
+                        {
+                            'reservation_id': 120,
+                            'cat_id': 1,
+                            'cat_name': 'Whiskers',
+                            'slot_id': 310,
+                            'start_time': '2024-11-25 10:00',
+                            'end_time': '2024-11-25 11:00',
+                            'request_date': '2024-11-20',
+                            'reservation_status': 3
+                        }
+                    ]
+                }
+            },
+            400: {
+                'description': 'Invalid parameters',
+                'examples': {
+                    'application/json': {'msg': 'limit must be between 1 and 500'}
+                }
+            },
+            401: {
+                'description': 'Unauthorized access',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized access'}
+                }
+            }
+        }
+    })
+    @roles_required(*allowed_roles)
+    def get(self, user_id):
+        try:
+            limit = parse_limit(DEFAULT_PAGE_SIZE)
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        try:
+            cursor = request.args.get('cursor')
+            cursor = int(cursor) if cursor else None
+            status = request.args.get('status')
+            statuses = [int(s) for s in status.split(',')] if status else None
+        except ValueError:
+            return {"msg": "Invalid cursor or status"}, 400
+
+        # Keyset on the reservation id: ix_reservationrequestsvolunteerid walks the volunteer's reservations
+        # newest first and stops after one page, the slots and cats are fetched by primary key for that page only
+        query = db.select(
+            ReservationRequest.Id, AvailableSlot.CatId, Cats.Name, ReservationRequest.SlotId, AvailableSlot.StartTime,
+            AvailableSlot.EndTime, ReservationRequest.RequestDate, ReservationRequest.Status
+        ).join(AvailableSlot, AvailableSlot.Id == ReservationRequest.SlotId) \
+            .join(Cats, Cats.Id == AvailableSlot.CatId) \
+            .where(ReservationRequest.VolunteerId == user_id)
+        if statuses is not None:
+            query = query.where(ReservationRequest.Status.in_(statuses))
+        if cursor is not None:
+            query = query.where(ReservationRequest.Id < cursor)
+        # One extra row tells whether there is a next page
+        rows = select_rows(query.order_by(ReservationRequest.Id.desc()).limit(limit + 1))
+
+        response = jsonify(history_encoder.many(rows[:limit]))
+        if len(rows) > limit:
+            response.headers['X-Next-Cursor'] = str(rows[limit - 1].Id)
+        return response
@@ -0,0 +1,117 @@
+from flasgger import swag_from
+from flask import jsonify
+from flask_restful import Resource
+from models.Enums import Roles
+from models.SlotWaitlist import SlotWaitlist
+from models.User import User
+from models.database import db
+from services.events import event_bus
+from services.waitlist import waitlist_position
+from services.authorization import roles_required, current_identity
+
+allowed_roles = [Roles.ADMIN.value, Roles.VERIFIED_VOLUNTEER.value, Roles.CAREGIVER.value]
+
+class SlotWaitlistById(Resource):
+    @swag_from({
+        'tags': ['Available Slots'],
+        'summary': 'Get the waitlist of a slot (caregivers) or your position in it (volunteers)',
+        'parameters': [
+            {
+                'name': 'slot_id',
+                'in': 'path',
+                'type': 'integer',
+                'required': True
+            }
+        ],
+        'responses': {
+            200: {
+                'description': 'Successfully retrieved the waitlist',
+                'examples': {
+                    'application/json': [
+                        {
+                            'position': 1,
+                            'volunteer_id': 3,
+                            'volunteer_username': 'john_doe',
+                            'created_at': '2024-11-25 10:00'
+                        }
+                    ]
+                }
+            },
+            401: {
+                'description': 'Unauthorized user',
+                'examples': {
+                    'application/json': {'msg': 'Unauthorized user'}
+                }
+            },
+            404: {
+                'description': 'Not on the waitlist',
+                'examples': {
+                    'application/json': {'msg': 'Not on the waitlist'}
+                }
+            }
+        }
+    })
+    @roles_required(*allowed_roles, msg="Unauthorized user")
+    def get(self, slot_id):
+        current_user = current_identity()
+
+        if current_user['role'] == Roles.VERIFIED_VOLUNTEER.value:
+            entry = SlotWaitlist.query.filter_by(SlotId=slot_id, VolunteerId=current_user['user_id']).first()
+            if entry is None:
+                return {'msg': 'Not on the waitlist'}, 404
+            return {'position': waitlist_position(slot_id, entry.Id)}, 200
+
+        entries = db.session.query(
+            SlotWaitlist.VolunteerId, SlotWaitlist.CreatedAt, User.Username
+        ).join(
+            User, User.Id == SlotWaitlist.VolunteerId
+        ).filter(
+            SlotWaitlist.SlotId == slot_id
+        ).order_by(SlotWaitlist.Id).all()
+
+        return jsonify([
+            {
+                'position': position,
+                'volunteer_id': e.VolunteerId,
+                'volunteer_username': e.Username,
+                'created_at': e.CreatedAt.strftime('%Y-%m-%d %H:%M')
+            }
+            for position, e in enumerate(entries, start=1)
+        ])
+
+    @swag_from({
+        'tags': ['Available Slots'],
+        'summary': 'Leave the waitlist of a slot',
+        'parameters': [
+            {
+                'name': 'slot_id',
+                'in': 'path',
+                'type': 'integer',
+                'required': True
+            }
+        ],
+        'responses': {
+            200: {
+                'description': 'Removed from the waitlist',
+                'examples': {
+                    'application/json': {'msg': 'Removed from the waitlist'}
+                }
+            },
+            404: {
+                'description': 'Not on the waitlist',
+                'examples': {
+                    'application/json': {'msg': 'Not on the waitlist'}
+                }
+            }
+        }
+    })
+    @roles_required(*allowed_roles, msg="Unauthorized user")
+    def delete(self, slot_id):
+        current_user = current_identity()
+
+        deleted = SlotWaitlist.query.filter_by(SlotId=slot_id, VolunteerId=current_user['user_id']).delete()
+        if not deleted:
+            return {'msg': 'Not on the waitlist'}, 404
+        event_bus.publish('waitlist.left', slot_id=slot_id, volunteer_id=current_user['user_id'])
+        db.session.commit()
+        return {'msg': 'Removed from the waitlist'}, 200
@@ -0,0 +1,90 @@
+import logging
+import os
+from config import load_config
+
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Worker and thread counts follow from the CPUs available to the container and from the database pool,
+# so that all workers together never open more Postgres connections than DB_CONNECTION_BUDGET.
+# Every setting can still be forced through its environment variable.
+#
+# Reloads: `kill -HUP <master pid>` replaces the workers one by one with the current settings, requests in
+# flight finish within graceful_timeout. The app is preloaded, so new code needs a new master:
+# `kill -USR2 <master pid>` starts one next to the old one, then `kill -QUIT <old master pid>`.
+
+logger = logging.getLogger('gunicorn.error')
+settings = load_config()
+
+
+def available_cpus():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # A cgroup CPU quota (docker --cpus) limits us further than the visible cores
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+# Pool connections plus the detached LISTEN connection of the event bus
+connections_per_worker = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW + 1
+connection_budget = int(os.environ.get('DB_CONNECTION_BUDGET', 80))  # Postgres max_connections minus headroom for admin / migrations
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or max(1, min(2 * available_cpus() + 1, connection_budget // connections_per_worker))
+# A thread holds at most one connection, so a worker never waits for the pool with WORKER_THREADS threads.
+# An SSE stream gives its connection back but keeps its thread for as long as the client listens, so the
+# streams get their own EVENTS_MAX_STREAMS threads on top and cannot starve the other requests.
+worker_class = 'gthread'
+threads = settings.WORKER_THREADS + settings.EVENTS_MAX_STREAMS
+
+preload_app = True  # Import, Swagger and route setup run once in the master, workers are forked from it
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# Replace workers after a number of requests, spread out so they do not all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None  # Empty turns the access log off
+
+
+def on_starting(server):
+    logger.info(
+        'Starting %d workers x %d threads (%d for event streams), up to %d database connections',
+        workers, threads, settings.EVENTS_MAX_STREAMS, workers * connections_per_worker
+    )
+    if settings.METRICS_DIR:
+        from services.metrics import metrics
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        metrics.directory = settings.METRICS_DIR
+        metrics.clear()
+
+
+def post_fork(server, worker):
+    from App import start_background_services
+    from models.database import db
+    from wsgi import app
+
+    with app.app_context():
+        # Connections opened in the master must not be shared with the workers
+        db.engine.dispose(close=False)
+    start_background_services(app)
+
+
+def worker_exit(server, worker):
+    from services.metrics import metrics
+    if metrics.directory:
+        metrics.flush()
+
+
+def child_exit(server, worker):
+    # Keep the counters of the finished worker in the totals
+    if settings.METRICS_DIR:
+        from services.metrics import metrics
+        metrics.mark_process_dead(worker.pid, settings.METRICS_DIR)
@@ -0,0 +1,60 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool, text
+from config import load_config
+from models.database import db
+import models.AvailableSlot, models.Cat, models.ExaminationRequest, models.HealthRecord, models.ReservationRequest  # noqa: F401
+import models.SlotWaitlist, models.TokenRevocation, models.User, models.VolunteerActivity  # noqa: F401
+
+SCHEMA = 'utulek'
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name)
+
+url = load_config().SQLALCHEMY_DATABASE_URI
+
+
+def include_name(name, type_, parent_names):
+    # Autogenerate only looks at the utulek schema
+    if type_ == 'schema':
+        return name == SCHEMA
+    return True
+
+
+def configure(**kwargs):
+    context.configure(
+        target_metadata=db.metadata,
+        version_table_schema=SCHEMA,
+        include_schemas=True,
+        include_name=include_name,
+        **kwargs
+    )
+
+
+def run_migrations_offline():
+    configure(url=url, literal_binds=True, dialect_opts={'paramstyle': 'named'})
+    with context.begin_transaction():
+        context.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # A separate engine without the app's pool settings: index builds on large tables need longer than the
+    # statement_timeout the app runs with
+    engine = create_engine(url, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        # The version table lives in the schema, it must exist before the first migration
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}'))
+        connection.execute(text('SET statement_timeout = 0'))
+        # Wait for locks only briefly instead of queueing every query on the table behind the migration
+        connection.execute(text("SET lock_timeout = '10s'"))
+        connection.commit()
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
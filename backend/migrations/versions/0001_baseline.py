@@ -0,0 +1,124 @@
+"""Baseline: the utulek schema as created by the original CreateDb.sql
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-20
+
+Databases created by hand from the original CreateDb.sql (the tables and foreign keys only) already have all of
+this, mark them with `alembic stamp 0001`. What was added to the script later comes with 0001a.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SCHEMA = 'utulek'
+
+
+def upgrade():
+    op.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+
+    op.create_table(
+        'users',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('Username', sa.String(30), nullable=False),
+        sa.Column('Hashed_pass', sa.String(200), nullable=False),
+        sa.Column('FirstName', sa.String(30), nullable=False),
+        sa.Column('LastName', sa.String(30), nullable=False),
+        sa.Column('Email', sa.String(50), nullable=False),
+        sa.Column('role', sa.SmallInteger, nullable=False),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'volunteers',
+        sa.Column('UserId', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('verified', sa.Boolean, nullable=False),
+        sa.ForeignKeyConstraint(['UserId'], [f'{SCHEMA}.users.Id'], name='fk_volunteersusers'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'vets',
+        sa.Column('UserId', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('Specialization', sa.String(30), nullable=False),
+        sa.Column('Telephone', sa.String(20), nullable=False),
+        sa.ForeignKeyConstraint(['UserId'], [f'{SCHEMA}.users.Id'], name='fk_vetsusers'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'species',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('Name', sa.String(30), nullable=False),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'cats',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('Name', sa.String(30), nullable=False),
+        sa.Column('SpeciesId', sa.BigInteger, nullable=False),
+        sa.Column('Age', sa.SmallInteger, nullable=False),
+        sa.Column('Description', sa.String(100), nullable=False),
+        sa.Column('Found', sa.Date, nullable=False),
+        sa.ForeignKeyConstraint(['SpeciesId'], [f'{SCHEMA}.species.Id'], name='fk_catsspecies'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'catphotos',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('CatId', sa.BigInteger, nullable=False),
+        sa.Column('PhotoUrl', sa.String(100), nullable=False),
+        sa.ForeignKeyConstraint(['CatId'], [f'{SCHEMA}.cats.Id'], name='fk_catphotoscats'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'healthrecords',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('CatId', sa.BigInteger, nullable=False),
+        sa.Column('Date', sa.Date, nullable=False),
+        sa.Column('Description', sa.String(200), nullable=False),
+        sa.Column('UserId', sa.BigInteger, nullable=False),
+        sa.ForeignKeyConstraint(['CatId'], [f'{SCHEMA}.cats.Id'], name='fk_healthrecordscats'),
+        sa.ForeignKeyConstraint(['UserId'], [f'{SCHEMA}.users.Id'], name='fk_healthrecordsvets'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'examinationrequests',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('CatId', sa.BigInteger, nullable=False),
+        sa.Column('CaregiverId', sa.BigInteger, nullable=False),
+        sa.Column('RequestDate', sa.Date, nullable=False),
+        sa.Column('Description', sa.String(200), nullable=False),
+        sa.Column('Status', sa.SmallInteger, nullable=False),
+        sa.ForeignKeyConstraint(['CatId'], [f'{SCHEMA}.cats.Id'], name='fk_examinationrequestscats'),
+        sa.ForeignKeyConstraint(['CaregiverId'], [f'{SCHEMA}.users.Id'], name='fk_examinationrequestscaregivers'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'availableslots',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('CatId', sa.BigInteger, nullable=False),
+        sa.Column('StartTime', sa.DateTime, nullable=False),
+        sa.Column('EndTime', sa.DateTime, nullable=False),
+        sa.Column('Status', sa.SmallInteger, nullable=False),
+        sa.ForeignKeyConstraint(['CatId'], [f'{SCHEMA}.cats.Id'], name='fk_availableslotscats'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'reservationrequests',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('SlotId', sa.BigInteger, nullable=False),
+        sa.Column('VolunteerId', sa.BigInteger, nullable=False),
+        sa.Column('RequestDate', sa.Date, nullable=False),
+        sa.Column('Status', sa.SmallInteger, nullable=False),
+        sa.ForeignKeyConstraint(['SlotId'], [f'{SCHEMA}.availableslots.Id'], name='fk_reservationrequestsslots'),
+        sa.ForeignKeyConstraint(['VolunteerId'], [f'{SCHEMA}.users.Id'], name='fk_reservationrequestsvolunteers'),
+        schema=SCHEMA
+    )
+
+
+def downgrade():
+    for table in ('reservationrequests', 'availableslots', 'examinationrequests',
+                  'healthrecords', 'catphotos', 'cats', 'species', 'vets', 'volunteers', 'users'):
+        op.drop_table(table, schema=SCHEMA)
@@ -0,0 +1,94 @@
+"""Waitlist, token denylist, event ids and the scheduler / overview indexes
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2025-01-20
+
+What CreateDb.sql gained after the baseline: the slotwaitlist and tokenrevocations tables, the eventids sequence
+and the indexes of the reservation scheduler, the reservation overview, the waitlist queue and the denylist
+purge. Databases created by hand from the current CreateDb.sql already have these, mark them with
+`alembic stamp 0001a`.
+
+The indexes on reservationrequests and availableslots are built with CREATE INDEX CONCURRENTLY like those of
+0002, a database stamped 0001 already has its data in these tables.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+SCHEMA = 'utulek'
+
+# Indexes on the baseline tables: name -> (table, columns, included columns)
+INDEXES = {
+    # The reservation scheduler's next due state change
+    'ix_reservationrequestsstatusslot': ('reservationrequests', ['Status', 'SlotId'], None),
+    'ix_availableslotsstarttime': ('availableslots', ['StartTime'], None),
+    'ix_availableslotsendtime': ('availableslots', ['EndTime'], None),
+    # Covering indexes for the reservation overview join and its StartTime keyset
+    'ix_reservationrequestsslotcover': ('reservationrequests', ['SlotId'], ['Id', 'VolunteerId', 'Status']),
+    'ix_availableslotsstarttimecover': ('availableslots', ['StartTime', 'Id'], ['CatId', 'EndTime']),
+}
+
+
+def upgrade():
+    op.create_table(
+        'slotwaitlist',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('SlotId', sa.BigInteger, nullable=False),
+        sa.Column('VolunteerId', sa.BigInteger, nullable=False),
+        sa.Column('CreatedAt', sa.DateTime, nullable=False),
+        sa.UniqueConstraint('SlotId', 'VolunteerId'),
+        sa.ForeignKeyConstraint(['SlotId'], [f'{SCHEMA}.availableslots.Id'], name='fk_slotwaitlistslots', ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['VolunteerId'], [f'{SCHEMA}.users.Id'], name='fk_slotwaitlistvolunteers', ondelete='CASCADE'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'tokenrevocations',
+        sa.Column('Id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('Jti', sa.String(36), unique=True),
+        sa.Column('UserId', sa.BigInteger),
+        sa.Column('RevokedBefore', sa.BigInteger),
+        sa.Column('AccessOnly', sa.Boolean, nullable=False),
+        sa.Column('ExpiresAt', sa.DateTime, nullable=False),
+        schema=SCHEMA
+    )
+
+    # Ids of the change events sent through NOTIFY (see services/events.py)
+    op.execute(f'CREATE SEQUENCE {SCHEMA}.eventids')
+
+    op.create_index('ix_slotwaitlistslotqueue', 'slotwaitlist', ['SlotId', 'Id'], schema=SCHEMA)
+    op.create_index('ix_tokenrevocationsexpiresat', 'tokenrevocations', ['ExpiresAt'], schema=SCHEMA)
+
+    with op.get_context().autocommit_block():
+        for name, (table, columns, include) in INDEXES.items():
+            drop_invalid(name)
+            op.create_index(name, table, columns, schema=SCHEMA, postgresql_include=include,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name=INDEXES[name][0], schema=SCHEMA, postgresql_concurrently=True, if_exists=True)
+    for table in ('tokenrevocations', 'slotwaitlist'):
+        op.drop_table(table, schema=SCHEMA)
+    op.execute(f'DROP SEQUENCE {SCHEMA}.eventids')
+
+
+def drop_invalid(name):
+    # Left over by an interrupted concurrent build; IF NOT EXISTS would take it for a finished index
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = '{SCHEMA}' AND c.relname = '{name}' AND NOT i.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {SCHEMA}.{name}';
+            END IF;
+        END $$
+    """)
@@ -0,0 +1,66 @@
+"""Indexes for the foreign keys and filters the controllers query by
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2025-01-20
+
+Built with CREATE INDEX CONCURRENTLY, so the tables stay writable while this runs. Concurrent builds cannot
+run inside a transaction, every index is created in its own autocommit step. If a build fails (e.g. on the
+lock_timeout) Postgres leaves an INVALID index behind; it is dropped before the next attempt, so rerunning
+`alembic upgrade head` is enough.
+
+reservationrequests(SlotId) is not created again: ix_reservationrequestsslotcover from 0001a starts
+with SlotId and serves the same lookups.
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+SCHEMA = 'utulek'
+
+# name -> (table, columns)
+INDEXES = {
+    # Photos of a cat: cat detail, cat list, photo retrieve and the cascade on cat delete
+    'ix_catphotoscatid': ('catphotos', ['CatId']),
+    # Slots of a cat in time order, and the cascade on cat delete
+    'ix_availableslotscatstart': ('availableslots', ['CatId', 'StartTime']),
+    # Slot list filtered to available slots
+    'ix_availableslotsstatus': ('availableslots', ['Status']),
+    # Reservations of a volunteer, optionally by status (overview user filter, volunteer history)
+    'ix_reservationrequestsvolunteerstatus': ('reservationrequests', ['VolunteerId', 'Status']),
+    # Health records of a cat by date
+    'ix_healthrecordscatdate': ('healthrecords', ['CatId', 'Date']),
+    # A caregiver's examination requests
+    'ix_examinationrequestscaregiver': ('examinationrequests', ['CaregiverId']),
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            drop_invalid(name)
+            op.create_index(name, table, columns, schema=SCHEMA, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name=INDEXES[name][0], schema=SCHEMA, postgresql_concurrently=True, if_exists=True)
+
+
+def drop_invalid(name):
+    # Left over by an interrupted concurrent build; IF NOT EXISTS would take it for a finished index
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = '{SCHEMA}' AND c.relname = '{name}' AND NOT i.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {SCHEMA}.{name}';
+            END IF;
+        END $$
+    """)
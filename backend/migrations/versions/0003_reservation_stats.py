@@ -0,0 +1,72 @@
+"""Materialized reservation statistics for the admin dashboard
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-27
+
+Walks / reservations / cancellations per cat, per volunteer and per week (with slot utilisation), refreshed
+by services/reservation_stats.py. The unique indexes are what REFRESH MATERIALIZED VIEW CONCURRENTLY needs.
+Reservation statuses: 1 approved, 3 completed, 4 in progress, 5 cancelled (models/Enums.py).
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+SCHEMA = 'utulek'
+
+VIEWS = {
+    'catwalkstats': ('CatId', f"""
+        SELECT s."CatId",
+               count(*) FILTER (WHERE r."Status" = 3) AS "Walks",
+               count(*) AS "Reservations",
+               count(*) FILTER (WHERE r."Status" = 5) AS "Cancelled",
+               max(s."StartTime") FILTER (WHERE r."Status" = 3) AS "LastWalk"
+        FROM {SCHEMA}.reservationrequests r
+        JOIN {SCHEMA}.availableslots s ON s."Id" = r."SlotId"
+        GROUP BY s."CatId"
+    """),
+    'volunteerwalkstats': ('VolunteerId', f"""
+        SELECT r."VolunteerId",
+               count(*) FILTER (WHERE r."Status" = 3) AS "Walks",
+               count(*) AS "Reservations",
+               count(*) FILTER (WHERE r."Status" = 5) AS "Cancelled",
+               max(s."StartTime") FILTER (WHERE r."Status" = 3) AS "LastWalk"
+        FROM {SCHEMA}.reservationrequests r
+        JOIN {SCHEMA}.availableslots s ON s."Id" = r."SlotId"
+        GROUP BY r."VolunteerId"
+    """),
+    # A slot counts as booked with an approved, in progress or completed reservation
+    'weeklyslotstats': ('Week', f"""
+        SELECT date_trunc('week', s."StartTime")::date AS "Week",
+               count(*) AS "Slots",
+               count(*) FILTER (WHERE r."Booked" > 0) AS "BookedSlots",
+               coalesce(sum(r."Walks"), 0)::bigint AS "Walks",
+               coalesce(sum(r."Reservations"), 0)::bigint AS "Reservations",
+               coalesce(sum(r."Cancelled"), 0)::bigint AS "Cancelled"
+        FROM {SCHEMA}.availableslots s
+        LEFT JOIN (
+            SELECT "SlotId",
+                   count(*) FILTER (WHERE "Status" IN (1, 3, 4)) AS "Booked",
+                   count(*) FILTER (WHERE "Status" = 3) AS "Walks",
+                   count(*) AS "Reservations",
+                   count(*) FILTER (WHERE "Status" = 5) AS "Cancelled"
+            FROM {SCHEMA}.reservationrequests
+            GROUP BY "SlotId"
+        ) r ON r."SlotId" = s."Id"
+        GROUP BY 1
+    """),
+}
+
+
+def upgrade():
+    for name, (key, query) in VIEWS.items():
+        op.execute(f'CREATE MATERIALIZED VIEW {SCHEMA}.{name} AS {query}')
+        op.execute(f'CREATE UNIQUE INDEX ux_{name} ON {SCHEMA}.{name} ("{key}")')
+
+
+def downgrade():
+    for name in VIEWS:
+        op.execute(f'DROP MATERIALIZED VIEW {SCHEMA}.{name}')
@@ -0,0 +1,150 @@
+"""Per-volunteer activity summary kept up to date by a trigger
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-03
+
+volunteersummaries (reservation / completed / cancelled counts, last walk) and volunteercatwalks (completed
+walks per volunteer and cat, the favourite cats) are adjusted by a row trigger on reservationrequests, so every
+writer is covered: the controllers, the batch decisions, the waitlist and the scheduler's bulk UPDATEs. The
+existing history is loaded once; creating the trigger locks out writers until this transaction commits, so
+nothing is counted twice or missed.
+ix_reservationrequestsvolunteerid serves the paginated volunteer history (newest reservation first) and is
+built concurrently after that.
+Reservation statuses: 3 completed, 5 cancelled (models/Enums.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+SCHEMA = 'utulek'
+
+
+def upgrade():
+    op.create_table(
+        'volunteersummaries',
+        sa.Column('VolunteerId', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('Reservations', sa.Integer, nullable=False),
+        sa.Column('Completed', sa.Integer, nullable=False),
+        sa.Column('Cancelled', sa.Integer, nullable=False),
+        sa.Column('LastWalk', sa.DateTime),
+        sa.ForeignKeyConstraint(['VolunteerId'], [f'{SCHEMA}.users.Id'], name='fk_volunteersummariesusers', ondelete='CASCADE'),
+        schema=SCHEMA
+    )
+    op.create_index('ix_volunteersummariescompleted', 'volunteersummaries', ['Completed', 'VolunteerId'], schema=SCHEMA)
+    op.create_table(
+        'volunteercatwalks',
+        sa.Column('VolunteerId', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('CatId', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('Walks', sa.Integer, nullable=False),
+        sa.Column('LastWalk', sa.DateTime),
+        sa.ForeignKeyConstraint(['VolunteerId'], [f'{SCHEMA}.users.Id'], name='fk_volunteercatwalksusers', ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['CatId'], [f'{SCHEMA}.cats.Id'], name='fk_volunteercatwalkscats', ondelete='CASCADE'),
+        schema=SCHEMA
+    )
+    op.create_index('ix_volunteercatwalksfavourite', 'volunteercatwalks', ['VolunteerId', 'Walks'], schema=SCHEMA)
+
+    # Adds (delta = 1) or removes (delta = -1) one reservation row from the aggregates
+    op.execute(f"""
+        CREATE FUNCTION {SCHEMA}.volunteeractivityapply(volunteer bigint, slot bigint, status smallint, delta integer)
+        RETURNS void AS $$
+        DECLARE
+            cat bigint;
+            start_time timestamp;
+        BEGIN
+            INSERT INTO {SCHEMA}.volunteersummaries AS v ("VolunteerId", "Reservations", "Completed", "Cancelled")
+            VALUES (volunteer, delta, CASE WHEN status = 3 THEN delta ELSE 0 END, CASE WHEN status = 5 THEN delta ELSE 0 END)
+            ON CONFLICT ("VolunteerId") DO UPDATE SET
+                "Reservations" = v."Reservations" + EXCLUDED."Reservations",
+                "Completed" = v."Completed" + EXCLUDED."Completed",
+                "Cancelled" = v."Cancelled" + EXCLUDED."Cancelled";
+            IF status <> 3 THEN
+                RETURN;
+            END IF;
+
+            SELECT "CatId", "StartTime" INTO cat, start_time FROM {SCHEMA}.availableslots WHERE "Id" = slot;
+            IF delta > 0 THEN
+                UPDATE {SCHEMA}.volunteersummaries SET "LastWalk" = GREATEST("LastWalk", start_time) WHERE "VolunteerId" = volunteer;
+                IF cat IS NOT NULL THEN
+                    INSERT INTO {SCHEMA}.volunteercatwalks AS w ("VolunteerId", "CatId", "Walks", "LastWalk")
+                    VALUES (volunteer, cat, 1, start_time)
+                    ON CONFLICT ("VolunteerId", "CatId") DO UPDATE SET
+                        "Walks" = w."Walks" + 1,
+                        "LastWalk" = GREATEST(w."LastWalk", EXCLUDED."LastWalk");
+                END IF;
+            ELSE
+                -- Rare (a completed reservation corrected or deleted), the last walk is looked up again
+                UPDATE {SCHEMA}.volunteersummaries SET "LastWalk" = (
+                    SELECT max(s."StartTime") FROM {SCHEMA}.reservationrequests r
+                    JOIN {SCHEMA}.availableslots s ON s."Id" = r."SlotId"
+                    WHERE r."VolunteerId" = volunteer AND r."Status" = 3
+                ) WHERE "VolunteerId" = volunteer;
+                IF cat IS NOT NULL THEN
+                    UPDATE {SCHEMA}.volunteercatwalks SET "Walks" = "Walks" - 1, "LastWalk" = (
+                        SELECT max(s."StartTime") FROM {SCHEMA}.reservationrequests r
+                        JOIN {SCHEMA}.availableslots s ON s."Id" = r."SlotId"
+                        WHERE r."VolunteerId" = volunteer AND r."Status" = 3 AND s."CatId" = cat
+                    ) WHERE "VolunteerId" = volunteer AND "CatId" = cat;
+                    DELETE FROM {SCHEMA}.volunteercatwalks WHERE "VolunteerId" = volunteer AND "CatId" = cat AND "Walks" <= 0;
+                END IF;
+            END IF;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE FUNCTION {SCHEMA}.volunteeractivity() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD."Status" = NEW."Status" AND OLD."VolunteerId" = NEW."VolunteerId" AND OLD."SlotId" = NEW."SlotId" THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM {SCHEMA}.volunteeractivityapply(OLD."VolunteerId", OLD."SlotId", OLD."Status", -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM {SCHEMA}.volunteeractivityapply(NEW."VolunteerId", NEW."SlotId", NEW."Status", 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE TRIGGER volunteeractivity
+        AFTER INSERT OR DELETE OR UPDATE OF "Status", "VolunteerId", "SlotId" ON {SCHEMA}.reservationrequests
+        FOR EACH ROW EXECUTE FUNCTION {SCHEMA}.volunteeractivity()
+    """)
+
+    op.execute(f"""
+        INSERT INTO {SCHEMA}.volunteersummaries ("VolunteerId", "Reservations", "Completed", "Cancelled", "LastWalk")
+        SELECT r."VolunteerId", count(*), count(*) FILTER (WHERE r."Status" = 3), count(*) FILTER (WHERE r."Status" = 5),
+               max(s."StartTime") FILTER (WHERE r."Status" = 3)
+        FROM {SCHEMA}.reservationrequests r
+        JOIN {SCHEMA}.availableslots s ON s."Id" = r."SlotId"
+        GROUP BY r."VolunteerId"
+    """)
+    op.execute(f"""
+        INSERT INTO {SCHEMA}.volunteercatwalks ("VolunteerId", "CatId", "Walks", "LastWalk")
+        SELECT r."VolunteerId", s."CatId", count(*), max(s."StartTime")
+        FROM {SCHEMA}.reservationrequests r
+        JOIN {SCHEMA}.availableslots s ON s."Id" = r."SlotId"
+        WHERE r."Status" = 3
+        GROUP BY r."VolunteerId", s."CatId"
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservationrequestsvolunteerid', 'reservationrequests', ['VolunteerId', 'Id'], schema=SCHEMA,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reservationrequestsvolunteerid', table_name='reservationrequests', schema=SCHEMA,
+                      postgresql_concurrently=True, if_exists=True)
+    op.execute(f'DROP TRIGGER volunteeractivity ON {SCHEMA}.reservationrequests')
+    op.execute(f'DROP FUNCTION {SCHEMA}.volunteeractivity()')
+    op.execute(f'DROP FUNCTION {SCHEMA}.volunteeractivityapply(bigint, bigint, smallint, integer)')
+    op.drop_table('volunteercatwalks', schema=SCHEMA)
+    op.drop_table('volunteersummaries', schema=SCHEMA)
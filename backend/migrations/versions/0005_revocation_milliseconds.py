@@ -0,0 +1,27 @@
+"""User token revocations in milliseconds
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-02-10
+
+tokenrevocations."RevokedBefore" was a unix time in seconds, compared with the whole-second iat of a token, so
+a token issued in the second of a revocation was revoked too. It now holds milliseconds and is compared with the
+iat_ms claim (services/token_denylist.py). The existing revocations covered every token issued up to the end of
+their second, they are moved to that point.
+"""
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+SCHEMA = 'utulek'
+
+
+def upgrade():
+    op.execute(f'UPDATE {SCHEMA}.tokenrevocations SET "RevokedBefore" = ("RevokedBefore" + 1) * 1000 WHERE "RevokedBefore" IS NOT NULL')
+
+
+def downgrade():
+    op.execute(f'UPDATE {SCHEMA}.tokenrevocations SET "RevokedBefore" = "RevokedBefore" / 1000 WHERE "RevokedBefore" IS NOT NULL')
@@ -2,7 +2,16 @@ from models.database import db
 
 class AvailableSlot(db.Model):
     __tablename__ = 'availableslots'
-    __table_args__ = {'schema': 'utulek'}
+    __table_args__ = (
+        # Slots of a cat in time order
+        db.Index('ix_availableslotscatstart', 'CatId', 'StartTime'),
+        db.Index('ix_availableslotsstatus', 'Status'),
+        db.Index('ix_availableslotsstarttime', 'StartTime'),
+        db.Index('ix_availableslotsendtime', 'EndTime'),
+        # Covers the reservation overview join and its StartTime keyset
+        db.Index('ix_availableslotsstarttimecover', 'StartTime', 'Id', postgresql_include=['CatId', 'EndTime']),
+        {'schema': 'utulek'}
+    )
     Id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     CatId = db.Column(db.BigInteger, db.ForeignKey('utulek.cats.Id'), nullable=False)
     StartTime = db.Column(db.DateTime, nullable=False)
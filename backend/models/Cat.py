@@ -21,7 +21,10 @@ class Cats(db.Model):
 
 class CatPhotos(db.Model):
     __tablename__ = 'catphotos'
-    __table_args__ = {'schema': 'utulek'}
+    __table_args__ = (
+        db.Index('ix_catphotoscatid', 'CatId'),
+        {'schema': 'utulek'}
+    )
     Id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     CatId = db.Column(db.BigInteger, db.ForeignKey('utulek.cats.Id'), primary_key=True)
     PhotoUrl = db.Column(db.String(100), nullable=False)
\ No newline at end of file
@@ -2,7 +2,10 @@ from models.database import db
 
 class HealthRecord(db.Model):
     __tablename__ = 'healthrecords'
-    __table_args__ = {'schema': 'utulek'}
+    __table_args__ = (
+        db.Index('ix_healthrecordscatdate', 'CatId', 'Date'),
+        {'schema': 'utulek'}
+    )
 
     Id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     CatId = db.Column(db.BigInteger, db.ForeignKey('utulek.cats.Id'), nullable=False)
@@ -2,7 +2,17 @@ from models.database import db
 
 class ReservationRequest(db.Model):
     __tablename__ = 'reservationrequests'
-    __table_args__ = {'schema': 'utulek'}
+    __table_args__ = (
+        # Reservation scheduler: the next reservation due for a state change
+        db.Index('ix_reservationrequestsstatusslot', 'Status', 'SlotId'),
+        # Reservations of a slot; also covers the overview join
+        db.Index('ix_reservationrequestsslotcover', 'SlotId', postgresql_include=['Id', 'VolunteerId', 'Status']),
+        # A volunteer's reservations, optionally by status
+        db.Index('ix_reservationrequestsvolunteerstatus', 'VolunteerId', 'Status'),
+        # A volunteer's history, newest reservation first
+        db.Index('ix_reservationrequestsvolunteerid', 'VolunteerId', 'Id'),
+        {'schema': 'utulek'}
+    )
     Id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     SlotId = db.Column(db.BigInteger, db.ForeignKey('utulek.availableslots.Id'), nullable=False)
     VolunteerId = db.Column(db.BigInteger, db.ForeignKey('utulek.users.Id'), nullable=False)
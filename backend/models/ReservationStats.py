@@ -0,0 +1,33 @@
+from models.database import db
+
+# Materialized views of migration 0003, refreshed by services/reservation_stats.py. They have their own
+# MetaData, so create_all and Alembic autogenerate do not take them for tables.
+views = db.MetaData(schema='utulek')
+
+CatWalkStats = db.Table(
+    'catwalkstats', views,
+    db.Column('CatId', db.BigInteger, primary_key=True),
+    db.Column('Walks', db.BigInteger),
+    db.Column('Reservations', db.BigInteger),
+    db.Column('Cancelled', db.BigInteger),
+    db.Column('LastWalk', db.DateTime),
+)
+
+VolunteerWalkStats = db.Table(
+    'volunteerwalkstats', views,
+    db.Column('VolunteerId', db.BigInteger, primary_key=True),
+    db.Column('Walks', db.BigInteger),
+    db.Column('Reservations', db.BigInteger),
+    db.Column('Cancelled', db.BigInteger),
+    db.Column('LastWalk', db.DateTime),
+)
+
+WeeklySlotStats = db.Table(
+    'weeklyslotstats', views,
+    db.Column('Week', db.Date, primary_key=True),
+    db.Column('Slots', db.BigInteger),
+    db.Column('BookedSlots', db.BigInteger),
+    db.Column('Walks', db.BigInteger),
+    db.Column('Reservations', db.BigInteger),
+    db.Column('Cancelled', db.BigInteger),
+)
@@ -0,0 +1,14 @@
+from models.database import db
+
+class SlotWaitlist(db.Model):
+    __tablename__ = 'slotwaitlist'
+    __table_args__ = (
+        db.UniqueConstraint('SlotId', 'VolunteerId'),
+        # FIFO order of the waitlist of a slot
+        db.Index('ix_slotwaitlistslotqueue', 'SlotId', 'Id'),
+        {'schema': 'utulek'}
+    )
+    Id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    SlotId = db.Column(db.BigInteger, db.ForeignKey('utulek.availableslots.Id', ondelete='CASCADE'), nullable=False)
+    VolunteerId = db.Column(db.BigInteger, db.ForeignKey('utulek.users.Id', ondelete='CASCADE'), nullable=False)
+    CreatedAt = db.Column(db.DateTime, nullable=False)
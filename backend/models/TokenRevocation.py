@@ -0,0 +1,18 @@
+from models.database import db
+
+class TokenRevocation(db.Model):
+    __tablename__ = 'tokenrevocations'
+    __table_args__ = (
+        db.Index('ix_tokenrevocationsexpiresat', 'ExpiresAt'),
+        {'schema': 'utulek'}
+    )
+    Id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    # Either a single token ...
+    Jti = db.Column(db.String(36), unique=True, nullable=True)
+    # ... or every token of a user issued before RevokedBefore (unix time in milliseconds), no foreign key as it must outlive deleted users
+    UserId = db.Column(db.BigInteger, nullable=True)
+    # For a single token the time it was revoked, which gives a just rotated refresh token its grace period
+    RevokedBefore = db.Column(db.BigInteger, nullable=True)
+    AccessOnly = db.Column(db.Boolean, nullable=False, default=False)
+    # The revocation is pointless once every token it covers has expired
+    ExpiresAt = db.Column(db.DateTime, nullable=False)
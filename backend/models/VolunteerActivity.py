@@ -0,0 +1,28 @@
+from models.database import db
+
+# Maintained by the volunteeractivity trigger on reservationrequests (migration 0004), never written by the app
+
+class VolunteerSummary(db.Model):
+    __tablename__ = 'volunteersummaries'
+    __table_args__ = (
+        # Leaderboard, most completed walks first
+        db.Index('ix_volunteersummariescompleted', 'Completed', 'VolunteerId'),
+        {'schema': 'utulek'}
+    )
+    VolunteerId = db.Column(db.BigInteger, db.ForeignKey('utulek.users.Id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    Reservations = db.Column(db.Integer, nullable=False)
+    Completed = db.Column(db.Integer, nullable=False)
+    Cancelled = db.Column(db.Integer, nullable=False)
+    LastWalk = db.Column(db.DateTime)
+
+class VolunteerCatWalks(db.Model):
+    __tablename__ = 'volunteercatwalks'
+    __table_args__ = (
+        # Favourite cats of a volunteer
+        db.Index('ix_volunteercatwalksfavourite', 'VolunteerId', 'Walks'),
+        {'schema': 'utulek'}
+    )
+    VolunteerId = db.Column(db.BigInteger, db.ForeignKey('utulek.users.Id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    CatId = db.Column(db.BigInteger, db.ForeignKey('utulek.cats.Id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    Walks = db.Column(db.Integer, nullable=False)
+    LastWalk = db.Column(db.DateTime)
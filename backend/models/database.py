@@ -1,3 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-db = SQLAlchemy()
\ No newline at end of file
+
+class RoutingSession(Session):
+    # A session marked with a replica engine (services/read_replicas.py, for GET requests) reads from it.
+    # Flushes and UPDATE / INSERT / DELETE statements always go to the primary.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('read_replica')
+        if replica is not None and bind is None and not self._flushing and not getattr(clause, 'is_dml', False):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
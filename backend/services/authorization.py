@@ -0,0 +1,93 @@
+import logging
+from functools import wraps
+from flask import g
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from models.Enums import Roles
+
+logger = logging.getLogger(__name__)
+
+MUTATING_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+def role_bit(role):
+    # Roles start at -1 (UNAUTHORIZED), shift by one so every role gets its own bit
+    return 1 << (role + 1)
+
+
+def role_mask(roles):
+    mask = 0
+    for role in roles:
+        mask |= role_bit(role.value if isinstance(role, Roles) else role)
+    return mask
+
+
+def current_identity():
+    # JWT identity of the request, decoded once and kept on flask.g
+    if 'current_user' not in g:
+        g.current_user = get_jwt_identity()
+    return g.current_user
+
+
+def has_role(*roles):
+    identity = current_identity()
+    return identity is not None and bool(role_mask(roles) & role_bit(identity['role']))
+
+
+def authenticate():
+    # /batch verifies the JWT once for all of its sub-requests (g.jwt_verified). Anything else, or a batch
+    # sent without a valid token so that the usual error comes back, verifies it here.
+    if not g.get('jwt_verified') or current_identity() is None:
+        verify_jwt_in_request()
+
+
+def roles_required(*roles, msg="Unauthorized access", status=401):
+    # Lets the request through only with a valid JWT whose role is one of roles
+    mask = role_mask(roles)
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            authenticate()
+            identity = current_identity()
+            if not mask & role_bit(identity['role']):
+                return {"msg": msg}, status
+            return fn(*args, **kwargs)
+        wrapper.allowed_roles_mask = mask
+        return wrapper
+    return decorator
+
+
+def public(fn):
+    # Marks an endpoint as deliberately open to anyone, keeps it out of the unprotected endpoint report
+    fn.allowed_roles_mask = role_mask(Roles)
+    fn.public = True
+    return fn
+
+
+def build_permission_table(app):
+    # (endpoint, method) -> role bitmap, or None when the handler declares nothing
+    table = {}
+    for rule in app.url_map.iter_rules():
+        view = app.view_functions[rule.endpoint]
+        view_class = getattr(view, 'view_class', None)
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            handler = getattr(view_class, method.lower(), None) if view_class is not None else view
+            table[(rule.endpoint, method)] = getattr(handler, 'allowed_roles_mask', None)
+    app.extensions['permission_table'] = table
+    return table
+
+
+def roles_from_mask(mask):
+    return [role.name for role in Roles if mask & role_bit(role.value)]
+
+
+def report_unprotected_endpoints(app):
+    table = app.extensions.get('permission_table') or build_permission_table(app)
+    rules = {rule.endpoint: rule.rule for rule in app.url_map.iter_rules()}
+    unprotected = sorted(
+        (rules[endpoint], method) for (endpoint, method), mask in table.items()
+        if mask is None and method in MUTATING_METHODS
+    )
+    for path, method in unprotected:
+        logger.warning('Unprotected mutating endpoint: %s %s', method, path)
+    return unprotected
@@ -0,0 +1,87 @@
+import logging
+import orjson
+from flask import current_app, g, request
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+from werkzeug.test import EnvironBuilder
+from models.database import db
+from services.read_replicas import read_replicas
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_REQUESTS = 20
+# Sub-response headers that describe the HTTP message rather than the result; CORS headers are the batch's
+SKIPPED_HEADERS = {'Content-Type', 'Content-Length', 'Set-Cookie', 'Vary'}
+SKIPPED_HEADER_PREFIX = 'Access-Control-'
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def parse_batch(data):
+    # [{"path": "/cats/1"}, {"path": "/healthrecords/1", "method": "GET"}, ...] -> paths
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise InvalidBatch('requests must be a non-empty list')
+    if len(items) > MAX_BATCH_REQUESTS:
+        raise InvalidBatch(f'At most {MAX_BATCH_REQUESTS} requests per batch')
+    paths = []
+    for item in items:
+        path = item.get('path') if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise InvalidBatch('Every request needs a path starting with /')
+        if str(item.get('method', 'GET')).upper() != 'GET':
+            raise InvalidBatch('Only GET requests can be batched')
+        if path.split('?', 1)[0].rstrip('/') == request.path:
+            raise InvalidBatch('Batches cannot be nested')
+        paths.append(path)
+    return paths
+
+
+def run_batch(paths):
+    # Runs the GET sub-requests one after the other through the app's own view functions, in this request's app
+    # context: they share its JWT decode (see authorization.authenticate) and its database session, so the batch
+    # costs one decode and one pooled connection instead of one per call. The request hooks (metrics, compression,
+    # ...) run once, for the batch. Returns the JSON array of {"status", "headers", "body"} as bytes.
+    try:
+        verify_jwt_in_request(optional=True)
+        g.jwt_verified = True
+    except (JWTExtendedException, PyJWTError):
+        pass  # Sub-requests that need a login fail the usual way, public ones still work
+    read_replicas.route_reads()
+    try:
+        return b'[' + b','.join(dispatch(path) for path in paths) + b']'
+    finally:
+        g.pop('jwt_verified', None)
+
+
+def dispatch(path):
+    app = current_app._get_current_object()
+    builder = EnvironBuilder(
+        path=path,
+        method='GET',
+        base_url=request.host_url,
+        headers={'Cookie': request.headers.get('Cookie', '')},
+        environ_base={'REMOTE_ADDR': request.remote_addr},
+    )
+    with app.request_context(builder.get_environ()):
+        try:
+            try:
+                response = app.make_response(app.dispatch_request())
+            except Exception as e:
+                # Error handlers of the app (HTTP errors, flask-jwt-extended); anything else is a 500 for this
+                # sub-request only
+                response = app.make_response(app.handle_user_exception(e))
+        except Exception:
+            logger.exception('Batch sub-request failed: GET %s', path)
+            db.session.rollback()
+            response = app.make_response(({'msg': 'Internal server error'}, 500))
+        body = response.get_data().strip() if response.is_json else b''
+        headers = {key: value for key, value in response.headers.items()
+                   if key not in SKIPPED_HEADERS and not key.startswith(SKIPPED_HEADER_PREFIX)}
+
+    # The body is JSON already, it is spliced in as it is instead of being parsed and serialized again
+    meta = orjson.dumps({'status': response.status_code, 'headers': headers})
+    return meta[:-1] + b',"body":' + (body or b'null') + b'}'
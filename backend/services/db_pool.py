@@ -0,0 +1,93 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from models.database import db
+
+
+class MonitoredQueuePool(QueuePool):
+    # QueuePool that reports how long every checkout waited for a connection to its monitor
+    monitor = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            if self.monitor is not None:
+                self.monitor.timed_out(time.perf_counter() - started)
+            raise
+        if self.monitor is not None:
+            self.monitor.checked_out(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # dispose() / invalidation swap in a new pool, keep reporting to the same monitor
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+class PoolMonitor:
+    # Checkout counts and wait times of the SQLAlchemy pool, so pool_size / max_overflow can be set
+    # from measurements. A wait close to DB_POOL_TIMEOUT, or any timeouts, mean the pool is too small
+    # for the number of threads using it.
+    def __init__(self, app=None):
+        self.engine = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'checkins': 0,
+            'connects': 0,
+            'invalidations': 0,
+            'timeouts': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # After db.init_app, the engine exists but has not connected yet
+        with app.app_context():
+            self.engine = db.engine
+        pool = self.engine.pool
+        if isinstance(pool, MonitoredQueuePool):
+            pool.monitor = self
+        event.listen(self.engine, 'connect', lambda *args: self._count('connects'))
+        event.listen(self.engine, 'checkin', lambda *args: self._count('checkins'))
+        event.listen(self.engine, 'invalidate', lambda *args: self._count('invalidations'))
+        app.extensions['pool_monitor'] = self
+
+    def checked_out(self, wait):
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds_total'] += wait
+            self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], wait)
+
+    def timed_out(self, wait):
+        with self._lock:
+            self._stats['timeouts'] += 1
+            self._stats['wait_seconds_total'] += wait
+            self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], wait)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'pool_size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+pool_monitor = PoolMonitor()
@@ -0,0 +1,158 @@
+import itertools
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from models.database import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'utulek_events'
+# Number of recent events kept for clients resuming with Last-Event-ID
+BACKLOG_SIZE = 1000
+# Events buffered per connected client before it is considered too slow and disconnected
+SUBSCRIBER_QUEUE_SIZE = 200
+LISTEN_POLL_SECONDS = 5
+LISTEN_RETRY_SECONDS = 5
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventBus:
+    # Publishes reservation / slot changes once their transaction commits.
+    # With the Postgres listener running the events go through NOTIFY, so every app process sees them
+    # in commit order; otherwise they are only delivered inside this process.
+    def __init__(self, app=None):
+        self.app = None
+        self.max_subscribers = None
+        self._lock = threading.Lock()
+        self._backlog = deque(maxlen=BACKLOG_SIZE)
+        self._subscribers = set()
+        self._rejected = 0
+        self._handlers = []
+        self._local_ids = itertools.count(1)
+        self._listener = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        # Every open stream holds a request thread, gunicorn gives the worker this many on top of WORKER_THREADS
+        self.max_subscribers = app.config.setdefault('EVENTS_MAX_STREAMS', 20)
+        app.extensions['event_bus'] = self
+
+    def publish(self, type, **data):
+        # Must be called inside the transaction making the change, nothing is sent if it rolls back
+        if self._listener is not None:
+            # NOTIFY is transactional, Postgres delivers it on commit
+            db.session.execute(text(
+                "SELECT pg_notify(:channel, json_build_object("
+                "'id', nextval('utulek.eventids'), 'type', CAST(:type AS text), 'data', CAST(:data AS json))::text)"
+            ), {'channel': CHANNEL, 'type': type, 'data': json.dumps(data)})
+        else:
+            db.session.info.setdefault('pending_events', []).append((type, data))
+
+    def add_handler(self, handler):
+        # Called with every event in this process, e.g. to drop cached data that an event made stale
+        self._handlers.append(handler)
+
+    def dispatch(self, message):
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception:
+                logger.exception('Event handler failed')
+        with self._lock:
+            self._backlog.append(message)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.overflowed = True
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                self._rejected += 1
+                raise TooManySubscribers()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'rejected': self._rejected}
+
+    def since(self, last_id):
+        # Events after last_id, or None when last_id already fell out of the backlog
+        with self._lock:
+            backlog = list(self._backlog)
+        for index, message in enumerate(backlog):
+            if message['id'] == last_id:
+                return backlog[index + 1:]
+        return None
+
+    def start_listener(self):
+        if self._listener is not None:
+            return
+        self._listener = threading.Thread(target=self._listen, name='event-listener', daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                # The connection stays in LISTEN mode, keep it out of the pool
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                try:
+                    dbapi_connection.cursor().execute(f'LISTEN {CHANNEL}')
+                    while True:
+                        if select.select([dbapi_connection], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                            continue
+                        dbapi_connection.poll()
+                        while dbapi_connection.notifies:
+                            notification = dbapi_connection.notifies.pop(0)
+                            self.dispatch(json.loads(notification.payload))
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception('Event listener failed, reconnecting')
+                time.sleep(LISTEN_RETRY_SECONDS)
+
+    def _flush_local(self, session):
+        for type, data in session.info.pop('pending_events', []):
+            self.dispatch({'id': next(self._local_ids), 'type': type, 'data': data})
+
+
+event_bus = EventBus()
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    event_bus._flush_local(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('pending_events', None)
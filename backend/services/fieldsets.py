@@ -0,0 +1,122 @@
+from functools import lru_cache
+from models.database import db
+from services.serialization import RowEncoder
+
+
+class InvalidFieldset(ValueError):
+    pass
+
+
+def names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class Fieldset:
+    # Sparse fieldsets and embedded relations of one resource: ?fields=id,name picks the output fields,
+    # ?include=cat,volunteer embeds related rows. Both become a single column select, with only the requested
+    # columns and only the joins they need, so a view gets exactly its data in one query.
+    #   fields:    output key -> column | (column, converter) | (column, converter, join name)
+    #              | None (computed by the resource after the query, e.g. a cat's photos)
+    #   joins:     join name -> (table, onclause) | (table, onclause, join name it goes through); in join order
+    #   relations: include name -> (join name, {output key -> column | (column, converter)}), embedded as an object
+    #   key:       column always selected as _key, for what the resource adds to the rows afterwards
+    def __init__(self, base, fields, joins=None, relations=None, default_fields=None, default_includes=(), key=None):
+        self.base = base
+        self.fields = {name: self._field(spec) for name, spec in fields.items()}
+        self.joins = {name: spec if len(spec) == 3 else (*spec, None) for name, spec in (joins or {}).items()}
+        self.relations = relations or {}
+        self.default_fields = tuple(default_fields or self.fields)
+        self.default_includes = tuple(default_includes)
+        self.key = key
+        # One statement and compiled encoder per selection, clients mostly use a handful of them
+        self.select = lru_cache(maxsize=64)(self._select)
+
+    @staticmethod
+    def _field(spec):
+        if spec is None or not isinstance(spec, tuple):
+            return spec, None, None
+        return spec if len(spec) == 3 else (*spec, None)
+
+    def parse(self, args, default_fields=None):
+        # -> (fields, includes) in declaration order, so the same selection always hits the same cached select
+        fields = args.get('fields')
+        if fields is None:
+            fields = default_fields or self.default_fields
+        else:
+            requested = names(fields)
+            if not requested:
+                raise InvalidFieldset('fields cannot be empty')
+            unknown = requested - self.fields.keys()
+            if unknown:
+                raise InvalidFieldset(f"Unknown fields: {', '.join(sorted(unknown))}")
+            fields = tuple(name for name in self.fields if name in requested)
+
+        includes = args.get('include')
+        if includes is None:
+            includes = self.default_includes
+        else:
+            requested = names(includes)
+            unknown = requested - self.relations.keys()
+            if unknown:
+                raise InvalidFieldset(f"Unknown include: {', '.join(sorted(unknown))}")
+            includes = tuple(name for name in self.relations if name in requested)
+        return tuple(fields), includes
+
+    def _select(self, fields, includes):
+        # -> (statement, encoder); the resource adds its filters and ordering to the statement
+        columns = []
+        encoded = {}
+        needed = set()
+        for name in fields:
+            column, converter, join = self.fields[name]
+            if column is None:
+                continue
+            columns.append(column.label(name))
+            encoded[name] = (name, converter) if converter else name
+            needed.add(join)
+        for name in includes:
+            join, relation_fields = self.relations[name]
+            nested = {}
+            for key, spec in relation_fields.items():
+                column, converter = spec if isinstance(spec, tuple) else (spec, None)
+                label = f'{name}__{key}'
+                columns.append(column.label(label))
+                nested[key] = (label, converter) if converter else label
+            encoded[name] = RowEncoder(**nested)
+            needed.add(join)
+        if self.key is not None:
+            columns.append(self.key.label('_key'))
+
+        # Joins that the needed ones go through
+        pending = [join for join in needed if join is not None]
+        while pending:
+            through = self.joins[pending.pop()][2]
+            if through is not None and through not in needed:
+                needed.add(through)
+                pending.append(through)
+
+        statement = db.select(*columns).select_from(self.base)
+        for name, (table, onclause, _) in self.joins.items():
+            if name in needed:
+                statement = statement.join(table, onclause)
+        return statement, RowEncoder(**encoded)
+
+    def parameters(self, default_fields=None):
+        # flasgger query parameters of the resource's GET
+        default_fields = ', '.join(default_fields or self.default_fields)
+        parameters = [{
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': f"Comma separated fields out of {', '.join(self.fields)} (default {default_fields})"
+        }]
+        if self.relations:
+            parameters.append({
+                'name': 'include',
+                'in': 'query',
+                'type': 'string',
+                'required': False,
+                'description': f"Comma separated related objects to embed: {', '.join(self.relations)}"
+            })
+        return parameters
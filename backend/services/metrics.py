@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from flask import g, request
+
+# Upper bounds of the histogram buckets, +Inf is implied
+HISTOGRAM_BUCKETS = {
+    'http_request_duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'http_request_db_queries': (1, 2, 5, 10, 20, 50, 100, 250),
+}
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'Requests by route, method and status'),
+    'http_request_errors_total': ('counter', 'Requests answered with a 5xx status'),
+    'http_request_duration_seconds': ('histogram', 'Time until the response was ready'),
+    'http_request_db_queries': ('histogram', 'SQL statements per request'),
+    'http_request_db_seconds_total': ('counter', 'Time spent in the database by requests'),
+    'http_requests_in_progress': ('gauge', 'Requests being handled'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache and result (hit / miss)'),
+    'cache_hit_ratio': ('gauge', 'Share of cache lookups answered from the cache'),
+}
+
+# WSGI environ keys of the request being measured; not on g, which an in-process sub-request of /batch shares
+STARTED_KEY = 'utulek.metrics_started'
+STATUS_KEY = 'utulek.metrics_status'
+QUERIES_KEY = 'utulek.metrics_queries'
+
+# Snapshot of finished worker processes, counters only, kept so totals never go down
+DEAD_FILE = 'dead.json'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Metrics:
+    # Request counters and histograms of this process, rendered in the Prometheus text format at /metrics.
+    # Under gunicorn every worker writes its numbers to METRICS_DIR at most every METRICS_FLUSH_SECONDS,
+    # and whichever worker answers /metrics adds up the files of all of them. Counters of finished workers
+    # are folded into one file by the master (mark_process_dead), so totals keep growing across restarts.
+    def __init__(self, app=None):
+        self.directory = None
+        self.flush_interval = 5
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._in_progress = 0
+        self._collectors = []
+        self._last_flush = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.setdefault('METRICS_DIR', None)
+        self.flush_interval = app.config.setdefault('METRICS_FLUSH_SECONDS', 5)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        # Recorded at teardown, which also runs when an unhandled exception (PROPAGATE_EXCEPTIONS) skips after_request
+        app.teardown_request(self._end_request)
+        app.extensions['metrics'] = self
+
+    def add_collector(self, collector):
+        # collector() returns [(name, type, help, labels dict, value)], read when the metrics are rendered
+        self._collectors.append(collector)
+
+    def inc(self, name, labels=None, value=1):
+        key = _key(name, labels or {})
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        buckets = HISTOGRAM_BUCKETS[name]
+        key = _key(name, labels or {})
+        index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def cache_lookup(self, cache, hit):
+        self.inc('cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+    def _start_request(self):
+        request.environ[STARTED_KEY] = time.perf_counter()
+        with self._lock:
+            self._in_progress += 1
+
+    def _finish_request(self, response):
+        request.environ[STATUS_KEY] = response.status_code
+        # query_stats pops its numbers in its own after_request, which runs after this one
+        request.environ[QUERIES_KEY] = g.get('query_stats')
+        return response
+
+    def _end_request(self, exc):
+        started = request.environ.pop(STARTED_KEY, None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        # No response when the exception propagated, the server answers it with a 500
+        status = request.environ.pop(STATUS_KEY, None)
+        if exc is not None or status is None:
+            status = 500
+        # The rule, not the path, so /cats/1 and /cats/2 are one series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = {'route': route, 'method': request.method}
+        self.inc('http_requests_total', dict(labels, status=str(status)))
+        if status >= 500:
+            self.inc('http_request_errors_total', labels)
+        self.observe('http_request_duration_seconds', duration, labels)
+
+        stats = request.environ.pop(QUERIES_KEY, None) or g.get('query_stats')
+        if stats is not None:
+            self.observe('http_request_db_queries', stats.count, labels)
+            self.inc('http_request_db_seconds_total', labels, stats.seconds)
+
+        with self._lock:
+            self._in_progress -= 1
+        if self.directory and time.time() - self._last_flush > self.flush_interval:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()]
+            gauges = [['http_requests_in_progress', [], self._in_progress]]
+        for collector in self._collectors:
+            for name, kind, help, labels, value in collector():
+                METRIC_HELP.setdefault(name, (kind, help))
+                target = counters if kind == 'counter' else gauges
+                target.append([name, sorted(labels.items()), value])
+        return {'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def flush(self):
+        self._last_flush = time.time()
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def clear(self):
+        # Leftovers of a previous run, their gauges would otherwise be added forever
+        for filename in os.listdir(self.directory):
+            if filename.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(self.directory, filename))
+
+    def mark_process_dead(self, pid, directory=None):
+        # Run by the gunicorn master when a worker exits, the only writer of DEAD_FILE
+        directory = directory or self.directory
+        if not directory or not os.path.exists(os.path.join(directory, f'{pid}.json')):
+            return
+        path = os.path.join(directory, f'{pid}.json')
+        dead_path = os.path.join(directory, DEAD_FILE)
+        merged = _merge([_read(dead_path), _read(path)], gauges=False)
+        with open(dead_path + '.tmp', 'w') as f:
+            json.dump(merged, f)
+        os.replace(dead_path + '.tmp', dead_path)
+        os.remove(path)
+
+    def render(self):
+        snapshots = [self.snapshot()]
+        if self.directory:
+            own = f'{os.getpid()}.json'
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json') or filename == own:
+                    continue
+                snapshot = _read(os.path.join(self.directory, filename))
+                if filename == DEAD_FILE:
+                    snapshot['gauges'] = []
+                snapshots.append(snapshot)
+        return _render(_merge(snapshots))
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'counters': [], 'histograms': [], 'gauges': []}
+
+
+def _merge(snapshots, gauges=True):
+    # Counters, histogram buckets and gauges of all processes are summed
+    merged = {'counters': {}, 'histograms': {}, 'gauges': {}}
+    for snapshot in snapshots:
+        for kind in ('counters', 'gauges') if gauges else ('counters',):
+            for name, labels, value in snapshot.get(kind, []):
+                key = (name, tuple(map(tuple, labels)))
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for name, labels, values in snapshot.get('histograms', []):
+            key = (name, tuple(map(tuple, labels)))
+            current = merged['histograms'].get(key)
+            merged['histograms'][key] = values if current is None else [a + b for a, b in zip(current, values)]
+    return {kind: [[name, list(labels), value] for (name, labels), value in series.items()] for kind, series in merged.items()}
+
+
+def _render(snapshot):
+    # Hit ratio per cache, derived from the merged lookup counters
+    lookups = {}
+    for name, labels, value in snapshot['counters']:
+        if name == 'cache_requests_total':
+            labels = dict(labels)
+            totals = lookups.setdefault(labels['cache'], [0, 0])
+            totals[0] += value if labels['result'] == 'hit' else 0
+            totals[1] += value
+    for cache, (hits, total) in lookups.items():
+        snapshot['gauges'].append(['cache_hit_ratio', [['cache', cache]], hits / total if total else 0])
+
+    series = {}
+    for kind in ('counters', 'gauges', 'histograms'):
+        for name, labels, value in snapshot[kind]:
+            series.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(series):
+        kind, help = METRIC_HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series[name], key=lambda sample: sample[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(HISTOGRAM_BUCKETS[name]) + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def stats_collector(prefix, stats, counters=(), gauges=()):
+    # Exposes the listed keys of a stats() dict, e.g. the password hasher's, as prefix_key
+    def collect():
+        values = stats()
+        samples = [(f'{prefix}_{key}', 'counter', f'{prefix} {key}', {}, values[key]) for key in counters if key in values]
+        samples += [(f'{prefix}_{key}', 'gauge', f'{prefix} {key}', {}, values[key]) for key in gauges if key in values]
+        return samples
+    return collect
+
+
+metrics = Metrics()
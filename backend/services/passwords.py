@@ -0,0 +1,110 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def full_method(method):
+    # 'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2:sha256' -> 'pbkdf2:sha256:600000': werkzeug fills in the defaults
+    # when hashing and stores them in the hash, so the configured method is compared in that form
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+class PasswordHasher:
+    # Runs the (deliberately slow) password KDF on a small dedicated pool. Only a bounded number of
+    # hashes run or wait at once, at most half of the request threads of the process (WORKER_THREADS),
+    # so a login burst cannot occupy every request thread; the rest are rejected with 503 right away
+    # instead of piling up.
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'in_flight': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'hash_seconds_total': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        queue_size = app.config.setdefault('PASSWORD_HASH_QUEUE', 4 * workers)
+        self.method = full_method(app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+        threads = app.config.get('WORKER_THREADS')
+        limit = max(1, threads // 2) if threads else None
+        if limit is not None and workers + queue_size > limit:
+            logger.warning(
+                'PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE (%d) exceed half of the %d request threads, '
+                'limited to %d', workers + queue_size, threads, limit
+            )
+            workers = min(workers, limit)
+            queue_size = limit - workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, hashed, password):
+        return self._run(check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        # Werkzeug hashes look like "method:params$salt$hash"
+        return hashed.split('$', 1)[0] != self.method
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        # A request thread waiting here is as busy as one hashing, so a full pool answers at once
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordHasherBusy()
+        queued = time.perf_counter()
+        self._count('submitted')
+        self._count('in_flight')
+        try:
+            return self._executor.submit(self._timed, fn, args, queued).result()
+        finally:
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def _timed(self, fn, args, queued):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                wait = started - queued
+                self._stats['completed'] += 1
+                self._stats['wait_seconds_total'] += wait
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], wait)
+                self._stats['hash_seconds_total'] += finished - started
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+
+password_hasher = PasswordHasher()
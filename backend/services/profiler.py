@@ -0,0 +1,180 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import request
+
+# Deepest stack kept per sample, the outermost frames are dropped beyond it
+MAX_STACK_DEPTH = 128
+FORMATS = ('collapsed', 'speedscope')
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class ProfileSession:
+    def __init__(self, seconds, requests, route, interval):
+        self.id = uuid.uuid4().hex[:12]
+        self.seconds = seconds
+        self.requests = requests
+        self.route = route
+        self.interval = interval
+        self.started = time.time()
+        self.finished = None
+        self.profiled_requests = 0
+        self.samples = 0
+        self.stacks = Counter()   # (route, frame, frame, ...) -> samples
+        self.threads = {}         # thread id -> route of the request it is handling
+        self.stop = threading.Event()
+
+    def done(self):
+        if self.seconds is not None and time.time() - self.started >= self.seconds:
+            return True
+        return self.requests is not None and self.profiled_requests >= self.requests
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'pid': os.getpid(),
+            'route': self.route,
+            'seconds': self.seconds,
+            'requests': self.requests,
+            'interval': self.interval,
+            'started': self.started,
+            'finished': self.finished,
+            'profiled_requests': self.profiled_requests,
+            'samples': self.samples,
+        }
+
+
+class SamplingProfiler:
+    # Statistical profiler for live diagnosis. While a session runs, a background thread looks at the stacks
+    # of the threads handling a profiled request every `interval` seconds (sys._current_frames), so the
+    # requests themselves are not slowed down by tracing. Without a session the only cost is one attribute
+    # check per request. A session ends after N seconds or N profiled requests, whichever comes first, and is
+    # written to PROFILER_DIR as collapsed stacks (flamegraph.pl, speedscope) and speedscope JSON.
+    # Sessions are per process: under gunicorn only the worker that received the start request profiles.
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_seconds = 300
+        self._session = None
+        self._last = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.setdefault('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'utulek-profiles'))
+        self.max_seconds = app.config.setdefault('PROFILER_MAX_SECONDS', 300)
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+        app.extensions['profiler'] = self
+
+    def start(self, seconds=None, requests=None, route=None, interval=0.005):
+        # Without a limit the session would run until stopped, cap it so a forgotten one ends by itself
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        with self._lock:
+            if self._session is not None:
+                raise ProfilerBusy()
+            session = self._session = ProfileSession(seconds, requests, route, interval)
+        threading.Thread(target=self._sample, args=(session,), name='profiler', daemon=True).start()
+        return session.summary()
+
+    def stop(self):
+        session = self._session
+        if session is not None:
+            session.stop.set()
+        return session.summary() if session is not None else None
+
+    def status(self):
+        session = self._session
+        return {
+            'running': session.summary() if session is not None else None,
+            'last': self._last,
+        }
+
+    def result_path(self, session_id, format):
+        if format not in FORMATS or not session_id.isalnum():
+            return None
+        path = os.path.join(self.directory, f'{session_id}.{format}')
+        return path if os.path.exists(path) else None
+
+    def _start_request(self):
+        session = self._session
+        if session is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else None
+        if session.route is None or session.route == route:
+            session.threads[threading.get_ident()] = f'{request.method} {route}'
+
+    def _finish_request(self, exception=None):
+        session = self._session
+        if session is None:
+            return
+        if session.threads.pop(threading.get_ident(), None) is not None:
+            session.profiled_requests += 1
+
+    def _sample(self, session):
+        own = threading.get_ident()
+        while not session.stop.wait(session.interval) and not session.done():
+            threads = dict(session.threads)
+            if not threads:
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or thread_id not in threads:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(threads[thread_id])
+                session.stacks[tuple(reversed(stack))] += 1
+                session.samples += 1
+        session.finished = time.time()
+        with self._lock:
+            self._session = None
+        self._write(session)
+        self._last = session.summary()
+
+    def _write(self, session):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f'{session.id}.collapsed'), 'w') as f:
+            for stack, count in session.stacks.most_common():
+                f.write(';'.join(stack) + f' {count}\n')
+        with open(os.path.join(self.directory, f'{session.id}.speedscope'), 'w') as f:
+            json.dump(speedscope(session), f)
+
+
+def speedscope(session):
+    # https://www.speedscope.app/file-format-schema.json, one sampled profile weighted in seconds
+    frames = {}
+    samples = []
+    weights = []
+    for stack, count in session.stacks.items():
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+        weights.append(count * session.interval)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'exporter': 'utulek-profiler',
+        'name': f'profile {session.id}',
+        'activeProfileIndex': 0,
+        'shared': {'frames': [{'name': frame} for frame in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': session.route or 'all routes',
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+profiler = SamplingProfiler()
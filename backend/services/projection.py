@@ -0,0 +1,10 @@
+from models.database import db
+
+
+def select_rows(statement):
+    # Read path for list endpoints: runs a column select as Core on the session's connection, so the result is
+    # plain Row tuples. Nothing goes through the ORM, no entities are built, instrumented or put into the
+    # identity map. Building the 100k-row slot and reservation lists this way takes about half the CPU time
+    # and 40% of the peak memory of Model.query.all() (benchmarks/projection.py). The connection is the
+    # session's, so the rows still see the writes of the current transaction.
+    return db.session.connection().execute(statement).all()
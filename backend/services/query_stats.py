@@ -0,0 +1,109 @@
+import logging
+import time
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Longest part of a statement written to the log
+STATEMENT_LOG_LENGTH = 300
+
+
+class RequestQueryStats:
+    __slots__ = ('count', 'seconds', 'slowest_seconds', 'slowest_statement')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+
+    def add(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+class QueryStats:
+    # Counts the SQL statements of every request and the time spent in them, through the cursor execute
+    # events of every engine. Requests over the thresholds are logged with their slowest statement, which is
+    # usually enough to spot an N+1 loop. Outside production the numbers also go out as response headers:
+    #   X-DB-Queries: 12
+    #   Server-Timing: db;dur=8.4;desc="12 queries"
+    def __init__(self, app=None):
+        self.slow_query = 0.1
+        self.slow_request_queries = 20
+        self.slow_request_db = 0.2
+        self.headers = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.setdefault('QUERY_STATS_ENABLED', True):
+            return
+        self.slow_query = app.config.setdefault('SLOW_QUERY_MS', 100) / 1000
+        self.slow_request_queries = app.config.setdefault('SLOW_REQUEST_QUERIES', 20)
+        self.slow_request_db = app.config.setdefault('SLOW_REQUEST_DB_MS', 200) / 1000
+        self.headers = app.config.setdefault('QUERY_STATS_HEADERS', False)
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['query_stats'] = self
+
+    def current(self):
+        # Statistics of the running request, None outside of one
+        if not has_app_context():
+            return None
+        return g.get('query_stats')
+
+    def statement_done(self, statement, seconds):
+        stats = self.current()
+        if stats is not None:
+            stats.add(statement, seconds)
+        if seconds >= self.slow_query:
+            logger.warning('Slow query (%.1f ms): %s', seconds * 1000, statement[:STATEMENT_LOG_LENGTH])
+
+    def _start_request(self):
+        g.query_stats = RequestQueryStats()
+
+    def _finish_request(self, response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        if stats.count >= self.slow_request_queries or stats.seconds >= self.slow_request_db:
+            logger.warning(
+                'Slow request %s %s: %d queries, %.1f ms in the database, slowest %.1f ms: %s',
+                request.method, request.path, stats.count, stats.seconds * 1000,
+                stats.slowest_seconds * 1000, (stats.slowest_statement or '')[:STATEMENT_LOG_LENGTH]
+            )
+        if self.headers:
+            response.headers['X-DB-Queries'] = str(stats.count)
+            timing = f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        return response
+
+
+query_stats = QueryStats()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    query_stats.statement_done(statement, time.perf_counter() - started)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
@@ -0,0 +1,142 @@
+import threading
+import time
+
+# Memory backend sweeps expired keys after this many recorded attempts
+SWEEP_EVERY = 1000
+
+
+class MemoryWindowStore:
+    # Sliding window approximated from two fixed windows: key -> [window index, previous count, current count].
+    # Three numbers per key, whatever the number of attempts.
+    def __init__(self, window):
+        self.window = window
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._adds = 0
+
+    def _roll(self, entry, index):
+        window_index, previous, current = entry
+        if window_index == index:
+            return previous, current
+        if window_index == index - 1:
+            return current, 0
+        return 0, 0
+
+    def count(self, key, now):
+        index = int(now // self.window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0.0
+            previous, current = self._roll(entry, index)
+        return previous * (1 - (now % self.window) / self.window) + current
+
+    def add(self, key, now):
+        index = int(now // self.window)
+        with self._lock:
+            entry = self._entries.get(key)
+            previous, current = self._roll(entry, index) if entry else (0, 0)
+            self._entries[key] = [index, previous, current + 1]
+            self._adds += 1
+            if self._adds % SWEEP_EVERY == 0:
+                self._entries = {k: e for k, e in self._entries.items() if e[0] >= index - 1}
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisWindowStore:
+    # Same two-window approximation kept in Redis, so all app processes share the counters
+    def __init__(self, window, url, prefix='utulek:ratelimit'):
+        import redis  # Optional dependency, only needed when LOGIN_RATE_LIMIT_REDIS_URL is set
+        self.window = window
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def _key(self, key, index):
+        return f"{self.prefix}:{key}:{index}"
+
+    def count(self, key, now):
+        index = int(now // self.window)
+        previous, current = self._redis.mget(self._key(key, index - 1), self._key(key, index))
+        previous, current = int(previous or 0), int(current or 0)
+        return previous * (1 - (now % self.window) / self.window) + current
+
+    def add(self, key, now):
+        redis_key = self._key(key, int(now // self.window))
+        pipeline = self._redis.pipeline()
+        pipeline.incr(redis_key)
+        pipeline.expire(redis_key, 2 * self.window)
+        pipeline.execute()
+
+    def reset(self, key):
+        index = int(time.time() // self.window)
+        self._redis.delete(self._key(key, index - 1), self._key(key, index))
+
+    def __len__(self):
+        return 0
+
+
+class LoginRateLimiter:
+    # Counts failed logins per username and per client IP. Over the limit, attempts are rejected
+    # before the user lookup and the password hash run.
+    def __init__(self, app=None):
+        self.store = None
+        self.limits = {}
+        self._lock = threading.Lock()
+        self._stats = {'blocked': 0, 'blocked_username': 0, 'blocked_ip': 0, 'failed': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        window = app.config.setdefault('LOGIN_RATE_LIMIT_WINDOW', 300)
+        self.limits = {
+            'username': app.config.setdefault('LOGIN_RATE_LIMIT_PER_USERNAME', 5),
+            'ip': app.config.setdefault('LOGIN_RATE_LIMIT_PER_IP', 30),
+        }
+        redis_url = app.config.setdefault('LOGIN_RATE_LIMIT_REDIS_URL', None)
+        self.store = RedisWindowStore(window, redis_url) if redis_url else MemoryWindowStore(window)
+        app.extensions['login_rate_limiter'] = self
+
+    def _keys(self, username, ip):
+        return {'username': f"u:{username.lower()}", 'ip': f"ip:{ip}"}
+
+    def check(self, username, ip):
+        # Seconds the client should wait, or None when the attempt may go ahead
+        if self.store is None:
+            return None
+        now = time.time()
+        for kind, key in self._keys(username, ip).items():
+            if self.store.count(key, now) >= self.limits[kind]:
+                with self._lock:
+                    self._stats['blocked'] += 1
+                    self._stats[f'blocked_{kind}'] += 1
+                return int(self.store.window - now % self.store.window) + 1
+        return None
+
+    def failed(self, username, ip):
+        if self.store is None:
+            return
+        now = time.time()
+        for key in self._keys(username, ip).values():
+            self.store.add(key, now)
+        with self._lock:
+            self._stats['failed'] += 1
+
+    def succeeded(self, username):
+        # The account owner got in, earlier typos no longer count against the username
+        if self.store is not None:
+            self.store.reset(self._keys(username, '')['username'])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['tracked_keys'] = len(self.store) if self.store is not None else 0
+        return stats
+
+
+login_rate_limiter = LoginRateLimiter()
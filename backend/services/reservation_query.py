@@ -0,0 +1,165 @@
+from datetime import datetime
+from functools import lru_cache
+from flask import jsonify, request
+from models.AvailableSlot import AvailableSlot
+from models.Cat import Cats
+from models.Enums import WalkRequestStatus
+from models.ReservationRequest import ReservationRequest
+from models.User import User
+from models.database import db
+from services.serialization import RowEncoder, minute_text
+
+# Reservations still waiting for (or in) their walk
+ACTIVE_STATUSES = [WalkRequestStatus.APPROVED.value, WalkRequestStatus.IN_PROGRESS.value, WalkRequestStatus.PENDING.value]
+# Reservations that will not change anymore
+CONCLUDED_STATUSES = [WalkRequestStatus.REJECTED.value, WalkRequestStatus.COMPLETED.value, WalkRequestStatus.CANCELLED.value]
+
+MAX_PAGE_SIZE = 500
+
+# Output field -> (column, table the column needs joined)
+FIELDS = {
+    'reservation_id': (ReservationRequest.Id, None),
+    'volunteer_id': (ReservationRequest.VolunteerId, None),
+    'volunteer_username': (User.Username, User),
+    'volunteer_full_name': (db.func.concat(User.FirstName, ' ', User.LastName), User),
+    'volunteer_email': (User.Email, User),
+    'cat_id': (AvailableSlot.CatId, None),
+    'cat_name': (Cats.Name, Cats),
+    'slot_id': (AvailableSlot.Id, None),
+    'start_time': (AvailableSlot.StartTime, None),
+    'end_time': (AvailableSlot.EndTime, None),
+    'reservation_status': (ReservationRequest.Status, None),
+}
+TIME_FIELDS = ('start_time', 'end_time')
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def encode_cursor(start_time, reservation_id):
+    return f"{start_time.isoformat()}|{reservation_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        start_time, reservation_id = cursor.split('|')
+        return datetime.fromisoformat(start_time), int(reservation_id)
+    except ValueError:
+        raise InvalidQuery('Invalid cursor')
+
+
+def query_reservations(fields, statuses=None, volunteer_id=None, cat_id=None, date_from=None, date_to=None,
+                       descending=False, cursor=None, limit=None):
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+
+    # The keyset columns are always selected, they are stripped from the output below
+    columns = [FIELDS[f][0].label(f) for f in fields]
+    columns += [AvailableSlot.StartTime.label('_start_time'), ReservationRequest.Id.label('_id')]
+    query = db.session.query(*columns).join(AvailableSlot, AvailableSlot.Id == ReservationRequest.SlotId)
+
+    # Join only the tables that the requested fields come from
+    joined = {FIELDS[f][1] for f in fields}
+    if User in joined:
+        query = query.join(User, User.Id == ReservationRequest.VolunteerId)
+    if Cats in joined:
+        query = query.join(Cats, Cats.Id == AvailableSlot.CatId)
+
+    if statuses is not None:
+        query = query.filter(ReservationRequest.Status.in_(statuses))
+    if volunteer_id:
+        query = query.filter(ReservationRequest.VolunteerId == volunteer_id)
+    if cat_id:
+        query = query.filter(AvailableSlot.CatId == cat_id)
+    if date_from:
+        query = query.filter(AvailableSlot.StartTime >= date_from)
+    if date_to:
+        query = query.filter(AvailableSlot.StartTime < date_to)
+
+    keyset = db.tuple_(AvailableSlot.StartTime, ReservationRequest.Id)
+    if cursor:
+        after = db.tuple_(*decode_cursor(cursor))
+        query = query.filter(keyset < after if descending else keyset > after)
+    if descending:
+        query = query.order_by(AvailableSlot.StartTime.desc(), ReservationRequest.Id.desc())
+    else:
+        query = query.order_by(AvailableSlot.StartTime, ReservationRequest.Id)
+
+    if limit:
+        # One extra row tells whether there is a next page
+        rows = query.limit(limit + 1).all()
+    else:
+        rows = query.all()
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._start_time, rows[-1]._id)
+
+    return row_encoder(tuple(fields)).many(rows), next_cursor
+
+
+@lru_cache(maxsize=64)
+def row_encoder(fields):
+    # One compiled encoder per field selection, the routes mostly use their default fields
+    return RowEncoder(**{f: (f, minute_text) if f in TIME_FIELDS else f for f in fields})
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise InvalidQuery('Invalid date format. Use YYYY-MM-DD.')
+
+
+def overview_response(default_fields, statuses=None, descending=False):
+    # Shared handler for the reservation overview routes, the route only picks statuses, order and fields
+    args = request.args
+    try:
+        fields = args.get('fields')
+        fields = fields.split(',') if fields else default_fields
+
+        status = args.get('status')
+        if status:
+            requested = [int(s) for s in status.split(',')]
+            statuses = requested if statuses is None else [s for s in requested if s in statuses]
+
+        limit = args.get('limit', type=int)
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            raise InvalidQuery(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        reservations, next_cursor = query_reservations(
+            fields,
+            statuses=statuses,
+            volunteer_id=args.get('user_id', type=int),
+            cat_id=args.get('cat_id', type=int),
+            date_from=parse_date(args.get('date_from')),
+            date_to=parse_date(args.get('date_to')),
+            descending=descending,
+            cursor=args.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return {"msg": str(e)}, 400
+
+    response = jsonify(reservations)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+# Swagger parameters shared by the overview routes
+OVERVIEW_PARAMETERS = [
+    {'name': 'user_id', 'in': 'query', 'type': 'integer', 'required': False, 'description': 'Only reservations of this volunteer'},
+    {'name': 'cat_id', 'in': 'query', 'type': 'integer', 'required': False, 'description': 'Only reservations of this cat'},
+    {'name': 'date_from', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Slots starting on or after this date (YYYY-MM-DD)'},
+    {'name': 'date_to', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Slots starting before this date (YYYY-MM-DD)'},
+    {'name': 'status', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Comma separated reservation statuses'},
+    {'name': 'fields', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Comma separated list of fields to return'},
+    {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False, 'description': f'Page size (max {MAX_PAGE_SIZE}), the next page cursor is returned in the X-Next-Cursor header'},
+    {'name': 'cursor', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Cursor from the X-Next-Cursor header of the previous page'},
+]
@@ -0,0 +1,126 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models.AvailableSlot import AvailableSlot
+from models.Enums import WalkRequestStatus
+from models.ReservationRequest import ReservationRequest
+from models.database import db
+from services.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+# Every app process shares this key, so only one of them advances reservations per tick
+ADVISORY_LOCK_KEY = 26026026
+# Upper bound for a sleep, so reservations approved by another process are picked up too
+MAX_SLEEP = timedelta(seconds=60)
+# Back-off after a failed tick (database down, ...)
+ERROR_SLEEP = timedelta(seconds=10)
+
+
+def advance_reservations(now):
+    # APPROVED -> IN_PROGRESS once the slot has started (and not yet ended)
+    started = db.session.execute(
+        db.update(ReservationRequest)
+        .where(
+            ReservationRequest.SlotId == AvailableSlot.Id,
+            ReservationRequest.Status == WalkRequestStatus.APPROVED.value,
+            AvailableSlot.StartTime <= now,
+            AvailableSlot.EndTime > now
+        )
+        .values(Status=WalkRequestStatus.IN_PROGRESS.value)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # APPROVED / IN_PROGRESS -> COMPLETED once the slot has ended
+    completed = db.session.execute(
+        db.update(ReservationRequest)
+        .where(
+            ReservationRequest.SlotId == AvailableSlot.Id,
+            ReservationRequest.Status.in_([WalkRequestStatus.APPROVED.value, WalkRequestStatus.IN_PROGRESS.value]),
+            AvailableSlot.EndTime <= now
+        )
+        .values(Status=WalkRequestStatus.COMPLETED.value)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    return started, completed
+
+
+def next_due_time(now):
+    # Earliest future moment at which some reservation changes state
+    next_start = db.session.query(db.func.min(AvailableSlot.StartTime)).join(
+        ReservationRequest, ReservationRequest.SlotId == AvailableSlot.Id
+    ).filter(
+        ReservationRequest.Status == WalkRequestStatus.APPROVED.value,
+        AvailableSlot.StartTime > now
+    ).scalar()
+
+    next_end = db.session.query(db.func.min(AvailableSlot.EndTime)).join(
+        ReservationRequest, ReservationRequest.SlotId == AvailableSlot.Id
+    ).filter(
+        ReservationRequest.Status.in_([WalkRequestStatus.APPROVED.value, WalkRequestStatus.IN_PROGRESS.value]),
+        AvailableSlot.EndTime > now
+    ).scalar()
+
+    candidates = [t for t in (next_start, next_end) if t is not None]
+    return min(candidates) if candidates else None
+
+
+class ReservationScheduler:
+    def __init__(self, app=None):
+        self.app = None
+        self._wake = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['reservation_scheduler'] = self
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='reservation-scheduler', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        # Called after a reservation is approved or its slot changes, so the next due time is recomputed
+        self._wake.set()
+
+    def tick(self, now=None):
+        now = now or datetime.now()
+        try:
+            # Transaction scoped lock, released by the commit below
+            if db.engine.dialect.name != 'postgresql' or db.session.execute(
+                text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY}
+            ).scalar():
+                started, completed = advance_reservations(now)
+                if started or completed:
+                    event_bus.publish('reservation.advanced', in_progress=started, completed=completed)
+                    logger.info('Reservations advanced: %d in progress, %d completed', started, completed)
+            next_due = next_due_time(now)
+            db.session.commit()
+            return next_due
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            now = datetime.now()
+            try:
+                with self.app.app_context():
+                    next_due = self.tick(now)
+                delay = MAX_SLEEP if next_due is None else min(max(next_due - now, timedelta(0)), MAX_SLEEP)
+            except Exception:
+                logger.exception('Reservation scheduler tick failed')
+                delay = ERROR_SLEEP
+            self._wake.wait(delay.total_seconds())
+
+
+reservation_scheduler = ReservationScheduler()
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from sqlalchemy import text
+from models.ReservationStats import views
+from models.database import db
+
+logger = logging.getLogger(__name__)
+
+# Every app process shares this key, so only one of them refreshes per interval
+ADVISORY_LOCK_KEY = 26026027
+# Back-off after a failed refresh (database down, ...)
+ERROR_SLEEP = 30
+
+
+class ReservationStatsRefresher:
+    # Keeps the materialized statistics views (models/ReservationStats.py) current. The dashboard reads one row
+    # per cat / volunteer / week from them instead of aggregating the whole reservation history per request;
+    # the price is that they trail the reservations by up to RESERVATION_STATS_REFRESH_SECONDS.
+    # REFRESH ... CONCURRENTLY rebuilds a view next to the old contents and applies the difference, readers are
+    # never blocked. It runs on a connection of its own, with RESERVATION_STATS_REFRESH_TIMEOUT_MS instead of the
+    # request statement_timeout, which a full rebuild outgrows as the history grows.
+    def __init__(self, app=None):
+        self.app = None
+        self.interval = 300
+        self.timeout_ms = 600000
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'refreshes': 0,
+            'failures': 0,
+            'refresh_seconds_total': 0.0,
+            'last_refresh_seconds': 0.0,
+            'last_success_timestamp': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.setdefault('RESERVATION_STATS_REFRESH_SECONDS', 300)
+        self.timeout_ms = app.config.setdefault('RESERVATION_STATS_REFRESH_TIMEOUT_MS', 600000)
+        app.extensions['reservation_stats'] = self
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='reservation-stats', daemon=True)
+        self._thread.start()
+
+    def refresh(self):
+        # True when this process refreshed, False when another one holds the lock
+        started = time.perf_counter()
+        try:
+            # Always the primary (db.engine), the views cannot be refreshed on a replica
+            with db.engine.connect() as connection, connection.begin():
+                # Transaction scoped, like the advisory lock that is released by the commit
+                connection.execute(text(f'SET LOCAL statement_timeout = {int(self.timeout_ms)}'))
+                if not connection.execute(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY}).scalar():
+                    return False
+                for view in views.sorted_tables:
+                    connection.execute(text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {view.schema}.{view.name}'))
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['refreshes'] += 1
+            self._stats['refresh_seconds_total'] += elapsed
+            self._stats['last_refresh_seconds'] = elapsed
+            self._stats['last_success_timestamp'] = time.time()
+        return True
+
+    def _run(self):
+        while True:
+            delay = self.interval
+            try:
+                with self.app.app_context():
+                    if self.refresh():
+                        logger.info('Reservation statistics refreshed in %.2fs', self._stats['last_refresh_seconds'])
+            except Exception:
+                # The dashboard keeps showing the last refreshed numbers, reservation_stats_failures and
+                # reservation_stats_last_success_timestamp in /metrics tell how stale they are
+                logger.exception('Reservation statistics refresh failed (statement_timeout %d ms), retrying in %ds',
+                                 self.timeout_ms, ERROR_SLEEP)
+                delay = ERROR_SLEEP
+            time.sleep(delay)
+
+
+reservation_stats = ReservationStatsRefresher()
@@ -0,0 +1,252 @@
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import Response, current_app, request
+from flask_restful.utils import unpack
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models.database import db
+from services.events import event_bus
+from services.metrics import metrics
+from services.serialization import output_json
+
+logger = logging.getLogger(__name__)
+
+# Not found answers are cached too, the adoption site asks for the photos of cats that have none over and over
+CACHEABLE_STATUSES = (200, 404)
+
+CachedResponse = namedtuple('CachedResponse', ['status', 'body', 'mimetype', 'etag', 'expires'])
+
+
+class MemoryCacheStore:
+    # LRU bounded by the total size of the cached bodies. The versions are per process, kept in step with
+    # the other processes by the 'cache.invalidated' events.
+    shared = False
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tables):
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.time():
+                del self._entries[key]
+                self.size -= len(entry.body)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self._entries[key] = entry
+            self.size += len(entry.body)
+            # Entries of old versions are never looked up again, they are the first to go
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheStore:
+    # Bodies and versions shared by all workers. Memory is bounded by Redis itself, run it with a maxmemory
+    # and the allkeys-lru policy; entries also expire after the TTL.
+    shared = True
+
+    def __init__(self, url, ttl, prefix='utulek:cache'):
+        import redis  # Optional dependency, only needed when RESPONSE_CACHE_REDIS_URL is set
+        self.ttl = ttl
+        self.prefix = prefix
+        self.size = None
+        self.evictions = None
+        self._redis = redis.Redis.from_url(url)
+
+    def versions(self, tables):
+        return tuple(int(version or 0) for version in self._redis.hmget(f'{self.prefix}:versions', tables))
+
+    def bump(self, tables):
+        pipeline = self._redis.pipeline()
+        for table in tables:
+            pipeline.hincrby(f'{self.prefix}:versions', table, 1)
+        pipeline.execute()
+
+    def get(self, key):
+        raw = self._redis.get(f'{self.prefix}:{key}')
+        if raw is None:
+            return None
+        status, mimetype, etag, body = raw.split(b'\n', 3)
+        return CachedResponse(int(status), body, mimetype.decode(), etag.decode(), float('inf'))
+
+    def set(self, key, entry):
+        header = f'{entry.status}\n{entry.mimetype}\n{entry.etag}\n'.encode()
+        self._redis.set(f'{self.prefix}:{key}', header + entry.body, ex=self.ttl)
+
+    def __len__(self):
+        return 0
+
+
+class ResponseCache:
+    # Response cache for the public, read-heavy endpoints. An entry is keyed by the URL and the current versions
+    # of the tables the response is built from; writes bump those versions (invalidate() inside the transaction,
+    # applied once it commits), which makes every dependent entry unreachable at once. Nothing is deleted
+    # explicitly, stale entries age out of the LRU. In the steady state a request costs a version lookup and a
+    # cache lookup, no database.
+    # The ETag is a hash of the cached body, so all workers and restarts agree on it, and a matching
+    # If-None-Match is answered with 304 from the cache.
+    # With RESPONSE_CACHE_REDIS_URL the bodies and versions are shared by all workers. Otherwise every process
+    # has its own, and bumps reach the other processes as events through Postgres NOTIFY (EVENTS_POSTGRES_NOTIFY);
+    # RESPONSE_CACHE_TTL bounds how long an entry is served should an event be missed.
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = 300
+        self.store = MemoryCacheStore(32 * 1024 * 1024)
+        self._handler_added = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'errors': 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+        max_bytes = app.config.setdefault('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        redis_url = app.config.setdefault('RESPONSE_CACHE_REDIS_URL', None)
+        self.store = RedisCacheStore(redis_url, self.ttl) if redis_url else MemoryCacheStore(max_bytes)
+        if not self._handler_added:
+            event_bus.add_handler(self._on_event)
+            self._handler_added = True
+        app.extensions['response_cache'] = self
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['entries'] = len(self.store)
+        stats['bytes'] = self.store.size
+        stats['evictions'] = self.store.evictions
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def invalidate(self, *tables):
+        # Call inside the transaction making the change, like event_bus.publish; nothing changes if it rolls back
+        if not self.enabled:
+            return
+        # This process bumps right after the commit (_after_commit), so its next GET never sees its own stale entries
+        db.session.info.setdefault('cache_invalidations', set()).update(tables)
+        if not self.store.shared:
+            # The other processes bump when the event arrives; it reaches this one too, bumping again only costs
+            # a miss on entries built in between
+            event_bus.publish('cache.invalidated', tables=sorted(tables))
+
+    def bump(self, tables):
+        try:
+            self.store.bump(tables)
+        except Exception:
+            logger.exception('Response cache version bump failed, entries may be served until they expire')
+
+    def _on_event(self, message):
+        if message['type'] == 'cache.invalidated' and not self.store.shared:
+            self.bump(message['data']['tables'])
+
+    def cached(self, *tables):
+        # Decorator for Resource.get methods; tables: everything the response is built from
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                try:
+                    key = f"{request.full_path}|{'.'.join(map(str, self.store.versions(tables)))}"
+                    entry = self.store.get(key)
+                except Exception:
+                    logger.exception('Response cache lookup failed')
+                    self._count('errors')
+                    return fn(*args, **kwargs)
+
+                hit = entry is not None
+                metrics.cache_lookup('responses', hit)
+                self._count('hits' if hit else 'misses')
+                if not hit:
+                    # Built from the primary: a lagging read replica could store pre-invalidation data under the new versions
+                    db.session.info.pop('read_replica', None)
+                    response = as_response(fn(*args, **kwargs))
+                    if response.status_code not in CACHEABLE_STATUSES or response.is_streamed or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    entry = CachedResponse(response.status_code, body, response.mimetype,
+                                           hashlib.blake2b(body, digest_size=12).hexdigest(), time.time() + self.ttl)
+                    try:
+                        self.store.set(key, entry)
+                    except Exception:
+                        logger.exception('Response cache store failed')
+                        self._count('errors')
+                return self._respond(entry, hit)
+            return wrapper
+        return decorator
+
+    def _respond(self, entry, hit):
+        response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        if entry.status == 200:
+            response.set_etag(entry.etag)
+            # Browsers may keep the body but must revalidate it, which the ETag makes cheap
+            response.cache_control.no_cache = True
+            response.make_conditional(request)
+            if response.status_code == 304:
+                self._count('not_modified')
+        return response
+
+
+def as_response(result):
+    # Handlers return either a Response (jsonify) or flask-restful's data / (data, status[, headers])
+    if isinstance(result, Response):
+        return result
+    data, status, headers = unpack(result)
+    return output_json(data, status, headers)
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    tables = session.info.pop('cache_invalidations', None)
+    if tables:
+        response_cache.bump(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('cache_invalidations', None)
@@ -0,0 +1,50 @@
+import json
+import logging
+import random
+
+# Share of routine (debug / info) events written to the log, warnings and errors are always written.
+# Set from LOG_SAMPLE_RATE by init_app.
+sample_rate = 1.0
+
+
+def init_app(app):
+    global sample_rate
+    sample_rate = app.config.setdefault('LOG_SAMPLE_RATE', 1.0)
+
+
+class StructuredLogger:
+    # Log lines as "event {json fields}", machine readable without a custom formatter. The fields are also
+    # attached to the record (record.event, record.fields) for JSON log handlers.
+    # Routine events on hot paths (e.g. every photo served) are sampled, with LOG_SAMPLE_RATE unless the
+    # logger has its own rate.
+    def __init__(self, name, sample_rate=None):
+        self.logger = logging.getLogger(name)
+        self.sample_rate = sample_rate
+
+    def debug(self, event, **fields):
+        self._sampled(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._sampled(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+    def _sampled(self, level, event, fields):
+        rate = sample_rate if self.sample_rate is None else self.sample_rate
+        if rate < 1 and random.random() >= rate:
+            return
+        if rate < 1:
+            fields['sample_rate'] = rate
+        self._log(level, event, fields)
+
+    def _log(self, level, event, fields, exc_info=False):
+        if not self.logger.isEnabledFor(level):
+            return
+        self.logger.log(level, '%s %s', event, json.dumps(fields, default=str), exc_info=exc_info, extra={'event': event, 'fields': fields})
@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from models.TokenRevocation import TokenRevocation
+from models.database import db
+
+# How often every process pulls new revocations from the database
+SYNC_INTERVAL = 5
+# How often expired revocations are deleted from the database
+PURGE_INTERVAL = 3600
+# Ids are handed out before commit, so a lower id can become visible after a higher one was synced.
+# Re-reading this many ids back catches those, applying a revocation twice is harmless.
+SYNC_OVERLAP = 100
+# Issue time in milliseconds; iat has whole seconds, too coarse to tell a token issued right after a user's
+# revocation (a refresh or login following a role change) from one issued just before it
+ISSUED_CLAIM = 'iat_ms'
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+class TokenDenylist:
+    # Access tokens are only checked by signature plus this in-memory denylist, kept in sync with the
+    # TokenRevocations table by an incremental read every SYNC_INTERVAL seconds. Entries drop out once
+    # every token they cover has expired, so the set stays small and the per-request cost constant.
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.reuse_grace = 10
+        self._jtis = {}           # jti -> (expires (unix time), revoked at (ms))
+        self._users_access = {}   # user id -> (revoked before, expires), access tokens only
+        self._users_all = {}      # user id -> (revoked before, expires), every token
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._last_purge = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.reuse_grace = app.config.setdefault('JWT_REFRESH_REUSE_GRACE_SECONDS', 10)
+        app.extensions['token_denylist'] = self
+
+    def issued_claims(self, identity):
+        # Registered as the flask-jwt-extended additional claims loader
+        return {ISSUED_CLAIM: now_ms()}
+
+    def is_revoked(self, jwt_header, jwt_payload):
+        # Registered as the flask-jwt-extended blocklist loader
+        now = time.time()
+        if now - self._last_sync > SYNC_INTERVAL:
+            self.sync(now)
+
+        user_id = jwt_payload['sub'].get('user_id') if isinstance(jwt_payload['sub'], dict) else None
+        # Tokens from before the claim existed count as issued at the start of their second
+        issued_at = jwt_payload.get(ISSUED_CLAIM, jwt_payload['iat'] * 1000)
+        with self._lock:
+            revoked = self._jtis.get(jwt_payload['jti'])
+            if revoked is not None:
+                # A refresh token rotated moments ago (by another tab of the same browser) still reaches
+                # Refresh, which answers without new tokens instead of logging the client out
+                return jwt_payload['type'] != 'refresh' or not self._within_grace(revoked[1])
+            entries = [self._users_all.get(user_id)]
+            if jwt_payload['type'] == 'access':
+                entries.append(self._users_access.get(user_id))
+        return any(entry is not None and issued_at < entry[0] for entry in entries)
+
+    def sync(self, now=None):
+        now = now or time.time()
+        # One process-wide sync at a time, other requests keep using the current state
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            # Always from the primary (db.engine): a lagging read replica would keep revoked tokens working
+            # for longer than SYNC_INTERVAL
+            rows = db.session.execute(
+                db.select(TokenRevocation).where(TokenRevocation.Id > self._last_id - SYNC_OVERLAP).order_by(TokenRevocation.Id),
+                bind_arguments={'bind': db.engine}
+            ).scalars().all()
+            for row in rows:
+                self._apply(row)
+                self._last_id = max(self._last_id, row.Id)
+            self._prune(now)
+            self._last_sync = now
+        finally:
+            self._sync_lock.release()
+
+    def revoke_token(self, jti, expires):
+        # expires: unix time at which the token expires on its own
+        return self._add(TokenRevocation(
+            Jti=jti,
+            RevokedBefore=now_ms(),
+            AccessOnly=False,
+            ExpiresAt=datetime.fromtimestamp(expires)
+        ))
+
+    def rotated_recently(self, jti):
+        # After a refresh token turned out to be used already: whether that was within the grace period,
+        # read from the primary as the other use may have come through another process
+        revoked_at = db.session.execute(
+            db.select(TokenRevocation.RevokedBefore).where(TokenRevocation.Jti == jti),
+            bind_arguments={'bind': db.engine}
+        ).scalar()
+        return self._within_grace(revoked_at)
+
+    def revoke_user(self, user_id, access_only=True):
+        # Every token of the user issued before now, e.g. after a role change only the access tokens carrying the old
+        # role. Call it before issuing the user new tokens in the same request.
+        expires_in = current_app.config['JWT_ACCESS_TOKEN_EXPIRES'] if access_only else current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+        return self._add(TokenRevocation(
+            UserId=user_id,
+            RevokedBefore=now_ms(),
+            AccessOnly=access_only,
+            ExpiresAt=datetime.now() + expires_in
+        ))
+
+    def applied(self, revocation):
+        # Call after the revocation is committed, so this process does not wait for the next sync
+        self._apply(revocation)
+
+    def _add(self, revocation):
+        db.session.add(revocation)
+        now = time.time()
+        if now - self._last_purge > PURGE_INTERVAL:
+            self._last_purge = now
+            TokenRevocation.query.filter(TokenRevocation.ExpiresAt < datetime.now()).delete()
+        return revocation
+
+    def _apply(self, row):
+        expires = row.ExpiresAt.timestamp()
+        with self._lock:
+            if row.Jti is not None:
+                self._jtis[row.Jti] = (expires, row.RevokedBefore)
+            else:
+                users = self._users_access if row.AccessOnly else self._users_all
+                current = users.get(row.UserId)
+                if current is None or current[0] < row.RevokedBefore:
+                    users[row.UserId] = (row.RevokedBefore, max(expires, current[1] if current else 0))
+
+    def _within_grace(self, revoked_at):
+        # Single token revocations from before RevokedBefore was set for them have no time, and no grace
+        return revoked_at is not None and now_ms() - revoked_at < self.reuse_grace * 1000
+
+    def _prune(self, now):
+        with self._lock:
+            self._jtis = {jti: e for jti, e in self._jtis.items() if e[0] > now}
+            self._users_access = {u: e for u, e in self._users_access.items() if e[1] > now}
+            self._users_all = {u: e for u, e in self._users_all.items() if e[1] > now}
+
+
+token_denylist = TokenDenylist()
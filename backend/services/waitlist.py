@@ -0,0 +1,74 @@
+from datetime import date, datetime
+from models.AvailableSlot import AvailableSlot
+from models.Enums import AvailableSlotStatus, WalkRequestStatus
+from models.ReservationRequest import ReservationRequest
+from models.SlotWaitlist import SlotWaitlist
+from models.database import db
+from services.events import event_bus
+
+
+def waitlist_position(slot_id, entry_id):
+    return db.session.query(db.func.count(SlotWaitlist.Id)).filter(
+        SlotWaitlist.SlotId == slot_id,
+        SlotWaitlist.Id <= entry_id
+    ).scalar()
+
+
+def join_waitlist(slot_id, volunteer_id):
+    # The caller holds the slot row lock, so joining cannot race with a handoff of the same slot
+    entry = SlotWaitlist.query.filter_by(SlotId=slot_id, VolunteerId=volunteer_id).first()
+    if entry is None:
+        entry = SlotWaitlist(SlotId=slot_id, VolunteerId=volunteer_id, CreatedAt=datetime.now())
+        db.session.add(entry)
+        db.session.flush()
+        event_bus.publish('waitlist.joined', slot_id=slot_id, volunteer_id=volunteer_id)
+    return waitlist_position(slot_id, entry.Id)
+
+
+def release_slots(slot_ids):
+    # Called from the transaction that frees the slots. A slot with a waitlist goes straight to the first
+    # volunteer in it as a new pending reservation, the rest become available again.
+    slot_ids = list(set(slot_ids))
+    if not slot_ids:
+        return {}
+
+    # Bookings and handoffs of a slot all take this lock first, so a slot is never handed out twice
+    db.session.query(AvailableSlot.Id).filter(AvailableSlot.Id.in_(slot_ids)).with_for_update().all()
+
+    heads = db.session.query(db.func.min(SlotWaitlist.Id)).filter(
+        SlotWaitlist.SlotId.in_(slot_ids)
+    ).group_by(SlotWaitlist.SlotId).all()
+
+    handed_over = {}
+    if heads:
+        entries = db.session.execute(
+            db.delete(SlotWaitlist)
+            .where(SlotWaitlist.Id.in_([h[0] for h in heads]))
+            .returning(SlotWaitlist.SlotId, SlotWaitlist.VolunteerId)
+        ).all()
+        today = date.today()
+        for entry in entries:
+            handed_over[entry.SlotId] = ReservationRequest(
+                SlotId=entry.SlotId,
+                VolunteerId=entry.VolunteerId,
+                RequestDate=today,
+                Status=WalkRequestStatus.PENDING.value
+            )
+        db.session.add_all(handed_over.values())
+        db.session.flush()
+
+    freed = [slot_id for slot_id in slot_ids if slot_id not in handed_over]
+    for ids, status in ((freed, AvailableSlotStatus.AVAILABLE.value), (list(handed_over), AvailableSlotStatus.RESERVED.value)):
+        if ids:
+            db.session.execute(
+                db.update(AvailableSlot)
+                .where(AvailableSlot.Id.in_(ids))
+                .values(Status=status)
+                .execution_options(synchronize_session=False)
+            )
+
+    for reservation in handed_over.values():
+        event_bus.publish('reservation.created', id=reservation.Id, slot_id=reservation.SlotId, volunteer_id=reservation.VolunteerId, status=reservation.Status, from_waitlist=True)
+    if freed:
+        event_bus.publish('slot.batch_updated', ids=freed, status=AvailableSlotStatus.AVAILABLE.value)
+    return handed_over
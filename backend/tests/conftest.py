@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+# The backend is run from its own directory with flat imports (App, config, services...)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from App import create_app
+from config import load_config
+
+
+@pytest.fixture
+def app():
+    return create_app(load_config('test'), start_services=False)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,15 @@
+# Refused before the handler runs, so these need no database
+
+
+def test_anonymous_get_by_id_is_refused(client):
+    response = client.get('/examinationrequests/1?include=caregiver')
+    assert response.status_code == 401
+    assert 'caregiver' not in response.json
+
+
+def test_anonymous_get_by_id_in_batch_is_refused(client):
+    response = client.post('/batch', json={'requests': [{'path': '/examinationrequests/1?include=caregiver'}]})
+    assert response.status_code == 200
+    [result] = response.json
+    assert result['status'] == 401
+    assert 'caregiver' not in result['body']
@@ -0,0 +1,24 @@
+import pytest
+from services.metrics import metrics
+
+
+def counter(name, **labels):
+    return metrics._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def test_unhandled_exception_is_counted_as_500(app, client):
+    @app.route('/test/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    labels = {'route': '/test/fail', 'method': 'GET'}
+    requests, errors = counter('http_requests_total', status='500', **labels), counter('http_request_errors_total', **labels)
+    in_progress = metrics._in_progress
+
+    # PROPAGATE_EXCEPTIONS: the exception reaches the server, after_request never runs
+    with pytest.raises(RuntimeError):
+        client.get('/test/fail')
+
+    assert counter('http_requests_total', status='500', **labels) == requests + 1
+    assert counter('http_request_errors_total', **labels) == errors + 1
+    assert metrics._in_progress == in_progress
@@ -0,0 +1,49 @@
+import threading
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from services.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def hasher(method, **config):
+    app = Flask(__name__)
+    app.config['PASSWORD_HASH_METHOD'] = method
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    app.config.update(config)
+    return PasswordHasher(app)
+
+
+def test_method_without_parameters_matches_its_hashes():
+    for method in ('scrypt', 'pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha256:1000'):
+        assert not hasher(method).needs_rehash(generate_password_hash('secret', method))
+
+
+def test_other_parameters_need_rehash():
+    assert hasher('pbkdf2:sha256:2000').needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+    assert hasher('scrypt').needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+
+
+def test_full_pool_rejects_without_waiting():
+    pool = hasher('pbkdf2:sha256:1000', PASSWORD_HASH_QUEUE=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=pool._run, args=(slow,))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            pool.verify(generate_password_hash('secret', 'pbkdf2:sha256:1000'), 'secret')
+    finally:
+        release.set()
+        worker.join()
+    assert pool.stats()['rejected'] == 1
+
+
+def test_pool_limited_to_half_of_the_request_threads():
+    pool = hasher('pbkdf2:sha256:1000', PASSWORD_HASH_WORKERS=4, PASSWORD_HASH_QUEUE=16, WORKER_THREADS=10)
+    assert pool._executor._max_workers == 4
+    assert pool._slots._initial_value == 5
@@ -0,0 +1,23 @@
+from models.database import db
+from services.response_cache import response_cache
+
+
+def test_memory_store_bumps_on_commit_without_waiting_for_the_event(app, monkeypatch):
+    published = []
+    monkeypatch.setattr('services.response_cache.event_bus.publish', lambda type, **data: published.append(type))
+    with app.app_context():
+        before = response_cache.store.versions(['cats'])
+        response_cache.invalidate('cats')
+        # Nothing to flush, the commit does not reach the database
+        db.session.commit()
+        assert response_cache.store.versions(['cats']) > before
+    assert published == ['cache.invalidated']
+
+
+def test_rolled_back_invalidation_keeps_the_version(app, monkeypatch):
+    monkeypatch.setattr('services.response_cache.event_bus.publish', lambda type, **data: None)
+    with app.app_context():
+        before = response_cache.store.versions(['cats'])
+        response_cache.invalidate('cats')
+        db.session.rollback()
+        assert response_cache.store.versions(['cats']) == before
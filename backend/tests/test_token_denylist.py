@@ -0,0 +1,56 @@
+import time
+from services.token_denylist import ISSUED_CLAIM, TokenDenylist
+
+
+def payload(issued_ms, token_type='access', claim=True):
+    token = {'jti': 'jti', 'type': token_type, 'sub': {'user_id': 1}, 'iat': issued_ms // 1000}
+    if claim:
+        token[ISSUED_CLAIM] = issued_ms
+    return token
+
+
+def revoked_user(app, access_only=True):
+    denylist = TokenDenylist(app)
+    # No database sync or purge in these tests
+    denylist._last_sync = denylist._last_purge = time.time() + 3600
+    with app.app_context():
+        revocation = denylist.revoke_user(1, access_only=access_only)
+    denylist.applied(revocation)
+    return denylist, revocation.RevokedBefore
+
+
+def test_token_issued_after_user_revocation_in_the_same_second_is_valid(app):
+    denylist, cutoff = revoked_user(app)
+    assert not denylist.is_revoked({}, payload(cutoff))
+    assert not denylist.is_revoked({}, payload(cutoff + 1))
+
+
+def test_tokens_issued_before_user_revocation_are_revoked(app):
+    denylist, cutoff = revoked_user(app, access_only=False)
+    assert denylist.is_revoked({}, payload(cutoff - 1))
+    assert denylist.is_revoked({}, payload(cutoff - 1, token_type='refresh'))
+    # Without the claim a token counts from the start of its second
+    assert denylist.is_revoked({}, payload(cutoff, claim=False))
+
+
+def test_access_only_revocation_keeps_refresh_tokens(app):
+    denylist, cutoff = revoked_user(app)
+    assert not denylist.is_revoked({}, payload(cutoff - 1, token_type='refresh'))
+
+
+def revoked_token(app):
+    denylist = TokenDenylist(app)
+    denylist._last_sync = denylist._last_purge = time.time() + 3600
+    with app.app_context():
+        revocation = denylist.revoke_token('jti', time.time() + 3600)
+    denylist.applied(revocation)
+    return denylist
+
+
+def test_just_rotated_refresh_token_gets_through_within_the_grace_period(app):
+    denylist = revoked_token(app)
+    issued = int(time.time() * 1000) - 1000
+    assert not denylist.is_revoked({}, payload(issued, token_type='refresh'))
+    assert denylist.is_revoked({}, payload(issued))
+    denylist.reuse_grace = 0
+    assert denylist.is_revoked({}, payload(issued, token_type='refresh'))
@@ -0,0 +1,6 @@
+from App import create_app
+
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# The app is built once in the gunicorn master (preload_app), the background threads are started in each
+# worker by the post_fork hook in gunicorn.conf.py. For development use: flask --app App run
+app = create_app(start_services=False)
@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect } from "react";
+import React, { createContext, useContext, useState, useEffect, useRef } from "react";
 import { API_URL } from "../App";
 import { useNavigate } from "react-router-dom";
 
@@ -9,6 +9,9 @@ interface AuthContextType {
   refreshAuth: () => void;  // Add a function to refresh the authentication state
 }
 
+// Renew the short lived access token this long before it expires
+const RENEW_BEFORE_MS = 30000;
+
 const AuthContext = createContext<AuthContextType>({
   role: null,
   userId: null,
@@ -22,9 +25,11 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
   const [userId, setUserId] = useState<number | null>(null);
   const [loading, setLoading] = useState(true); // New loading state
   const navigate = useNavigate();
+  const renewTimer = useRef<ReturnType<typeof setTimeout> | null>(null);  // The one pending renewal
 
 
-  const fetchUserRole = async () => {
+  // Resolves to true when the session holds an access token that is not due for renewal yet
+  const fetchUserRole = async (): Promise<boolean> => {
     try {
       const response = await fetch(`${API_URL}/auth/role`, {
         method: "GET",
@@ -35,6 +40,8 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
         const data = await response.json();
         if (data.expires_at) {
           setLogoutTimeout(data.expires_at);  // Set the logout timeout
+        } else {
+          clearRenewTimer();
         }
 
         setRole(data.role);  // Set the user role
@@ -42,7 +49,9 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
         if (data.user_id) {
           setUserId(data.user_id);  // Set the user ID
         }
+        return data.expires_at != null && data.expires_at * 1000 - Date.now() > RENEW_BEFORE_MS;
       } else {
+        clearRenewTimer();
         setRole(null);  // If not authenticated, set role to null
       }
     } catch (error) {
@@ -51,15 +60,52 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
     } finally {
       setLoading(false); // Indicate loading is complete
     }
+    return false;
+  };
+
+  const clearRenewTimer = () => {
+    if (renewTimer.current !== null) {
+      clearTimeout(renewTimer.current);
+      renewTimer.current = null;
+    }
   };
 
   const setLogoutTimeout = (expiresAt: number) => {
     const expirationTime = expiresAt * 1000; // convert to milliseconds
     const timeUntilExpiration = expirationTime - Date.now();
 
+    // Every role check reschedules, without clearing the earlier timers would pile up and renew several times
+    clearRenewTimer();
     if (timeUntilExpiration > 0) {
-      setTimeout(() => navigate("/logout"), timeUntilExpiration);
+      // Renew the short lived access token shortly before it expires, log out if that is no longer possible
+      renewTimer.current = setTimeout(renewToken, Math.max(timeUntilExpiration - RENEW_BEFORE_MS, 0));
+    }
+  };
+
+  const renewToken = async () => {
+    try {
+      const response = await fetch(`${API_URL}/auth/refresh`, {
+        method: "POST",
+        credentials: "include",
+      });
+      if (response.ok) {
+        fetchUserRole();  // Picks up the new expiration (and role) and schedules the next renewal
+        return;
+      }
+      if (response.status === 409) {
+        // Renewed by another tab just now, give its response a moment to store the new cookies
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+      }
+    } catch (error) {
+      console.error("Error renewing token:", error);
+    }
+    // Other tabs share the cookies and may have renewed first (409), the session is only over if the
+    // role check finds no fresh access token either
+    if (await fetchUserRole()) {
+      return;
     }
+    clearRenewTimer();
+    navigate("/logout");
   };
 
 
@@ -70,6 +116,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
 
   useEffect(() => {
     refreshAuth();
+    return clearRenewTimer;
   }, []);
 
   const isAuthenticated = role != null && role != -1;  // Check if the user is authenticated
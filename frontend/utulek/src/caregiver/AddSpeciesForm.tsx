@@ -21,6 +21,7 @@ const AddSpeciesForm: React.FC<AddSpeciesFormProps> = ({ onSpeciesAdded }) => {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ name }),
+                credentials: "include",
             });
 
             if (!response.ok) {
@@ -20,6 +20,7 @@ const EditSpeciesForm: React.FC<EditSpeciesFormProps> = ({ species, onModificati
                 method: "PUT",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ name }),
+                credentials: "include",
             });
 
             if (!response.ok) {
@@ -39,6 +40,7 @@ const EditSpeciesForm: React.FC<EditSpeciesFormProps> = ({ species, onModificati
         try {
           const response = await fetch(`${API_URL}/species/${species.id}`, {
             method: 'DELETE',
+            credentials: 'include',
           });
     
           if (response.ok) {
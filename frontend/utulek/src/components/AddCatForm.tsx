@@ -51,6 +51,7 @@ const AddCatForm: React.FC<AddCatFormProps> = ({ onCatAdded }) => {
       const response = await fetch(`${API_URL}/cat/photo/upload`, {
         method: 'POST',
         body: formData,
+        credentials: 'include',
       });
   
       const data = await response.json();
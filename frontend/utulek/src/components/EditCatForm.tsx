@@ -49,6 +49,7 @@ const EditCatForm: React.FC<EditCatFormProps> = ({ cat, onCatUpdated, onClose })
       const response = await fetch(`${API_URL}/cat/photo/upload`, {
         method: 'POST',
         body: formData,
+        credentials: 'include',
       });
 
       const data = await response.json();